@@ -1,140 +1,592 @@
 """The Indra V2H integration."""
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections.abc import Awaitable, Callable
+from datetime import datetime, time, timedelta
+from functools import partial
+from typing import Any
 
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import ATTR_ENTITY_ID, ENTITY_MATCH_ALL, Platform
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import (
+    ConfigEntryAuthFailed,
+    ConfigEntryError,
+    ConfigEntryNotReady,
+    HomeAssistantError,
+    ServiceValidationError,
+)
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.service import (
+    ServiceTargetSelector,
+    async_extract_referenced_entity_ids,
+)
+from homeassistant.util import dt as dt_util
 
-from .const import CONF_EMAIL, CONF_PASSWORD, DOMAIN, MODES
+from .backfill import IndraV2HStatistics, async_remove_statistics_progress
+from .cache import IndraV2HDataCache, async_remove_cache
+from .client import IndraV2HClient, import_library
+from .const import (
+    CONF_BLOCK_THRESHOLD,
+    CONF_EMAIL,
+    CONF_MAX_CONNECTIONS,
+    CONF_PASSWORD,
+    CONF_PUBLISH_INTERVAL,
+    CONF_REQUEST_RATE,
+    CONF_SAMPLE_INTERVAL,
+    CONF_SAMPLE_WINDOW,
+    DATA_PROFILING,
+    DATA_SERVICES_REGISTERED,
+    DEFAULT_BLOCK_THRESHOLD,
+    DEFAULT_CHARGE_POWER,
+    DEFAULT_DISCHARGE_POWER,
+    DEFAULT_EFFICIENCY,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MIN_SOC,
+    DEFAULT_PRICE_ATTRIBUTE,
+    DEFAULT_PROFILE_CYCLES,
+    DEFAULT_PUBLISH_INTERVAL,
+    DEFAULT_REQUEST_RATE,
+    DEFAULT_SAMPLE_INTERVAL,
+    DEFAULT_SAMPLE_WINDOW,
+    DEFAULT_TARGET_SOC,
+    DOMAIN,
+    LEGACY_DEVICE_ID,
+    LEGACY_UNIQUE_ID_PREFIX,
+    MODE_CHARGE,
+    MODE_SCHEDULE,
+    MODES,
+    WATCHDOG_KEEP_BLOCKS,
+)
 from .coordinator import IndraV2HDataUpdateCoordinator
+from .optimiser import BatteryParameters, IndraV2HOptimiser, PriceSource
+from .planner import async_get_poll_planner
+from .pool import (
+    async_close_http_client,
+    async_get_http_client,
+    async_get_rate_limiter,
+    async_remove_rate_limiter,
+)
+from .profiler import LoopWatchdog, TimedClient, async_profile
+from .sampling import IndraV2HSampler
+from .scheduler import IndraV2HScheduler, async_remove_schedule
+from .token_cache import async_get_token_cache
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.SELECT]
 
+_PERCENT = vol.All(vol.Coerce(float), vol.Range(min=0, max=100))
+_POSITIVE = vol.All(vol.Coerce(float), vol.Range(min=0, min_included=False))
+
+SET_MODE_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Required("mode"): vol.In(MODES),
+    }
+)
+
+SET_SCHEDULE_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Optional("mode", default=MODE_CHARGE): vol.In(
+            [mode for mode in MODES if mode != MODE_SCHEDULE]
+        ),
+        vol.Optional("start_time"): cv.string,
+        vol.Optional("end_time"): cv.string,
+    }
+)
+
+CLEAR_SCHEDULE_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Optional("window_id"): cv.string,
+    }
+)
+
+OPTIMISE_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Exclusive("price_entity", "prices"): cv.entity_id,
+        vol.Exclusive("price_file", "prices"): cv.string,
+        vol.Optional("price_attribute", default=DEFAULT_PRICE_ATTRIBUTE): cv.string,
+        vol.Optional("export_price_entity"): cv.entity_id,
+        vol.Required("capacity"): _POSITIVE,
+        vol.Optional("soc"): _PERCENT,
+        vol.Optional("target_soc", default=DEFAULT_TARGET_SOC): _PERCENT,
+        vol.Optional("deadline"): cv.datetime,
+        vol.Optional("min_soc", default=DEFAULT_MIN_SOC): _PERCENT,
+        vol.Optional("charge_power", default=DEFAULT_CHARGE_POWER): _POSITIVE,
+        vol.Optional("discharge_power", default=DEFAULT_DISCHARGE_POWER): _POSITIVE,
+        vol.Optional("efficiency", default=DEFAULT_EFFICIENCY): vol.All(
+            vol.Coerce(float), vol.Range(min=0.5, max=1)
+        ),
+        vol.Optional("follow", default=False): cv.boolean,
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("cycles", default=DEFAULT_PROFILE_CYCLES): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+        vol.Optional("block_threshold"): vol.All(
+            vol.Coerce(float), vol.Range(min=0.01, max=10)
+        ),
+    }
+)
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Indra V2H from a config entry."""
     try:
-        from .client import IndraV2HClient
+        # pyindrav2h is imported from disk, so keep that off the event loop
+        await hass.async_add_executor_job(import_library)
 
-        # Create client with credentials from config entry
-        client = IndraV2HClient(entry.data[CONF_EMAIL], entry.data[CONF_PASSWORD])
+        # Create client with credentials from config entry, reusing any
+        # bearer token cached by the config flow, an earlier run or another
+        # entry for the same account
+        email = entry.data[CONF_EMAIL]
+        token_cache = await async_get_token_cache(hass)
+        client = IndraV2HClient(
+            email,
+            entry.data[CONF_PASSWORD],
+            token=token_cache.get(email),
+            token_callback=partial(token_cache.async_set, email),
+            http_client=async_get_http_client(
+                hass,
+                entry.options.get(CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS),
+            ),
+            rate_limiter=async_get_rate_limiter(
+                hass, entry.options.get(CONF_REQUEST_RATE, DEFAULT_REQUEST_RATE)
+            ),
+        )
         
         # Create coordinator
-        coordinator = IndraV2HDataUpdateCoordinator(hass, client)
+        coordinator = IndraV2HDataUpdateCoordinator(hass, client, entry.options)
+        entry.async_on_unload(client.cancel_commands)
+        coordinator.cache = IndraV2HDataCache(hass, entry.entry_id)
+
+        # Watch for event loop blocks and time the client's awaits all the
+        # time, not just while profiling, if a block threshold is set
+        if block_threshold := entry.options.get(
+            CONF_BLOCK_THRESHOLD, DEFAULT_BLOCK_THRESHOLD
+        ):
+            coordinator.watchdog = LoopWatchdog(
+                hass.loop, block_threshold, WATCHDOG_KEEP_BLOCKS
+            )
+            entry.async_on_unload(coordinator.watchdog.stop)
+            coordinator.watchdog.start()
+            coordinator.client = TimedClient(
+                client, coordinator.await_timings, block_threshold
+            )
+
+        # Poll in a slot of its own, away from the other entries' polls, from
+        # the first refresh on
+        coordinator.poll_slot = async_get_poll_planner(hass).async_add()
+        entry.async_on_unload(coordinator.poll_slot.async_release)
+
+        # Start from the data cached by the last run so entities are set up
+        # without waiting for the cloud, and refresh once they are; without
+        # a cache, wait for the first refresh, which raises ConfigEntryNotReady
+        # if the cloud can't be reached so setup is retried
+        if restored := await coordinator.cache.async_load():
+            coordinator.async_restore(*restored)
+        else:
+            await coordinator.async_config_entry_first_refresh()
         
-        # Fetch initial data
-        await coordinator.async_config_entry_first_refresh()
+        # Move entities from the old single-charger IDs onto the charger's serial
+        await _async_migrate_single_device(hass, entry, coordinator)
+
+        # Start switching chargers at their schedule windows
+        coordinator.scheduler = IndraV2HScheduler(hass, coordinator, entry.entry_id)
+        entry.async_on_unload(coordinator.scheduler.async_stop)
+        await coordinator.scheduler.async_start()
+        coordinator.optimiser = IndraV2HOptimiser(hass, coordinator)
+        entry.async_on_unload(coordinator.optimiser.async_stop_following)
+
+        # Sample power every few seconds if fast sampling is turned on
+        if sample_interval := entry.options.get(
+            CONF_SAMPLE_INTERVAL, DEFAULT_SAMPLE_INTERVAL
+        ):
+            coordinator.sampler = IndraV2HSampler(
+                hass,
+                coordinator,
+                timedelta(seconds=sample_interval),
+                timedelta(
+                    minutes=entry.options.get(CONF_SAMPLE_WINDOW, DEFAULT_SAMPLE_WINDOW)
+                ),
+                timedelta(
+                    seconds=entry.options.get(
+                        CONF_PUBLISH_INTERVAL, DEFAULT_PUBLISH_INTERVAL
+                    )
+                ),
+            )
+            entry.async_on_unload(coordinator.sampler.async_stop)
+            coordinator.sampler.async_start()
+
+        # Import hourly energy statistics for the energy dashboard
+        if "recorder" in hass.config.components:
+            energy_statistics = coordinator.energy_statistics = IndraV2HStatistics(
+                hass, coordinator, entry.entry_id
+            )
+
+            @callback
+            def _async_stop_statistics() -> None:
+                entry.async_create_task(hass, energy_statistics.async_stop())
+
+            entry.async_on_unload(_async_stop_statistics)
+            await energy_statistics.async_start()
         
         # Store coordinator in hass data
         hass.data.setdefault(DOMAIN, {})
         hass.data[DOMAIN][entry.entry_id] = coordinator
         
+        @callback
+        def _async_remove_coordinator() -> None:
+            hass.data[DOMAIN].pop(entry.entry_id, None)
+
+        entry.async_on_unload(_async_remove_coordinator)
+
         # Set up platforms
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        if restored:
+            entry.async_create_background_task(
+                hass, coordinator.async_refresh_in_slot(), f"{DOMAIN} first refresh"
+            )
+
+        # Reload when the polling options change
+        entry.async_on_unload(entry.add_update_listener(async_reload_entry))
         
         # Register services if not already registered
-        if not hasattr(hass.data[DOMAIN], "_services_registered"):
+        if DATA_SERVICES_REGISTERED not in hass.data[DOMAIN]:
             await async_setup_services(hass)
-            hass.data[DOMAIN]["_services_registered"] = True
+            hass.data[DOMAIN][DATA_SERVICES_REGISTERED] = True
         
         return True
+    except (ConfigEntryAuthFailed, ConfigEntryError, ConfigEntryNotReady):
+        raise
     except Exception as err:
-        _LOGGER.error("Error setting up Indra V2H integration: %s", err)
-        return False
+        # Home Assistant only runs the unload callbacks registered so far for
+        # config entry errors, so report anything unexpected as one
+        raise ConfigEntryError(f"Error setting up Indra V2H integration: {err}") from err
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_shutdown()
         
         # Unregister services if no more entries
-        if DOMAIN in hass.data and len([k for k in hass.data[DOMAIN].keys() if k != "_services_registered"]) == 0:
+        if DOMAIN in hass.data and not _get_coordinators(hass):
             hass.services.async_remove(DOMAIN, "set_mode")
             hass.services.async_remove(DOMAIN, "set_schedule")
-            hass.data[DOMAIN].pop("_services_registered", None)
+            hass.services.async_remove(DOMAIN, "clear_schedule")
+            hass.services.async_remove(DOMAIN, "optimise")
+            hass.services.async_remove(DOMAIN, "profile")
+            hass.data[DOMAIN].pop(DATA_SERVICES_REGISTERED, None)
+            await async_close_http_client(hass)
+            async_remove_rate_limiter(hass)
     
     return unload_ok
 
 
-def _get_coordinator_for_service(hass: HomeAssistant, call) -> IndraV2HDataUpdateCoordinator | None:
-    """Get the coordinator for a service call."""
-    if DOMAIN not in hass.data:
-        return None
-    
-    # Try to get coordinator from entity_id if provided
-    entity_id = call.data.get("entity_id")
-    if entity_id:
-        # Extract entry_id from entity registry if possible
-        from homeassistant.helpers import entity_registry as er
-        
-        entity_registry = er.async_get(hass)
-        if registry_entry := entity_registry.async_get(entity_id):
-            entry_id = registry_entry.config_entry_id
-            if entry_id and entry_id in hass.data[DOMAIN]:
-                return hass.data[DOMAIN][entry_id]
-    
-    # Otherwise, use the first coordinator
-    coordinators = [v for k, v in hass.data[DOMAIN].items() if k != "_services_registered"]
-    if coordinators:
-        return coordinators[0]
-    
-    return None
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the schedule, cached data and statistics progress of an entry."""
+    await async_remove_schedule(hass, entry.entry_id)
+    await async_remove_cache(hass, entry.entry_id)
+    await async_remove_statistics_progress(hass, entry.entry_id)
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a config entry after its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+def _get_coordinators(hass: HomeAssistant) -> list[IndraV2HDataUpdateCoordinator]:
+    """Get the coordinators of all loaded config entries."""
+    # Domain-level data (token cache, flags) is stored under "_"-prefixed keys
+    return [
+        value
+        for key, value in hass.data.get(DOMAIN, {}).items()
+        if not key.startswith("_")
+    ]
+
+
+async def _async_migrate_single_device(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: IndraV2HDataUpdateCoordinator,
+) -> None:
+    """Migrate entities and the device created before multi-device support.
+
+    Those used fixed IDs ("indra_v2h_power", device "indra_v2h_charger");
+    they now belong to the first charger on the account. The combined
+    "energy" sensor, which mixed both counters, becomes "energy_to_ev".
+    """
+    if not coordinator.data:
+        return
+    serial = next(iter(coordinator.data))
+
+    device_registry = dr.async_get(hass)
+    device = device_registry.async_get_device(
+        identifiers={(DOMAIN, LEGACY_DEVICE_ID)}
+    )
+    if device and entry.entry_id in device.config_entries:
+        device_registry.async_update_device(
+            device.id, new_identifiers={(DOMAIN, serial)}
+        )
+
+    # Only the old combined sensor itself; newer keys such as window_energy
+    # also end in "_energy"
+    legacy_energy_ids = {f"{charger}_energy" for charger in coordinator.data}
+
+    @callback
+    def _migrate_unique_id(registry_entry: er.RegistryEntry) -> dict | None:
+        unique_id = registry_entry.unique_id
+        if unique_id.startswith(LEGACY_UNIQUE_ID_PREFIX):
+            unique_id = f"{serial}_{unique_id.removeprefix(LEGACY_UNIQUE_ID_PREFIX)}"
+        if unique_id in legacy_energy_ids:
+            unique_id = f"{unique_id}_to_ev"
+        if unique_id == registry_entry.unique_id:
+            return None
+        return {"new_unique_id": unique_id}
+
+    await er.async_migrate_entries(hass, entry.entry_id, _migrate_unique_id)
+
+
+def _get_targets_for_service(
+    hass: HomeAssistant, call: ServiceCall
+) -> list[tuple[IndraV2HDataUpdateCoordinator, str]]:
+    """Get the coordinator and serial of every charger a service call targets.
+
+    Entities, devices and areas are resolved to entities by Home Assistant,
+    then to chargers through the entity index each coordinator keeps.
+    Without a target, the call goes to the only charger, if there is just one.
+    """
+    coordinators = _get_coordinators(hass)
+    chargers = [
+        (coordinator, serial)
+        for coordinator in coordinators
+        for serial in coordinator.data or {}
+    ]
+
+    if not ServiceTargetSelector(call).has_any_selector:
+        if len(chargers) != 1:
+            raise ServiceValidationError(
+                f"Choose a target: there are {len(chargers)} Indra V2H chargers"
+            )
+        return chargers
+    if call.data.get(ATTR_ENTITY_ID) == ENTITY_MATCH_ALL:
+        return chargers
+
+    selected = async_extract_referenced_entity_ids(hass, call)
+    targets: set[tuple[IndraV2HDataUpdateCoordinator, str]] = set()
+    for entity_id in selected.referenced | selected.indirectly_referenced:
+        for coordinator in coordinators:
+            if (serial := coordinator.entity_serials.get(entity_id)) is not None:
+                targets.add((coordinator, serial))
+                break
+    if not targets:
+        raise ServiceValidationError("The target has no Indra V2H chargers")
+    return [charger for charger in chargers if charger in targets]
+
+
+async def _async_call_chargers(
+    hass: HomeAssistant,
+    call: ServiceCall,
+    action: Callable[[IndraV2HDataUpdateCoordinator, str], Awaitable[dict[str, Any]]],
+) -> ServiceResponse:
+    """Run a service action on every targeted charger at once.
+
+    Returns each charger's result, or its error, keyed by serial. If the
+    caller doesn't want the response, failures are raised instead.
+    """
+    targets = _get_targets_for_service(hass, call)
+    results = await asyncio.gather(
+        *(action(coordinator, serial) for coordinator, serial in targets),
+        return_exceptions=True,
+    )
+
+    response: dict[str, Any] = {}
+    failed = []
+    for (_, serial), result in zip(targets, results, strict=True):
+        if isinstance(result, Exception):
+            _LOGGER.error("Error calling %s for %s: %s", call.service, serial, result)
+            response[serial] = {"success": False, "error": str(result)}
+            failed.append(serial)
+        else:
+            response[serial] = {"success": True, **result}
+    if failed and not call.return_response:
+        raise HomeAssistantError(f"{call.service} failed for {', '.join(failed)}")
+    return {"chargers": response}
 
 
 async def async_setup_services(hass: HomeAssistant) -> None:
     """Set up custom services."""
     
-    async def set_mode_service(call):
-        """Service to set charger mode."""
-        coordinator = _get_coordinator_for_service(hass, call)
-        if not coordinator:
-            _LOGGER.error("No Indra V2H coordinator found")
-            return
-        
-        mode = call.data.get("mode")
-        if mode not in MODES:
-            _LOGGER.error("Invalid mode: %s", mode)
-            return
+    async def set_mode_service(call: ServiceCall) -> ServiceResponse:
+        """Service to set the mode of the targeted chargers."""
+        mode = call.data["mode"]
         
-        try:
-            await coordinator.client.set_mode(mode)
-            await coordinator.async_request_refresh()
-        except Exception as err:
-            _LOGGER.error("Error setting mode: %s", err)
-    
-    async def set_schedule_service(call):
-        """Service to set schedule times."""
-        coordinator = _get_coordinator_for_service(hass, call)
-        if not coordinator:
-            _LOGGER.error("No Indra V2H coordinator found")
-            return
+        async def set_mode(
+            coordinator: IndraV2HDataUpdateCoordinator, serial: str
+        ) -> dict[str, Any]:
+            return {"sent": await coordinator.async_set_mode(serial, mode)}
         
+        return await _async_call_chargers(hass, call, set_mode)
+
+    async def set_schedule_service(call: ServiceCall) -> ServiceResponse:
+        """Service to add a schedule window, or return to schedule mode."""
         start_time = call.data.get("start_time")
         end_time = call.data.get("end_time")
-        mode = call.data.get("mode", "charge")
+        mode = call.data["mode"]
         
-        _LOGGER.info(
-            "Setting schedule: mode=%s, start=%s, end=%s",
-            mode, start_time, end_time
-        )
+        # Without a window, hand control back to the chargers' schedules
+        if start_time is None and end_time is None:
+            async def resume_schedule(
+                coordinator: IndraV2HDataUpdateCoordinator, serial: str
+            ) -> dict[str, Any]:
+                return {"sent": await coordinator.async_set_mode(serial, MODE_SCHEDULE)}
+
+            return await _async_call_chargers(hass, call, resume_schedule)
         
-        # For now, this is a placeholder for future schedule implementation
-        # The pyindrav2h library may need schedule-specific methods
+        start = _parse_window_time(start_time)
+        end = _parse_window_time(end_time)
+        if start is None or end is None:
+            raise ServiceValidationError(
+                f"Invalid schedule window: {start_time} - {end_time}"
+            )
+
+        async def add_window(
+            coordinator: IndraV2HDataUpdateCoordinator, serial: str
+        ) -> dict[str, Any]:
+            window = coordinator.scheduler.async_add_window(serial, mode, start, end)
+            _LOGGER.info(
+                "Added schedule window %s: %s %s, %s - %s",
+                window.id, serial, mode, start, end
+            )
+            return {"window_id": window.id}
+
+        return await _async_call_chargers(hass, call, add_window)
+
+    async def clear_schedule_service(call: ServiceCall) -> ServiceResponse:
+        """Service to remove schedule windows."""
+        window_id = call.data.get("window_id")
+
+        async def clear_schedule(
+            coordinator: IndraV2HDataUpdateCoordinator, serial: str
+        ) -> dict[str, Any]:
+            if window_id is None:
+                coordinator.optimiser.async_stop_following(serial)
+            removed = coordinator.scheduler.async_clear(serial, window_id)
+            _LOGGER.info("Removed %s schedule window(s) for %s", removed, serial)
+            return {"removed": removed}
+
+        return await _async_call_chargers(hass, call, clear_schedule)
+
+    async def optimise_service(call: ServiceCall):
+        """Service to plan a charger against a price forecast."""
+        targets = _get_targets_for_service(hass, call)
+        if len(targets) != 1:
+            raise ServiceValidationError(
+                f"Optimise one charger at a time; the target has {len(targets)}"
+            )
+        coordinator, serial = targets[0]
+
+        # Use the charger's own state of charge unless one is given
+        soc = call.data.get("soc")
+        if soc is None and (snapshot := coordinator.snapshots.get(serial)):
+            soc = snapshot.soc
+        if soc is None:
+            raise HomeAssistantError(
+                f"Charger {serial} doesn't report a state of charge; pass soc"
+            )
+
+        battery = BatteryParameters(
+            capacity=call.data["capacity"],
+            soc=soc,
+            target_soc=call.data["target_soc"],
+            deadline=call.data.get("deadline"),
+            charge_power=call.data["charge_power"],
+            discharge_power=call.data["discharge_power"],
+            min_soc=call.data["min_soc"],
+            efficiency=call.data["efficiency"],
+        )
+        prices = PriceSource(
+            entity_id=call.data.get("price_entity"),
+            attribute=call.data["price_attribute"],
+            file=call.data.get("price_file"),
+            export_entity_id=call.data.get("export_price_entity"),
+        )
+        try:
+            plan = await coordinator.optimiser.async_optimise(
+                serial, battery, prices, call.data["follow"]
+            )
+        except ValueError as err:
+            raise HomeAssistantError(str(err)) from err
+        return plan.as_dict()
+
+    async def profile_service(call: ServiceCall) -> ServiceResponse:
+        """Service to profile polls of every charger and write a report."""
+        if hass.data[DOMAIN].get(DATA_PROFILING):
+            raise ServiceValidationError("A profile is already running")
+        hass.data[DOMAIN][DATA_PROFILING] = True
         try:
-            # Return to schedule mode - actual schedule times may need
-            # to be set via the Indra Smart Portal or future API methods
-            await coordinator.client.set_schedule()
-            await coordinator.async_request_refresh()
-        except Exception as err:
-            _LOGGER.error("Error setting schedule: %s", err)
+            return await async_profile(
+                hass,
+                _get_coordinators(hass),
+                call.data["cycles"],
+                call.data.get("block_threshold"),
+            )
+        finally:
+            hass.data[DOMAIN].pop(DATA_PROFILING, None)
     
     # Register services
-    hass.services.async_register(DOMAIN, "set_mode", set_mode_service)
-    hass.services.async_register(DOMAIN, "set_schedule", set_schedule_service)
+    for service, handler, schema in (
+        ("set_mode", set_mode_service, SET_MODE_SCHEMA),
+        ("set_schedule", set_schedule_service, SET_SCHEDULE_SCHEMA),
+        ("clear_schedule", clear_schedule_service, CLEAR_SCHEDULE_SCHEMA),
+    ):
+        hass.services.async_register(
+            DOMAIN,
+            service,
+            handler,
+            schema=schema,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+    hass.services.async_register(
+        DOMAIN,
+        "optimise",
+        optimise_service,
+        schema=OPTIMISE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "profile",
+        profile_service,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _parse_window_time(value) -> time | datetime | None:
+    """Parse a window boundary: a time of day, or a date and time for once."""
+    if value is None or isinstance(value, (time, datetime)):
+        return value
+    return dt_util.parse_datetime(str(value)) or dt_util.parse_time(str(value))
 
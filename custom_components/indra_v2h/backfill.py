@@ -0,0 +1,296 @@
+"""Hourly energy statistics for the energy dashboard.
+
+The Indra API has no history endpoint, so hourly statistics are derived
+from the chargers' energy counters (activeEnergyToEv/activeEnergyFromEv)
+as they are polled. Counter readings either side of an hour boundary are
+interpolated to the boundary, so a gap in polling (a restart or an outage)
+is spread over the hours it covers instead of landing in a single hour.
+
+The hours are imported as external statistics, in chunks, waiting for the
+recorder to write each chunk before building the next, so a long gap
+doesn't hold every hour in memory at once. Imports resume from the last
+hour in the recorder, and a counter going backwards is treated as a reset.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import IndraV2HDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 60  # seconds
+IMPORT_CHUNK_HOURS = 24 * 7
+HOUR = timedelta(hours=1)
+
+# Snapshot field -> statistic name; both counters are in kWh
+COUNTERS = {
+    "energy_to_ev": "Energy to EV",
+    "energy_from_ev": "Energy from EV",
+}
+
+
+@dataclass
+class CounterState:
+    """Progress of one counter's statistics."""
+
+    # Last reading, and the offset added to it for resets before it
+    time: datetime
+    value: float
+    offset: float
+    # Start of the hour not yet imported, and the running total and
+    # statistics sum at that point
+    hour: datetime
+    hour_total: float
+    sum: float
+
+    @property
+    def total(self) -> float:
+        """Return the reading including earlier resets."""
+        return self.value + self.offset
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state as a dict for storage."""
+        data = asdict(self)
+        data["time"] = self.time.isoformat()
+        data["hour"] = self.hour.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> CounterState:
+        """Create a state from stored data."""
+        return cls(
+            **{
+                **data,
+                "time": dt_util.parse_datetime(data["time"]),
+                "hour": dt_util.parse_datetime(data["hour"]),
+            }
+        )
+
+
+def statistic_id(serial: str, key: str) -> str:
+    """Return the external statistic ID of a charger's counter."""
+    return f"{DOMAIN}:{slugify(serial)}_{key}"
+
+
+def hourly_statistics(
+    state: CounterState, time: datetime, value: float
+) -> Iterator[StatisticData]:
+    """Advance a counter's state to a new reading, yielding completed hours.
+
+    The total at each hour boundary between the previous reading and this
+    one is interpolated linearly; boundaries before the previous reading
+    get its total. The state is updated as hours are yielded, so the
+    generator must be run to the end.
+    """
+    start_time, start_total = state.time, state.total
+    if value < state.value:
+        _LOGGER.debug("Counter reset from %s to %s", state.value, value)
+        state.offset += state.value
+    end_total = value + state.offset
+    span = (time - start_time).total_seconds()
+
+    while (boundary := state.hour + HOUR) <= time:
+        fraction = max(0.0, (boundary - start_time).total_seconds() / span)
+        total = start_total + (end_total - start_total) * fraction
+        state.sum += total - state.hour_total
+        yield StatisticData(
+            start=state.hour, state=round(total, 3), sum=round(state.sum, 3)
+        )
+        state.hour, state.hour_total = boundary, total
+
+    state.time, state.value = time, value
+
+
+class IndraV2HStatistics:
+    """Imports hourly energy statistics for one config entry's chargers."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: IndraV2HDataUpdateCoordinator,
+        entry_id: str,
+    ) -> None:
+        """Initialize the importer."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self._store = _get_store(hass, entry_id)
+        self._states: dict[str, CounterState] = {}
+        # Last recorder rows of counters with no stored progress
+        self._resume: dict[str, dict[str, Any]] = {}
+        # Readings waiting to be imported, oldest first
+        self._pending: list[tuple[str, str, datetime, float]] = []
+        self._task: asyncio.Task | None = None
+
+    async def async_start(self) -> None:
+        """Load the counters' progress and line it up with the recorder."""
+        stored = await self._store.async_load() or {}
+        for stat_id, data in stored.get("counters", {}).items():
+            self._states[stat_id] = CounterState.from_dict(data)
+
+        for serial in self.coordinator.data or {}:
+            for key in COUNTERS:
+                await self._async_resume(statistic_id(serial, key))
+
+        if not self.coordinator.stale:
+            self.async_add_readings()
+
+    async def async_stop(self) -> None:
+        """Finish importing and save the counters' progress."""
+        if self._task is not None and not self._task.done():
+            await self._task
+        await self._store.async_save(self._data_to_save())
+
+    @callback
+    def async_add_readings(self) -> None:
+        """Queue the chargers' latest counter readings for import."""
+        for serial, snapshot in self.coordinator.snapshots.items():
+            time = snapshot.last_telemetry or dt_util.utcnow()
+            for key in COUNTERS:
+                if (value := snapshot.get(key)) is not None:
+                    self._pending.append((serial, key, time, value))
+        if self._pending and (self._task is None or self._task.done()):
+            self._task = self.hass.async_create_background_task(
+                self._async_import(), f"{DOMAIN} statistics import"
+            )
+
+    async def _async_resume(self, stat_id: str) -> None:
+        """Continue a counter from the last hour in the recorder.
+
+        The recorder wins over the stored progress, which may be newer than
+        the last import to land, or refer to statistics since deleted.
+        """
+        last = await get_instance(self.hass).async_add_executor_job(
+            get_last_statistics, self.hass, 1, stat_id, True, {"state", "sum"}
+        )
+        state = self._states.get(stat_id)
+        if not (rows := last.get(stat_id)):
+            if state is not None:
+                _LOGGER.debug("No statistics for %s, starting again", stat_id)
+                state.hour = _floor_hour(state.time)
+                state.hour_total = state.total
+                state.sum = 0.0
+            return
+
+        row = rows[0]
+        start = row["start"]
+        if not isinstance(start, datetime):
+            start = dt_util.utc_from_timestamp(start)
+        if state is None:
+            # Progress was lost; carry on from the recorder's last hour
+            self._resume[stat_id] = {**row, "start": start}
+        elif state.hour != start + HOUR:
+            state.hour = start + HOUR
+            state.hour_total = row["state"]
+            state.sum = row["sum"]
+            if state.hour > state.time:
+                # The stored progress is older than the recorder's
+                state.time = state.hour
+                state.offset = state.hour_total - state.value
+
+    async def _async_import(self) -> None:
+        """Import the pending readings, a chunk at a time."""
+        recorder = get_instance(self.hass)
+        while self._pending:
+            serial, key, time, value = self._pending.pop(0)
+            stat_id = statistic_id(serial, key)
+            if (state := self._states.get(stat_id)) is None:
+                self._states[stat_id] = _first_state(
+                    time, value, self._resume.pop(stat_id, None)
+                )
+                continue
+            if time <= state.time:
+                continue
+
+            hours = hourly_statistics(state, time, value)
+            while chunk := list(islice(hours, IMPORT_CHUNK_HOURS)):
+                async_add_external_statistics(
+                    self.hass, _metadata(serial, key, stat_id), chunk
+                )
+                await recorder.async_block_till_done()
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to store."""
+        return {
+            "counters": {
+                stat_id: state.as_dict() for stat_id, state in self._states.items()
+            }
+        }
+
+
+async def async_remove_statistics_progress(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete the stored counter progress of a config entry."""
+    await _get_store(hass, entry_id).async_remove()
+
+
+def _get_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store for a config entry's counter progress."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.statistics.{entry_id}")
+
+
+def _metadata(serial: str, key: str, stat_id: str) -> StatisticMetaData:
+    """Return the metadata of a charger's counter statistic."""
+    return StatisticMetaData(
+        has_mean=False,
+        has_sum=True,
+        name=f"Indra V2H {serial} {COUNTERS[key]}",
+        source=DOMAIN,
+        statistic_id=stat_id,
+        unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+    )
+
+
+def _first_state(
+    time: datetime, value: float, last_row: dict[str, Any] | None
+) -> CounterState:
+    """Return the state of a counter from its first reading.
+
+    If the recorder already has statistics for the counter, the reading
+    continues from its last hour; energy since then is unknown and left out.
+    """
+    if last_row is None:
+        return CounterState(
+            time=time,
+            value=value,
+            offset=0.0,
+            hour=_floor_hour(time),
+            hour_total=value,
+            sum=0.0,
+        )
+    return CounterState(
+        time=time,
+        value=value,
+        offset=last_row["state"] - value,
+        hour=last_row["start"] + HOUR,
+        hour_total=last_row["state"],
+        sum=last_row["sum"],
+    )
+
+
+def _floor_hour(value: datetime) -> datetime:
+    """Return the start of the hour containing a datetime."""
+    return value.replace(minute=0, second=0, microsecond=0)
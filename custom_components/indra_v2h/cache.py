@@ -0,0 +1,62 @@
+"""Persistent cache of the chargers' last fetched data.
+
+The coordinator's data is saved to Home Assistant storage after each
+successful update, so on the next start entities can be set up from it
+straight away while the first refresh from the cloud runs in the
+background.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 60  # seconds; the cache only needs to survive a restart
+
+
+class IndraV2HDataCache:
+    """The last fetched data of one config entry's chargers."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the cache."""
+        self._store = _get_store(hass, entry_id)
+        self._data: dict[str, Any] | None = None
+        self._saved_at: datetime | None = None
+
+    async def async_load(self) -> tuple[dict[str, Any], datetime] | None:
+        """Return the cached data and when it was fetched, if any."""
+        stored = await self._store.async_load()
+        if not stored or not stored.get("data"):
+            return None
+        saved_at = dt_util.parse_datetime(stored.get("saved_at", ""))
+        if saved_at is None:
+            return None
+        return stored["data"], saved_at
+
+    @callback
+    def async_save(self, data: dict[str, Any]) -> None:
+        """Remember freshly fetched data and schedule a save."""
+        self._data = data
+        self._saved_at = dt_util.utcnow()
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to store."""
+        return {"data": self._data, "saved_at": self._saved_at.isoformat()}
+
+
+async def async_remove_cache(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete the cached data of a config entry."""
+    await _get_store(hass, entry_id).async_remove()
+
+
+def _get_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store for a config entry's cached data."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.cache.{entry_id}")
@@ -5,108 +5,374 @@ a consistent async API for the Home Assistant integration.
 """
 from __future__ import annotations
 
+import asyncio
+import importlib
 import logging
+import time
+from collections.abc import Awaitable, Callable
+from functools import partial
 from typing import Any
 
+from .commands import CommandQueue
+from .const import DEVICE_INFO_TTL, MODES, READ_SHARE_TTL
+from .metrics import ClientMetrics
+from .ratelimit import PRIORITY_BACKGROUND, RateLimiter, request_priority
+
 _LOGGER = logging.getLogger(__name__)
 
+NULL_TRANSACTION_ID = "00000000-0000-0000-0000-000000000000"
+
+
+def import_library() -> None:
+    """Import pyindrav2h and the connection built on it.
+
+    Importing reads modules from disk, so call this in an executor before
+    creating a client from the event loop.
+    """
+    importlib.import_module(f"{__package__}.connection")
+    importlib.import_module("pyindrav2h.exceptions")
+    importlib.import_module("pyindrav2h.v2hdevice")
+
 
 class IndraV2HClient:
     """Wrapper for pyindrav2h library to provide consistent API."""
 
-    def __init__(self, email: str, password: str) -> None:
-        """Initialize the client."""
+    def __init__(
+        self,
+        email: str,
+        password: str,
+        token: str | None = None,
+        token_callback: Callable[[str], None] | None = None,
+        http_client: Any | None = None,
+        rate_limiter: RateLimiter | None = None,
+        read_share_ttl: float = READ_SHARE_TTL,
+    ) -> None:
+        """Initialize the client.
+
+        A previously issued bearer token can be passed in to skip the login
+        round trips; pyindrav2h logs in again if a request gets a 401.
+        token_callback is called whenever the connection obtains a new token.
+        API requests go through http_client (an httpx.AsyncClient) if given,
+        and wait for a token from rate_limiter (a RateLimiter) if given.
+        Identical reads within read_share_ttl seconds share one request.
+        Latency and outcome of every API request and client operation are
+        recorded in metrics. Transient request failures are retried, and a
+        circuit breaker stops requests while the cloud is unreachable.
+        """
         self.email = email
         self.password = password
         self._connection = None
-        self._client = None
-        self._device = None
+        self._devices: dict[str, Any] = {}
+        self._device_list: list[dict[str, Any]] = []
+        self._device_info_updated: float | None = None
+        self._token_callback = token_callback
+        self._known_token = token
+        self.metrics = ClientMetrics()
+        self._command_queues: dict[str, CommandQueue] = {}
+        # Awaited once a charger's queued mode changes have all been sent
+        self.commands_drained_callback: Callable[[], Awaitable[None]] | None = None
         
         # Import and create connection
         try:
-            from pyindrav2h.connection import Connection
-            from pyindrav2h.v2hclient import v2hClient
+            from .connection import IndraV2HConnection
             
-            self._connection = Connection(email, password)
-            self._client = v2hClient(self._connection)
+            self._connection = IndraV2HConnection(
+                email,
+                password,
+                http_client,
+                self.metrics,
+                limiter=rate_limiter,
+                read_share_ttl=read_share_ttl,
+            )
+            if token:
+                self._restore_token(token)
             _LOGGER.info("Initialized pyindrav2h client")
         except ImportError as err:
             _LOGGER.error("Failed to import pyindrav2h: %s", err)
             raise
 
     async def refresh(self) -> None:
-        """Refresh device info and statistics."""
-        if self._client is None:
+        """Refresh device info and statistics for every device."""
+        self._device_info_updated = None
+        self.invalidate_reads()
+        await self.fetch_data()
+
+    def invalidate_reads(self) -> None:
+        """Send the next reads to the cloud instead of reusing recent ones."""
+        if self._connection is not None:
+            self._connection.reads.invalidate()
+
+    async def fetch_data(self) -> dict[str, dict[str, Any]]:
+        """Fetch metadata and live statistics for every device in one pass.
+
+        Device metadata (model, serial, firmware) rarely changes, so it is
+        only re-read from the cloud once DEVICE_INFO_TTL has elapsed. The
+        statistics of all devices are then fetched concurrently.
+
+        Returns a dict keyed by serial with "device" and "statistics" entries.
+        """
+        if self._connection is None:
             raise RuntimeError("Client not initialized")
-        await self._client.refresh()
-        self._device = self._client.device
 
-    async def get_device(self) -> dict[str, Any]:
-        """Get device information."""
-        if self._client is None:
+        async with self.metrics.track("poll"):
+            if self._device_info_expired():
+                await self._refresh_device_info()
+            await asyncio.gather(
+                *(self._refresh_stats(device) for device in self._devices.values())
+            )
+        self._check_token()
+
+        return {
+            serial: {"device": device.data[0], "statistics": device.stats}
+            for serial, device in self._devices.items()
+        }
+
+    async def get_device(self) -> list[dict[str, Any]]:
+        """Get information about every device on the account."""
+        if self._connection is None:
             raise RuntimeError("Client not initialized")
         
         # Refresh if needed
-        if self._device is None:
-            await self._client.refresh_device()
-            self._device = self._client.device
-        
-        # Return device data
-        if self._device and hasattr(self._device, 'data'):
-            return self._device.data
+        if self._device_info_updated is None:
+            await self._refresh_device_info()
+            self._check_token()
         
-        return {}
+        return self._device_list
 
-    async def get_statistics(self) -> dict[str, Any]:
-        """Get device statistics."""
-        if self._client is None:
+    async def get_statistics(self, serial: str | None = None) -> dict[str, Any]:
+        """Get statistics for a device."""
+        if self._connection is None:
             raise RuntimeError("Client not initialized")
         
         # Refresh if needed
-        if self._device is None:
-            await self._client.refresh_stats()
-            self._device = self._client.device
-        else:
-            await self._device.refresh_stats()
+        if self._device_info_updated is None:
+            await self._refresh_device_info()
+        device = self._get_device(serial)
+        await self._refresh_stats(device)
+        self._check_token()
         
-        # Return statistics data
-        if self._device and hasattr(self._device, 'stats'):
-            return self._device.stats
-        
-        return {}
+        return device.stats
+
+    async def fetch_telemetry(self, serial: str) -> dict[str, Any]:
+        """Fetch a device's latest telemetry only, for fast sampling.
+
+        The request waits behind polls and mode changes for a token.
+        """
+        if self._connection is None:
+            raise RuntimeError("Client not initialized")
+
+        token = request_priority.set(PRIORITY_BACKGROUND)
+        try:
+            telemetry = await self._connection.get(
+                f"/telemetry/devices/{serial}/latest"
+            )
+        finally:
+            request_priority.reset(token)
+        self._check_token()
+        return telemetry or {}
+
+    def _restore_token(self, token: str) -> None:
+        """Seed the connection with a previously issued bearer token."""
+        self._connection._bearerToken = token
+        self._connection._headers["Authorization"] = token
+
+    def _check_token(self) -> None:
+        """Report a bearer token the connection obtained since the last check."""
+        token = self.token
+        if token and token != self._known_token:
+            self._known_token = token
+            if self._token_callback is not None:
+                self._token_callback(token)
+
+    def _device_info_expired(self) -> bool:
+        """Return True if the cached device metadata should be re-read."""
+        if self._device_info_updated is None:
+            return True
+        return time.monotonic() - self._device_info_updated > DEVICE_INFO_TTL
+
+    async def _refresh_device_info(self) -> None:
+        """Refresh the device list and remember when it was fetched.
+
+        pyindrav2h's v2hDevice only looks at the first entry of the device
+        list, so each device gets its own v2hDevice holding just its entry.
+        """
+        from pyindrav2h.v2hdevice import v2hDevice
+
+        device_list = await self._connection.get("/devices") or []
+        devices = {}
+        for info in device_list:
+            serial = info.get("deviceUID")
+            if not serial:
+                continue
+            device = self._devices.get(serial) or v2hDevice(self._connection)
+            device.data = [info]
+            devices[serial] = device
+
+        self._device_list = device_list
+        self._devices = devices
+        self._device_info_updated = time.monotonic()
 
-    async def set_mode(self, mode: str) -> None:
-        """Set the charger mode."""
-        await self._set_mode_async(mode)
+    async def _refresh_stats(self, device) -> None:
+        """Refresh telemetry and the active transaction concurrently.
 
-    async def _set_mode_async(self, mode: str) -> None:
+        pyindrav2h's refresh_stats() awaits these one after the other, but
+        neither depends on the other, so we issue them together.
+        """
+        serial = device.serial
+        async with self.metrics.track("refresh_stats"):
+            stats, active = await asyncio.gather(
+                self._connection.get(f"/telemetry/devices/{serial}/latest"),
+                self._get_active_transaction(serial),
+            )
+        device.stats = stats
+        device.active = active
+
+    async def _get_active_transaction(self, serial: str) -> dict[str, Any]:
+        """Get the active transaction for a device."""
+        from pyindrav2h.exceptions import V2HException
+
+        try:
+            return await self._connection.get(
+                f"/transactions/{serial}/{NULL_TRANSACTION_ID}/active"
+            )
+        except V2HException as err:
+            # 404 is returned when the car is not plugged in
+            if getattr(err, "code", None) == 404:
+                return {}
+            raise
+
+    def _get_device(self, serial: str | None):
+        """Get a device by serial, or the only device if serial is None."""
+        if serial is None:
+            if len(self._devices) != 1:
+                raise ValueError(
+                    f"A serial is required: the account has {len(self._devices)} devices"
+                )
+            return next(iter(self._devices.values()))
+        try:
+            return self._devices[serial]
+        except KeyError:
+            raise ValueError(f"Unknown device: {serial}") from None
+
+    async def set_mode(self, mode: str, serial: str | None = None) -> bool:
+        """Queue a mode change for a charger.
+
+        Rapid changes are coalesced per charger: only the latest is sent,
+        and not at all if the charger already reports that mode. Returns
+        True if this change was sent to the charger.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if self._device_info_updated is None:
+            await self._refresh_device_info()
+        serial = self._get_device(serial).serial
+
+        queue = self._command_queues.get(serial)
+        if queue is None:
+            queue = self._command_queues[serial] = CommandQueue(
+                partial(self._send_mode, serial),
+                partial(self._reported_mode, serial),
+                self._commands_drained,
+            )
+        return await queue.submit(mode)
+
+    def cancel_commands(self) -> None:
+        """Drop every queued mode change."""
+        for queue in self._command_queues.values():
+            queue.cancel()
+
+    async def _send_mode(self, serial: str, mode: str) -> None:
+        """Send a mode change to a charger."""
+        async with self.metrics.track("set_mode"):
+            await self._set_mode_async(mode, serial)
+        self._check_token()
+
+    def _reported_mode(self, serial: str) -> str | None:
+        """Return the mode in a charger's latest statistics."""
+        device = self._devices.get(serial)
+        mode = (getattr(device, "stats", None) or {}).get("mode")
+        return mode.lower() if isinstance(mode, str) else None
+
+    async def _commands_drained(self) -> None:
+        """Let the owner confirm mode changes once a queue has drained."""
+        if self.commands_drained_callback is not None:
+            await self.commands_drained_callback()
+
+    async def _set_mode_async(self, mode: str, serial: str | None = None) -> None:
         """Set the charger mode (async implementation)."""
-        if self._device is None:
-            await self._client.refresh_device()
-            self._device = self._client.device
+        if self._device_info_updated is None:
+            await self._refresh_device_info()
+        device = self._get_device(serial)
+        # Mode changes go to the active transaction, which a client started
+        # from cached data hasn't read yet
+        if device.id is None:
+            await self._refresh_stats(device)
+        if device.id is None:
+            raise ValueError(
+                f"Charger {device.serial} has no active transaction; "
+                "is a car plugged in?"
+            )
         
         if mode == "idle":
-            await self._device.idle()
+            await device.idle()
         elif mode == "loadmatch":
-            await self._device.load_match()
+            await device.load_match()
         elif mode == "schedule":
-            await self._device.schedule()
+            await device.schedule()
         elif mode == "charge":
-            await self._device.select_charger_mode("CHARGE")
+            await device.select_charger_mode("CHARGE")
         elif mode == "discharge":
-            await self._device.select_charger_mode("DISCHARGE")
+            await device.select_charger_mode("DISCHARGE")
         elif mode == "exportmatch":
             # Use select_charger_mode with EXPORT_MATCH mode
             # Note: This may need to be verified with the actual library
-            await self._device.select_charger_mode("EXPORT_MATCH")
+            await device.select_charger_mode("EXPORT_MATCH")
         else:
             raise ValueError(f"Unknown mode: {mode}")
 
-    async def set_schedule(self) -> None:
+    async def set_schedule(self, serial: str | None = None) -> None:
         """Return to scheduled mode."""
-        await self.set_mode("schedule")
+        await self.set_mode("schedule", serial)
+
+    @property
+    def token(self) -> str | None:
+        """Get the current bearer token."""
+        if self._connection is None:
+            return None
+        return self._connection._bearerToken
+
+    @property
+    def breaker(self):
+        """Get the circuit breaker guarding the API requests."""
+        if self._connection is None:
+            return None
+        return self._connection.breaker
+
+    @property
+    def rate_limiter(self):
+        """Get the request budget shared with other clients, if any."""
+        if self._connection is None:
+            return None
+        return self._connection.limiter
+
+    @property
+    def last_poll(self) -> float | None:
+        """Get the time of the last successful poll, as a Unix timestamp."""
+        return self.metrics.endpoint("poll").last_success
+
+    @property
+    def last_poll_duration(self) -> float | None:
+        """Get how long the last poll took, in seconds."""
+        return self.metrics.endpoint("poll").last_duration
+
+    @property
+    def serials(self) -> list[str]:
+        """Get the serials of all known devices."""
+        return list(self._devices)
 
     @property
     def device(self):
-        """Get the device object."""
-        return self._device
+        """Get the device object, if the account has exactly one."""
+        if len(self._devices) != 1:
+            return None
+        return next(iter(self._devices.values()))
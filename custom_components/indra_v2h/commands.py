@@ -0,0 +1,117 @@
+"""Per-charger command queue for mode changes.
+
+Automations that flap between modes would otherwise send the cloud a write
+for every change. A CommandQueue waits briefly before each write, drops
+writes that a later one supersedes, and skips writes for the mode the
+charger is already in. Once the queue has drained after sending, its
+drained callback runs once so the result can be confirmed with a single
+refresh.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from .const import COMMAND_DEBOUNCE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CommandQueue:
+    """Coalesces the mode writes for one charger."""
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        reported_mode: Callable[[], str | None],
+        drained: Callable[[], Awaitable[None]] | None = None,
+        debounce: float = COMMAND_DEBOUNCE,
+    ) -> None:
+        """Initialize the queue.
+
+        send writes a mode to the charger, reported_mode returns the mode in
+        the charger's latest statistics, and drained is awaited after the
+        queue empties if anything was sent.
+        """
+        self._send = send
+        self._reported_mode = reported_mode
+        self._drained = drained
+        self._debounce = debounce
+        self._pending: str | None = None
+        self._waiters: list[asyncio.Future[bool]] = []
+        # Sent since the last confirming refresh, so newer than reported_mode
+        self._last_sent: str | None = None
+        self._task: asyncio.Task | None = None
+
+    async def submit(self, mode: str) -> bool:
+        """Queue a mode write and wait for its outcome.
+
+        Returns True once the write has been sent, or False if a later write
+        superseded it or the charger is already in that mode.
+        """
+        loop = asyncio.get_running_loop()
+        if mode != self._pending:
+            _resolve(self._waiters, False)
+            self._waiters = []
+            self._pending = mode
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return await waiter
+
+    def cancel(self) -> None:
+        """Drop pending writes and stop the queue."""
+        if self._task is not None:
+            self._task.cancel()
+        for waiter in self._waiters:
+            waiter.cancel()
+        self._pending = None
+        self._waiters = []
+
+    async def _run(self) -> None:
+        """Send queued writes until none are left."""
+        while self._pending is not None:
+            sent = False
+            while self._pending is not None:
+                await asyncio.sleep(self._debounce)
+                mode, waiters = self._pending, self._waiters
+                self._pending, self._waiters = None, []
+
+                if mode == self._current_mode():
+                    _LOGGER.debug("Skipping mode %s: already set", mode)
+                    _resolve(waiters, False)
+                    continue
+                try:
+                    await self._send(mode)
+                except Exception as err:  # noqa: BLE001 - handed to the callers
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(err)
+                    continue
+                self._last_sent = mode
+                sent = True
+                _resolve(waiters, True)
+
+            if sent and self._drained is not None:
+                try:
+                    await self._drained()
+                except Exception:  # noqa: BLE001 - nobody is left to report to
+                    _LOGGER.exception("Error confirming mode change")
+            # The refresh has caught up with what was sent, or failed; in
+            # either case trust the reported mode from now on
+            self._last_sent = None
+
+    def _current_mode(self) -> str | None:
+        """Return the mode the charger is in, as far as we know."""
+        if self._last_sent is not None:
+            return self._last_sent
+        return self._reported_mode()
+
+
+def _resolve(waiters: list[asyncio.Future[bool]], result: bool) -> None:
+    """Set the result of every waiter that is still waiting."""
+    for waiter in waiters:
+        if not waiter.done():
+            waiter.set_result(result)
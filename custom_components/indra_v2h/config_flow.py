@@ -2,16 +2,41 @@
 from __future__ import annotations
 
 import logging
+from functools import partial
 from typing import Any
 
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
-from .const import CONF_EMAIL, CONF_PASSWORD, DOMAIN
+from .const import (
+    CONF_BLOCK_THRESHOLD,
+    CONF_EMAIL,
+    CONF_FAST_INTERVAL,
+    CONF_MAX_CONNECTIONS,
+    CONF_MAX_DATA_AGE,
+    CONF_PASSWORD,
+    CONF_PUBLISH_INTERVAL,
+    CONF_REQUEST_RATE,
+    CONF_SAMPLE_INTERVAL,
+    CONF_SAMPLE_WINDOW,
+    CONF_SLOW_INTERVAL,
+    DATA_HTTP_CLIENT,
+    DEFAULT_BLOCK_THRESHOLD,
+    DEFAULT_FAST_INTERVAL,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_DATA_AGE,
+    DEFAULT_PUBLISH_INTERVAL,
+    DEFAULT_REQUEST_RATE,
+    DEFAULT_SAMPLE_INTERVAL,
+    DEFAULT_SAMPLE_WINDOW,
+    DEFAULT_SLOW_INTERVAL,
+    DOMAIN,
+)
+from .token_cache import async_get_token_cache
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,9 +51,21 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
     try:
-        from .client import IndraV2HClient
-
-        client = IndraV2HClient(data[CONF_EMAIL], data[CONF_PASSWORD])
+        from .client import IndraV2HClient, import_library
+
+        await hass.async_add_executor_job(import_library)
+
+        # Always log in with the password here, but keep the resulting token
+        # so setting up the entry doesn't have to log in again
+        token_cache = await async_get_token_cache(hass)
+        client = IndraV2HClient(
+            data[CONF_EMAIL],
+            data[CONF_PASSWORD],
+            token_callback=partial(token_cache.async_set, data[CONF_EMAIL]),
+            # Share the pool if an entry has created it, but leave creating
+            # it, with the entry's connection limit, to the first entry
+            http_client=hass.data.get(DOMAIN, {}).get(DATA_HTTP_CLIENT),
+        )
         # Test connection by trying to get device info (now async)
         await client.get_device()
         
@@ -43,6 +80,14 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -73,6 +118,72 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
 
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle Indra V2H options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the polling and connection options."""
+        errors = {}
+
+        if user_input is not None:
+            if user_input[CONF_SLOW_INTERVAL] < user_input[CONF_FAST_INTERVAL]:
+                errors["base"] = "slow_below_fast"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_FAST_INTERVAL,
+                    default=options.get(CONF_FAST_INTERVAL, DEFAULT_FAST_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Required(
+                    CONF_SLOW_INTERVAL,
+                    default=options.get(CONF_SLOW_INTERVAL, DEFAULT_SLOW_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Required(
+                    CONF_MAX_CONNECTIONS,
+                    default=options.get(CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+                vol.Required(
+                    CONF_REQUEST_RATE,
+                    default=options.get(CONF_REQUEST_RATE, DEFAULT_REQUEST_RATE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=10, max=1200)),
+                vol.Required(
+                    CONF_MAX_DATA_AGE,
+                    default=options.get(CONF_MAX_DATA_AGE, DEFAULT_MAX_DATA_AGE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=60, max=7 * 24 * 60 * 60)),
+                vol.Required(
+                    CONF_SAMPLE_INTERVAL,
+                    default=options.get(CONF_SAMPLE_INTERVAL, DEFAULT_SAMPLE_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=60)),
+                vol.Required(
+                    CONF_SAMPLE_WINDOW,
+                    default=options.get(CONF_SAMPLE_WINDOW, DEFAULT_SAMPLE_WINDOW),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+                vol.Required(
+                    CONF_PUBLISH_INTERVAL,
+                    default=options.get(
+                        CONF_PUBLISH_INTERVAL, DEFAULT_PUBLISH_INTERVAL
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Required(
+                    CONF_BLOCK_THRESHOLD,
+                    default=options.get(CONF_BLOCK_THRESHOLD, DEFAULT_BLOCK_THRESHOLD),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+            }
+        )
+
+        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
+
+
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
 
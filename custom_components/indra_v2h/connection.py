@@ -0,0 +1,246 @@
+"""Pooled connection for the pyindrav2h library.
+
+pyindrav2h opens a new httpx.AsyncClient, and so a new TLS connection, for
+every API request. IndraV2HConnection sends API requests through a shared,
+keep-alive client instead. Logins still use pyindrav2h's own short-lived
+clients, so portal session cookies never end up in the shared pool.
+
+Every API request is timed and counted per endpoint in a ClientMetrics,
+and sent with the timeout, retries and circuit breaker from resilience.
+Timeouts, connection errors, 5xx responses and 429s are raised as
+TransientErrors so they can be retried. Identical GETs in flight at the
+same time, or within read_share_ttl (READ_SHARE_TTL by default) of each
+other, share one request; any POST makes later GETs go to the cloud
+again. With a RateLimiter, each attempt first waits for a token: POSTs as
+writes, GETs at the priority of the calling context.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import partial
+from typing import Any
+
+import httpx
+from pyindrav2h.connection import Connection
+from pyindrav2h.exceptions import (
+    TimeoutException,
+    V2HException,
+    WrongCredentialsException,
+)
+
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_MAX_RESET_TIMEOUT,
+    BREAKER_RESET_TIMEOUT,
+    READ_SHARE_TTL,
+    REQUEST_TIMEOUT,
+    RETRY_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+)
+from .metrics import ClientMetrics
+from .ratelimit import PRIORITY_WRITE, RateLimiter, request_priority
+from .resilience import (
+    CircuitBreaker,
+    RetryPolicy,
+    TransientError,
+    async_call_with_retry,
+)
+from .singleflight import SingleFlight
+
+_LOGGER = logging.getLogger(__name__)
+
+# Replace IDs in API paths so each endpoint gets a single metrics entry
+_PATH_IDS = (
+    (re.compile(r"^/telemetry/devices/[^/]+/"), "/telemetry/devices/{serial}/"),
+    (
+        re.compile(r"^/transactions/[^/]+/[^/]+/active$"),
+        "/transactions/{serial}/{transaction}/active",
+    ),
+    (re.compile(r"^/transactions/[^/]+/interrupt/"), "/transactions/{id}/interrupt/"),
+)
+
+
+class ServerError(TransientError, V2HException):
+    """The API answered with a 5xx or 429 status."""
+
+    def __init__(self, code: int, retry_after: float | None = None) -> None:
+        """Initialize the error."""
+        super().__init__(code)
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        """Return the status."""
+        return f"HTTP {self.code}"
+
+
+class RequestTimeout(TransientError, TimeoutException):
+    """An API request timed out."""
+
+    def __str__(self) -> str:
+        """Describe the error."""
+        return "Request timed out"
+
+
+class RequestConnectionError(TransientError, V2HException):
+    """An API request failed before the API answered."""
+
+    def __str__(self) -> str:
+        """Return the underlying error's name."""
+        return self.message
+
+
+def default_retry_policy() -> RetryPolicy:
+    """Return the retry policy for API requests."""
+    return RetryPolicy(
+        REQUEST_TIMEOUT, RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+    )
+
+
+def default_circuit_breaker() -> CircuitBreaker:
+    """Return a circuit breaker for one client's API requests."""
+    return CircuitBreaker(
+        BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT, BREAKER_MAX_RESET_TIMEOUT
+    )
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Return the metrics name of an API request, e.g. "GET /devices"."""
+    for pattern, replacement in _PATH_IDS:
+        url = pattern.sub(replacement, url)
+    return f"{method} {url}"
+
+
+class IndraV2HConnection(Connection):
+    """pyindrav2h Connection that reuses a shared HTTP client."""
+
+    def __init__(
+        self,
+        email: str,
+        password: str,
+        http_client: httpx.AsyncClient | None = None,
+        metrics: ClientMetrics | None = None,
+        breaker: CircuitBreaker | None = None,
+        retry_policy: RetryPolicy | None = None,
+        limiter: RateLimiter | None = None,
+        read_share_ttl: float = READ_SHARE_TTL,
+    ) -> None:
+        """Initialize the connection."""
+        super().__init__(email, password)
+        self.limiter = limiter
+        self._http_client = http_client
+        self.metrics = metrics or ClientMetrics()
+        self.breaker = breaker or default_circuit_breaker()
+        self.retry_policy = retry_policy or default_retry_policy()
+        self.reads = SingleFlight(read_share_ttl, self.metrics)
+
+    async def get(self, url: str, data: Any = None) -> Any:
+        """Send a GET request to the API, or share an identical one."""
+        return await self.reads.call(
+            url, partial(self._request, "GET", super().get, url, data)
+        )
+
+    async def post(self, url: str, data: Any = None) -> Any:
+        """Send a POST request to the API."""
+        self.reads.invalidate()
+        try:
+            return await self._request("POST", super().post, url, data)
+        finally:
+            # Reads sent while the POST was in flight may predate it
+            self.reads.invalidate()
+
+    async def _request(
+        self,
+        method: str,
+        send: Callable[[str, Any], Awaitable[Any]],
+        url: str,
+        data: Any,
+    ) -> Any:
+        """Send a request with retries, timing each attempt."""
+        name = endpoint_name(method, url)
+
+        async def attempt() -> Any:
+            async with self.metrics.track(name):
+                return await send(url, data)
+
+        return await async_call_with_retry(
+            attempt,
+            self.retry_policy,
+            self.breaker,
+            self.metrics,
+            self.limiter,
+            PRIORITY_WRITE if method == "POST" else request_priority.get(),
+        )
+
+    async def updateBearerAuth(self) -> None:
+        """Log in to obtain a new bearer token.
+
+        pyindrav2h logs in with clients of its own, so their failures to
+        reach the portal are raised as TransientErrors here.
+        """
+        self.metrics.auth_refreshes += 1
+        async with self.metrics.track("login"):
+            try:
+                await super().updateBearerAuth()
+            except (httpx.TimeoutException, TimeoutException) as err:
+                raise RequestTimeout() from err
+            except httpx.TransportError as err:
+                raise RequestConnectionError(type(err).__name__) from err
+
+    async def send(self, method: str, url: str, json: Any = None) -> Any:
+        """Send an API request, logging in again if the token is rejected."""
+        if self._http_client is None:
+            return await super().send(method, url, json)
+
+        if self._bearerToken is None:
+            _LOGGER.debug("Missing BearerToken - calling updateBearerAuth()")
+            await self.updateBearerAuth()
+
+        for attempt in range(self._authRetries):
+            _LOGGER.debug("%s %s Attempt: %s", method, url, attempt)
+            try:
+                response = await self._http_client.request(
+                    method, url, json=json, headers=self._headers, timeout=self.timeout
+                )
+            except httpx.TimeoutException as err:
+                raise RequestTimeout() from err
+            except httpx.TransportError as err:
+                raise RequestConnectionError(type(err).__name__) from err
+
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code == 202:
+                return True
+            if response.status_code == 401 and attempt < self._authRetries - 1:
+                self.metrics.retries += 1
+                await self.updateBearerAuth()
+                continue
+            if response.status_code == 401:
+                raise WrongCredentialsException()
+            if response.status_code == 429 or response.status_code >= 500:
+                raise ServerError(
+                    response.status_code,
+                    _retry_after(response.headers.get("Retry-After")),
+                )
+            raise V2HException(response.status_code)
+
+
+def _retry_after(value: str | None) -> float | None:
+    """Return the seconds to wait from a Retry-After header."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
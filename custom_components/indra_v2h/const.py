@@ -20,12 +20,94 @@ MODES = [
     MODE_SCHEDULE,
 ]
 
+# Modes in which the charger is commanded to move power
+ACTIVE_MODES = {MODE_CHARGE, MODE_DISCHARGE}
+
 # Configuration keys
 CONF_EMAIL = "email"
 CONF_PASSWORD = "password"
 
+# Option keys
+CONF_FAST_INTERVAL = "fast_interval"
+CONF_SLOW_INTERVAL = "slow_interval"
+CONF_MAX_CONNECTIONS = "max_connections"
+CONF_REQUEST_RATE = "request_rate"
+CONF_MAX_DATA_AGE = "max_data_age"
+CONF_SAMPLE_INTERVAL = "sample_interval"
+CONF_SAMPLE_WINDOW = "sample_window"
+CONF_PUBLISH_INTERVAL = "publish_interval"
+CONF_BLOCK_THRESHOLD = "block_threshold"
+
 # Update intervals
 UPDATE_INTERVAL = 60  # seconds
+DEFAULT_FAST_INTERVAL = 15  # seconds; used while power is flowing
+DEFAULT_SLOW_INTERVAL = 300  # seconds; ceiling for the idle back-off
+DEFAULT_MAX_DATA_AGE = 60 * 60  # seconds; stale data is shown until this old
+BURST_INTERVAL = 5  # seconds between polls right after a mode change
+BURST_POLLS = 3
+POWER_ACTIVE_THRESHOLD = 50  # watts; below this the charger counts as idle
+POLL_JITTER = 1  # seconds; most random delay added to a planned poll
+DEVICE_INFO_TTL = 6 * 60 * 60  # seconds; model/serial/firmware rarely change
+
+# Fast power sampling
+DEFAULT_SAMPLE_INTERVAL = 0  # seconds; 0 turns fast sampling off
+DEFAULT_SAMPLE_WINDOW = 5  # minutes aggregated by the power statistics sensors
+DEFAULT_PUBLISH_INTERVAL = 60  # seconds between power statistics updates
+
+# Energy meters
+METER_MAX_GAP = 60 * 60  # seconds; power isn't integrated over longer gaps
+
+# Mode commands
+COMMAND_DEBOUNCE = 0.5  # seconds to wait for a superseding mode change
+MODE_CONFIRM_INTERVAL = 2  # seconds between polls confirming a mode change
+MODE_CONFIRM_TIMEOUT = 30  # seconds; roll back unconfirmed mode changes after this
+
+# Optimiser defaults
+DEFAULT_TARGET_SOC = 80  # %
+DEFAULT_MIN_SOC = 20  # %
+DEFAULT_CHARGE_POWER = 7.0  # kW
+DEFAULT_DISCHARGE_POWER = 7.0  # kW
+DEFAULT_EFFICIENCY = 0.9  # one-way
+DEFAULT_PRICE_ATTRIBUTE = "rates"
+
+# API request retries and circuit breaker
+REQUEST_TIMEOUT = 30  # seconds per attempt, including any login
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1  # seconds; doubled after each attempt, with full jitter
+RETRY_MAX_DELAY = 30  # seconds; longer Retry-After waits aren't retried
+BREAKER_FAILURE_THRESHOLD = 5  # transient failures in a row before opening
+BREAKER_RESET_TIMEOUT = 30  # seconds before the first recovery probe
+BREAKER_MAX_RESET_TIMEOUT = 10 * 60  # seconds; ceiling for the probe back-off
+READ_SHARE_TTL = 1  # seconds an API read's result answers identical reads
+
+# Profiling
+DEFAULT_PROFILE_CYCLES = 5
+DEFAULT_BLOCK_THRESHOLD = 0  # seconds; 0 watches the loop only while profiling
+WATCHDOG_KEEP_BLOCKS = 20  # loop blocks kept for diagnostics by the option
+PROFILE_TOP_FUNCTIONS = 40  # functions listed in each cProfile table
+PROFILE_TOP_ALLOCATIONS = 25  # lines listed in the tracemalloc diff
+
+# Shared HTTP connection pool and request budget
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_REQUEST_RATE = 120  # API requests per minute across all entries
+REQUEST_BURST = 20  # requests that can go out at once after a quiet spell
+
+# Authentication
+DEFAULT_TOKEN_TTL = 60 * 60  # seconds; used if a token has no readable expiry
+TOKEN_EXPIRY_MARGIN = 5 * 60  # seconds; discard cached tokens this close to expiry
+
+# Domain-level hass.data keys; per-entry coordinators are keyed by entry_id
+DATA_SERVICES_REGISTERED = "_services_registered"
+DATA_TOKEN_CACHE = "_token_cache"
+DATA_HTTP_CLIENT = "_http_client"
+DATA_HTTP_CLIENT_UNSUB = "_http_client_unsub"
+DATA_RATE_LIMITER = "_rate_limiter"
+DATA_POLL_PLANNER = "_poll_planner"
+DATA_PROFILING = "_profiling"
+
+# IDs used before entities were keyed by charger serial
+LEGACY_DEVICE_ID = "indra_v2h_charger"
+LEGACY_UNIQUE_ID_PREFIX = "indra_v2h_"
 
 # Device attributes
 ATTR_DEVICE_ID = "device_id"
@@ -33,4 +115,15 @@ ATTR_MODE = "mode"
 ATTR_POWER = "power"
 ATTR_ENERGY = "energy"
 ATTR_STATUS = "status"
+ATTR_STALE = "stale"
+ATTR_DATA_UPDATED = "data_updated"
+
+# Schedule window attributes
+ATTR_WINDOW_ID = "window_id"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_DAILY = "daily"
+
+# Power statistics attributes
+ATTR_SAMPLES = "samples"
 
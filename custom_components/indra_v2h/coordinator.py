@@ -1,13 +1,44 @@
 """Data update coordinator for Indra V2H."""
 from __future__ import annotations
 
+import asyncio
 import logging
-from datetime import timedelta
+import time
+from collections.abc import Iterable, Mapping
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_track_point_in_utc_time
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .const import UPDATE_INTERVAL
+from .const import (
+    ACTIVE_MODES,
+    BURST_INTERVAL,
+    BURST_POLLS,
+    CONF_FAST_INTERVAL,
+    CONF_MAX_DATA_AGE,
+    CONF_SLOW_INTERVAL,
+    DEFAULT_FAST_INTERVAL,
+    DEFAULT_MAX_DATA_AGE,
+    DEFAULT_SLOW_INTERVAL,
+    MODE_CONFIRM_INTERVAL,
+    MODE_CONFIRM_TIMEOUT,
+    POWER_ACTIVE_THRESHOLD,
+    UPDATE_INTERVAL,
+)
+from .snapshot import IndraV2HSnapshot
+
+if TYPE_CHECKING:
+    from .backfill import IndraV2HStatistics
+    from .cache import IndraV2HDataCache
+    from .optimiser import IndraV2HOptimiser
+    from .planner import PollSlot
+    from .profiler import AwaitTimings, LoopWatchdog
+    from .sampling import IndraV2HSampler
+    from .scheduler import IndraV2HScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,7 +46,12 @@ _LOGGER = logging.getLogger(__name__)
 class IndraV2HDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching Indra V2H data."""
 
-    def __init__(self, hass: HomeAssistant, client) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client,
+        options: Mapping[str, Any] | None = None,
+    ) -> None:
         """Initialize."""
         super().__init__(
             hass,
@@ -23,24 +59,313 @@ class IndraV2HDataUpdateCoordinator(DataUpdateCoordinator):
             name="Indra V2H",
             update_interval=timedelta(seconds=UPDATE_INTERVAL),
         )
+        options = options or {}
         self.client = client
-        self.device_data = {}
-        self.statistics_data = {}
+        self.fast_interval = timedelta(
+            seconds=options.get(CONF_FAST_INTERVAL, DEFAULT_FAST_INTERVAL)
+        )
+        self.slow_interval = timedelta(
+            seconds=options.get(CONF_SLOW_INTERVAL, DEFAULT_SLOW_INTERVAL)
+        )
+        self.max_data_age = timedelta(
+            seconds=options.get(CONF_MAX_DATA_AGE, DEFAULT_MAX_DATA_AGE)
+        )
+        # When the data was fetched, and whether the latest fetch failed or
+        # the data came from the cache
+        self.data_updated: datetime | None = None
+        self.stale = False
+        self._unsub_expiry: CALLBACK_TYPE | None = None
+        self._idle_polls = 0
+        self._burst_remaining = 0
+        # Interval picked for the last poll, before fitting it to the slot
+        self.poll_interval = self.update_interval
+        # This entry's place in the poll plan shared by all entries
+        self.poll_slot: PollSlot | None = None
+        self.snapshots: dict[str, IndraV2HSnapshot] = {}
+        self._changed_fields: dict[str, set[str]] = {}
+        # Requested modes shown until the charger confirms or times out
+        self.optimistic_modes: dict[str, str] = {}
+        self._mode_requests: dict[str, object] = {}
+        # Entity ID -> charger serial of this entry's entities, kept by the
+        # entities as they are added and removed; routes service calls
+        self.entity_serials: dict[str, str] = {}
+        # Set up once the first refresh has found the chargers
+        self.scheduler: IndraV2HScheduler | None = None
+        self.optimiser: IndraV2HOptimiser | None = None
+        # Saves each update's data for the next start
+        self.cache: IndraV2HDataCache | None = None
+        # Samples power every few seconds, if turned on in the options
+        self.sampler: IndraV2HSampler | None = None
+        # Imports hourly energy statistics, if the recorder is loaded
+        self.energy_statistics: IndraV2HStatistics | None = None
+        # Watches the event loop, with the client's await timings, if a block
+        # threshold is set in the options
+        self.watchdog: LoopWatchdog | None = None
+        self.await_timings: dict[str, AwaitTimings] = {}
+        client.commands_drained_callback = self._async_confirm_mode_change
+        # Failed polls after the first don't notify listeners, so show
+        # breaker changes straight away
+        client.breaker.state_callback = self._handle_breaker_state
 
     async def _async_update_data(self):
-        """Fetch data from Indra V2H API."""
+        """Fetch data from Indra V2H API.
+
+        Returns a dict keyed by device serial, each holding that device's
+        "device" info and "statistics".
+        """
         try:
-            # Fetch device info and statistics (these are now async)
-            device_data = await self.client.get_device()
-            statistics_data = await self.client.get_statistics()
-            
-            self.device_data = device_data if device_data else {}
-            self.statistics_data = statistics_data if statistics_data else {}
-            
-            return {
-                "device": self.device_data,
-                "statistics": self.statistics_data,
-            }
+            # Fetch device info and statistics for all devices in one pass
+            data = await self.client.fetch_data()
         except Exception as err:
+            # Entities keep the last data until it is older than max_data_age
+            self._async_set_stale()
+            self.update_interval = self._in_slot(self.poll_interval)
             raise UpdateFailed(f"Error communicating with Indra V2H API: {err}") from err
 
+        data = {
+            serial: {
+                "device": device_data["device"] or {},
+                "statistics": device_data["statistics"] or {},
+            }
+            for serial, device_data in data.items()
+        }
+        self._update_snapshots(data)
+        self.poll_interval = self._next_update_interval(data)
+        self.update_interval = self._in_slot(self.poll_interval)
+        self.data_updated = dt_util.utcnow()
+        self.stale = False
+        self._async_cancel_expiry()
+        if self.cache is not None:
+            self.cache.async_save(data)
+        if self.energy_statistics is not None:
+            self.energy_statistics.async_add_readings()
+        return data
+
+    @callback
+    def async_restore(self, data: dict[str, Any], updated: datetime) -> None:
+        """Start from data cached by an earlier run, until the first refresh."""
+        self._update_snapshots(data)
+        self.data = data
+        self.data_updated = updated
+        self.last_update_success = True
+        self._async_set_stale()
+
+    @property
+    def data_usable(self) -> bool:
+        """Return True if the data is fresh, or stale but within max_data_age."""
+        if self.data is None:
+            return False
+        if not self.stale:
+            return True
+        return (
+            self.data_updated is not None
+            and dt_util.utcnow() - self.data_updated < self.max_data_age
+        )
+
+    @callback
+    def _handle_breaker_state(self, state: str) -> None:
+        """Update entities when the client's circuit breaker changes state."""
+        self.async_update_listeners()
+
+    @callback
+    def _async_set_stale(self) -> None:
+        """Mark the data stale and make entities unavailable once it is too old.
+
+        The coordinator doesn't notify listeners of repeated failed updates,
+        so a timer does it when the data passes max_data_age.
+        """
+        self.stale = True
+        if self._unsub_expiry is not None or self.data_updated is None:
+            return
+        self._unsub_expiry = async_track_point_in_utc_time(
+            self.hass, self._async_handle_expiry, self.data_updated + self.max_data_age
+        )
+
+    @callback
+    def _async_handle_expiry(self, now: datetime) -> None:
+        """Make entities unavailable now the stale data is too old."""
+        self._unsub_expiry = None
+        self.async_update_listeners()
+
+    @callback
+    def _async_cancel_expiry(self) -> None:
+        """Cancel the stale data timer."""
+        if self._unsub_expiry is not None:
+            self._unsub_expiry()
+            self._unsub_expiry = None
+
+    def fields_changed(self, serial: str, fields: Iterable[str]) -> bool:
+        """Return True if any of a charger's fields changed in the last update.
+
+        Fields are IndraV2HSnapshot keys, for example "power" or "firmware".
+        """
+        changed = self._changed_fields.get(serial)
+        return bool(changed) and not changed.isdisjoint(fields)
+
+    def _update_snapshots(self, data: dict[str, Any]) -> None:
+        """Resolve every charger's fields and note which ones changed."""
+        snapshots = {
+            serial: IndraV2HSnapshot(device_data)
+            for serial, device_data in data.items()
+        }
+        self._changed_fields = {
+            serial: snapshot.changed_fields(self.snapshots.get(serial))
+            for serial, snapshot in snapshots.items()
+        }
+        self.snapshots = snapshots
+
+    async def async_set_mode(self, serial: str, mode: str) -> bool:
+        """Change a charger's mode and wait until the charger confirms it.
+
+        The requested mode is shown straight away, then confirmed with
+        polls of just this charger. If the charger still reports another
+        mode after MODE_CONFIRM_TIMEOUT, the change is rolled back and
+        HomeAssistantError is raised. The client coalesces rapid changes and
+        skips redundant ones; returns True if this change was sent rather
+        than dropped.
+        """
+        request = object()
+        self._mode_requests[serial] = request
+        self._async_set_optimistic_mode(serial, mode)
+        try:
+            sent = await self.client.set_mode(mode, serial)
+            if sent:
+                await self._async_confirm_mode(serial, mode, request)
+        finally:
+            # Leave the optimistic mode to a newer request, if there is one
+            if self._mode_requests.get(serial) is request:
+                del self._mode_requests[serial]
+                self._async_set_optimistic_mode(serial, None)
+        return sent
+
+    async def _async_confirm_mode(
+        self, serial: str, mode: str, request: object
+    ) -> None:
+        """Poll a charger until it reports a mode, unless superseded."""
+        deadline = time.monotonic() + MODE_CONFIRM_TIMEOUT
+        while self._reported_mode(serial) != mode:
+            if time.monotonic() >= deadline:
+                raise HomeAssistantError(
+                    f"Charger {serial} did not switch to {mode} "
+                    f"within {MODE_CONFIRM_TIMEOUT} seconds"
+                )
+            await asyncio.sleep(MODE_CONFIRM_INTERVAL)
+            if self._mode_requests.get(serial) is not request:
+                return
+            try:
+                statistics = await self.client.get_statistics(serial)
+            except Exception as err:  # noqa: BLE001 - retried until the deadline
+                _LOGGER.debug("Error confirming mode of %s: %s", serial, err)
+                continue
+            self._async_set_statistics(serial, statistics)
+
+    def _reported_mode(self, serial: str) -> str | None:
+        """Return the mode a charger last reported."""
+        snapshot = self.snapshots.get(serial)
+        return snapshot.mode if snapshot is not None else None
+
+    @callback
+    def _async_set_optimistic_mode(self, serial: str, mode: str | None) -> None:
+        """Show or clear a requested mode ahead of the charger confirming it."""
+        if mode is None:
+            self.optimistic_modes.pop(serial, None)
+        else:
+            self.optimistic_modes[serial] = mode
+        # Entities skip writes for unchanged fields; keep what the last
+        # update changed so none of it is lost
+        self._changed_fields = {
+            **self._changed_fields,
+            serial: self._changed_fields.get(serial, set()) | {"mode"},
+        }
+        self.async_update_listeners()
+
+    @callback
+    def _async_set_statistics(
+        self, serial: str, statistics: dict[str, Any] | None
+    ) -> None:
+        """Update one charger's statistics from a targeted poll."""
+        if not self.data or serial not in self.data:
+            return
+        data = {
+            **self.data,
+            serial: {**self.data[serial], "statistics": statistics or {}},
+        }
+        self._update_snapshots(data)
+        self.async_set_updated_data(data)
+
+    async def async_shutdown(self) -> None:
+        """Stop schedules, drop queued mode changes and stop polling."""
+        if self.optimiser is not None:
+            self.optimiser.async_stop_following()
+        if self.scheduler is not None:
+            self.scheduler.async_stop()
+        if self.sampler is not None:
+            self.sampler.async_stop()
+        if self.poll_slot is not None:
+            self.poll_slot.async_release()
+        self.client.cancel_commands()
+        self._async_cancel_expiry()
+        if self.energy_statistics is not None:
+            await self.energy_statistics.async_stop()
+        await super().async_shutdown()
+
+    async def _async_confirm_mode_change(self) -> None:
+        """Refresh once queued mode changes are sent, then poll quickly."""
+        self._burst_remaining = BURST_POLLS
+        self._idle_polls = 0
+        self.update_interval = timedelta(seconds=BURST_INTERVAL)
+        await self.async_refresh()
+
+    async def async_refresh_in_slot(self) -> None:
+        """Refresh at the next point in this entry's slot."""
+        if self.poll_slot is not None:
+            await asyncio.sleep(self._in_slot(self.fast_interval, 0).total_seconds())
+        await self.async_refresh()
+
+    def _in_slot(self, interval: timedelta, minimum: float | None = None) -> timedelta:
+        """Fit an interval so the next poll falls in this entry's slot.
+
+        Bursts after a mode change, shorter than the fast interval, aren't
+        moved, so they follow the change straight away.
+        """
+        if self.poll_slot is None or interval < self.fast_interval:
+            return interval
+        # Polls are scheduled from the whole second of the loop's clock
+        delay = self.poll_slot.delay(
+            int(self.hass.loop.time()), interval.total_seconds(), minimum
+        )
+        return timedelta(seconds=delay)
+
+    def _next_update_interval(self, data: dict[str, Any]) -> timedelta:
+        """Pick the next poll interval from the chargers' current activity.
+
+        Poll at the fast interval while power is flowing on any charger, in
+        short bursts after a mode change, and otherwise back off exponentially
+        from the fast interval up to the slow interval.
+        """
+        if self._burst_remaining > 0:
+            self._burst_remaining -= 1
+            return timedelta(seconds=BURST_INTERVAL)
+
+        if any(self._is_active(device["statistics"]) for device in data.values()):
+            self._idle_polls = 0
+            return self.fast_interval
+
+        # Stop counting at the slow interval, so the back-off can't overflow
+        if self.fast_interval * (2 ** self._idle_polls) < self.slow_interval:
+            self._idle_polls += 1
+        return min(self.fast_interval * (2 ** self._idle_polls), self.slow_interval)
+
+    @staticmethod
+    def _is_active(statistics: dict[str, Any]) -> bool:
+        """Return True if a charger is moving power or commanded to."""
+        mode = statistics.get("mode")
+        if isinstance(mode, str) and mode.lower() in ACTIVE_MODES:
+            return True
+
+        power = (statistics.get("data") or {}).get("powerToEv")
+        try:
+            return abs(float(power)) >= POWER_ACTIVE_THRESHOLD
+        except (TypeError, ValueError):
+            return False
+
@@ -0,0 +1,357 @@
+"""Sensor descriptions for the Indra V2H integration.
+
+Each description names where its value lives in a charger's data and how
+to convert it. The coordinator resolves all of them once per update into
+an IndraV2HSnapshot, so entities never parse the raw payload themselves.
+Client sensors instead report on the client's own request metrics, and
+schedule sensors on the charger's schedule windows.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfElectricCurrent,
+    UnitOfElectricPotential,
+    UnitOfEnergy,
+    UnitOfFrequency,
+    UnitOfPower,
+    UnitOfTemperature,
+    UnitOfTime,
+)
+from homeassistant.helpers.typing import StateType
+from homeassistant.util import dt as dt_util
+
+from .const import MODE_SCHEDULE, MODES
+from .resilience import BREAKER_STATES
+
+
+def _kilo(value: Any) -> float:
+    """Convert W or Wh to kW or kWh."""
+    return float(value) / 1000.0
+
+
+def _text(value: Any) -> str:
+    """Convert a value to a string."""
+    return str(value)
+
+
+def _number(value: Any) -> float:
+    """Convert a value to a float."""
+    return float(value)
+
+
+def _timestamp(value: Any) -> datetime | None:
+    """Convert an ISO 8601 string to an aware datetime, assuming UTC."""
+    parsed = dt_util.parse_datetime(str(value))
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_util.UTC)
+    return parsed
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    """Convert seconds to milliseconds."""
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _unix_timestamp(value: float | None) -> datetime | None:
+    """Convert a Unix timestamp to an aware datetime."""
+    return None if value is None else dt_util.utc_from_timestamp(value)
+
+
+def _status(statistics: dict[str, Any]) -> str:
+    """Return the charger state, falling back to its mode."""
+    return str(statistics.get("state") or statistics.get("mode") or "unknown")
+
+
+@dataclass(frozen=True, kw_only=True)
+class IndraV2HSensorEntityDescription(SensorEntityDescription):
+    """Describes an Indra V2H sensor and where its value comes from."""
+
+    # Keys into a charger's data, e.g. ("statistics", "data", "powerToEv")
+    path: tuple[str, ...]
+    # Applied to the value at path unless it is missing
+    converter: Callable[[Any], Any] = _text
+    # For energy counters shown as local meters: the sign of the power
+    # integrated while the counter is missing
+    meter_sign: int | None = None
+
+
+SENSOR_DESCRIPTIONS: tuple[IndraV2HSensorEntityDescription, ...] = (
+    IndraV2HSensorEntityDescription(
+        key="power",
+        name="Power",
+        path=("statistics", "data", "powerToEv"),
+        converter=_kilo,
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:lightning-bolt",
+    ),
+    IndraV2HSensorEntityDescription(
+        key="energy_to_ev",
+        name="Energy to EV",
+        path=("statistics", "data", "activeEnergyToEv"),
+        converter=_kilo,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:counter",
+        meter_sign=1,
+    ),
+    IndraV2HSensorEntityDescription(
+        key="energy_from_ev",
+        name="Energy from EV",
+        path=("statistics", "data", "activeEnergyFromEv"),
+        converter=_kilo,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:counter",
+        meter_sign=-1,
+    ),
+    IndraV2HSensorEntityDescription(
+        key="house_load",
+        name="House load",
+        # Positive while the house imports, negative while it exports
+        path=("statistics", "data", "ctClamp"),
+        converter=_kilo,
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:home-lightning-bolt",
+    ),
+    IndraV2HSensorEntityDescription(
+        key="voltage",
+        name="Voltage",
+        path=("statistics", "data", "voltage"),
+        converter=_number,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        device_class=SensorDeviceClass.VOLTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    IndraV2HSensorEntityDescription(
+        key="current",
+        name="Current",
+        path=("statistics", "data", "current"),
+        converter=_number,
+        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+        device_class=SensorDeviceClass.CURRENT,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    IndraV2HSensorEntityDescription(
+        key="frequency",
+        name="Frequency",
+        path=("statistics", "data", "freq"),
+        converter=_number,
+        native_unit_of_measurement=UnitOfFrequency.HERTZ,
+        device_class=SensorDeviceClass.FREQUENCY,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    IndraV2HSensorEntityDescription(
+        key="temperature",
+        name="Temperature",
+        path=("statistics", "data", "temp"),
+        converter=_number,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        device_class=SensorDeviceClass.TEMPERATURE,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    IndraV2HSensorEntityDescription(
+        key="soc",
+        name="Vehicle state of charge",
+        path=("statistics", "data", "soc"),
+        converter=_number,
+        native_unit_of_measurement=PERCENTAGE,
+        device_class=SensorDeviceClass.BATTERY,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    IndraV2HSensorEntityDescription(
+        key="boosting",
+        name="Boosting",
+        path=("statistics", "isBoosting"),
+        icon="mdi:rocket-launch",
+    ),
+    IndraV2HSensorEntityDescription(
+        key="last_telemetry",
+        name="Last telemetry",
+        path=("statistics", "time"),
+        converter=_timestamp,
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    IndraV2HSensorEntityDescription(
+        key="status",
+        name="Status",
+        path=("statistics",),
+        converter=_status,
+        icon="mdi:information",
+    ),
+    IndraV2HSensorEntityDescription(
+        key="model",
+        name="Model",
+        path=("device", "model"),
+        icon="mdi:information-outline",
+    ),
+    IndraV2HSensorEntityDescription(
+        key="serial",
+        name="Serial",
+        path=("device", "deviceUID"),
+        icon="mdi:information-outline",
+    ),
+    IndraV2HSensorEntityDescription(
+        key="firmware",
+        name="Firmware",
+        path=("device", "firmware"),
+        icon="mdi:information-outline",
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class IndraV2HClientSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor reporting on the client rather than the charger."""
+
+    # Called with the IndraV2HClient
+    value_fn: Callable[[Any], StateType | datetime]
+
+
+CLIENT_SENSOR_DESCRIPTIONS: tuple[IndraV2HClientSensorEntityDescription, ...] = (
+    IndraV2HClientSensorEntityDescription(
+        key="poll_latency",
+        name="Poll latency",
+        value_fn=lambda client: _milliseconds(client.last_poll_duration),
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        icon="mdi:timer-outline",
+    ),
+    IndraV2HClientSensorEntityDescription(
+        key="last_poll",
+        name="Last successful poll",
+        # Shown as the age of the data by the frontend
+        value_fn=lambda client: _unix_timestamp(client.last_poll),
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+    ),
+    IndraV2HClientSensorEntityDescription(
+        key="circuit_breaker",
+        name="Cloud circuit breaker",
+        value_fn=lambda client: client.breaker.state,
+        device_class=SensorDeviceClass.ENUM,
+        options=BREAKER_STATES,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        icon="mdi:electric-switch",
+    ),
+    IndraV2HClientSensorEntityDescription(
+        key="request_budget",
+        name="API request budget used",
+        # Over the last minute, shared by every Indra V2H entry
+        value_fn=lambda client: (
+            client.rate_limiter.usage if client.rate_limiter else None
+        ),
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        # Changes with every poll, so off unless wanted
+        entity_registry_enabled_default=False,
+        icon="mdi:speedometer",
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class IndraV2HPowerStatsSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor aggregating a charger's fast power samples."""
+
+    # Called with the PowerAggregates over the sampling window
+    value_fn: Callable[[Any], StateType]
+
+
+POWER_STATS_SENSOR_DESCRIPTIONS: tuple[
+    IndraV2HPowerStatsSensorEntityDescription, ...
+] = (
+    IndraV2HPowerStatsSensorEntityDescription(
+        key="power_min",
+        name="Power minimum",
+        value_fn=lambda aggregates: aggregates.min_power,
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:arrow-collapse-down",
+    ),
+    IndraV2HPowerStatsSensorEntityDescription(
+        key="power_max",
+        name="Power maximum",
+        value_fn=lambda aggregates: aggregates.max_power,
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:arrow-collapse-up",
+    ),
+    IndraV2HPowerStatsSensorEntityDescription(
+        key="power_mean",
+        name="Power mean",
+        value_fn=lambda aggregates: aggregates.mean_power,
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:lightning-bolt-outline",
+    ),
+    IndraV2HPowerStatsSensorEntityDescription(
+        key="window_energy",
+        name="Energy over window",
+        # Net energy to the EV; negative while discharging
+        value_fn=lambda aggregates: aggregates.energy,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        icon="mdi:sigma",
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class IndraV2HScheduleSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor showing one of a charger's schedule windows."""
+
+    # Called with the IndraV2HScheduler and a serial; returns a window with
+    # its start and end, or None
+    window_fn: Callable[[Any, str], tuple[Any, datetime, datetime] | None]
+    # Called with the window, its start and its end
+    value_fn: Callable[[Any, datetime, datetime], StateType | datetime]
+
+
+SCHEDULE_SENSOR_DESCRIPTIONS: tuple[IndraV2HScheduleSensorEntityDescription, ...] = (
+    IndraV2HScheduleSensorEntityDescription(
+        key="active_window",
+        name="Active schedule window",
+        window_fn=lambda scheduler, serial: scheduler.active_window(serial),
+        value_fn=lambda window, start, end: window.mode,
+        device_class=SensorDeviceClass.ENUM,
+        options=[mode for mode in MODES if mode != MODE_SCHEDULE],
+        icon="mdi:calendar-clock",
+    ),
+    IndraV2HScheduleSensorEntityDescription(
+        key="next_window",
+        name="Next schedule window",
+        window_fn=lambda scheduler, serial: scheduler.next_window(serial),
+        value_fn=lambda window, start, end: start,
+        device_class=SensorDeviceClass.TIMESTAMP,
+        icon="mdi:calendar-arrow-right",
+    ),
+)
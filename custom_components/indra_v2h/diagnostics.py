@@ -0,0 +1,88 @@
+"""Diagnostics support for Indra V2H."""
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_EMAIL, CONF_PASSWORD, DOMAIN
+from .coordinator import IndraV2HDataUpdateCoordinator
+
+TO_REDACT = {
+    CONF_EMAIL,
+    CONF_PASSWORD,
+    "title",
+    "unique_id",
+    "token",
+    # Chargers' identities and whereabouts in the API's device data
+    "deviceUID",
+    "serial",
+    "serialNumber",
+    "name",
+    "location",
+    "address",
+    "postcode",
+    "latitude",
+    "longitude",
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: IndraV2HDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "stale": coordinator.stale,
+            "data_updated": (
+                coordinator.data_updated.isoformat()
+                if coordinator.data_updated
+                else None
+            ),
+            "max_data_age": coordinator.max_data_age.total_seconds(),
+            "update_interval": (
+                coordinator.update_interval.total_seconds()
+                if coordinator.update_interval
+                else None
+            ),
+            "poll_interval": coordinator.poll_interval.total_seconds(),
+            "poll_slot": (
+                coordinator.poll_slot.as_dict() if coordinator.poll_slot else None
+            ),
+            "fast_interval": coordinator.fast_interval.total_seconds(),
+            "slow_interval": coordinator.slow_interval.total_seconds(),
+        },
+        "client": coordinator.client.metrics.as_dict(),
+        "circuit_breaker": coordinator.client.breaker.as_dict(),
+        "rate_limiter": (
+            coordinator.client.rate_limiter.as_dict()
+            if coordinator.client.rate_limiter
+            else None
+        ),
+        "watchdog": (
+            {
+                "block_threshold": coordinator.watchdog.threshold,
+                "loop_blocks": [
+                    asdict(block) for block in list(coordinator.watchdog.blocks)
+                ],
+                "client_awaits": {
+                    name: asdict(timings)
+                    for name, timings in coordinator.await_timings.items()
+                },
+            }
+            if coordinator.watchdog
+            else None
+        ),
+        # The data is keyed by serial, so number the chargers instead
+        "data": {
+            f"charger_{index}": async_redact_data(charger, TO_REDACT)
+            for index, charger in enumerate((coordinator.data or {}).values(), 1)
+        },
+    }
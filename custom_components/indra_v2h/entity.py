@@ -1,36 +1,136 @@
 """Base entity for Indra V2H integration."""
 from __future__ import annotations
 
-from homeassistant.helpers.entity import DeviceInfo
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.entity import DeviceInfo, Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .const import ATTR_DATA_UPDATED, ATTR_STALE, DOMAIN
 from .coordinator import IndraV2HDataUpdateCoordinator
+from .snapshot import IndraV2HSnapshot
 
 
 class IndraV2HEntity(CoordinatorEntity):
     """Base entity for Indra V2H devices."""
 
+    _attr_has_entity_name = True
+
+    # Snapshot fields this entity's state depends on; None means the entity
+    # is written on every coordinator update
+    _source_fields: tuple[str, ...] | None = None
+
     def __init__(
         self,
         coordinator: IndraV2HDataUpdateCoordinator,
-        device_id: str | None = None,
+        serial: str,
+        key: str,
     ) -> None:
         """Initialize the entity."""
         super().__init__(coordinator)
-        self._device_id = device_id or "indra_v2h_charger"
+        self._serial = serial
+        self._last_available: bool | None = None
+        self._last_stale: bool | None = None
+        self._attr_unique_id = f"{serial}_{key}"
+        device = self.device_data
         self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, self._device_id)},
-            name="Indra V2H Charger",
+            identifiers={(DOMAIN, serial)},
+            name=f"Indra V2H {serial}",
             manufacturer="Indra",
-            model="V2H Charger",
+            model=device.get("model") or "V2H Charger",
+            serial_number=serial,
+            sw_version=device.get("firmware"),
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Index the entity so service calls can find its charger."""
+        await super().async_added_to_hass()
+        entity_id = self.entity_id
+        self.coordinator.entity_serials[entity_id] = self._serial
+        self.async_on_remove(
+            lambda: self.coordinator.entity_serials.pop(entity_id, None)
         )
 
+    @property
+    def device_data(self) -> dict[str, Any]:
+        """Return the device info for this entity's charger."""
+        if not self.coordinator.data:
+            return {}
+        return self.coordinator.data.get(self._serial, {}).get("device", {})
+
+    @property
+    def snapshot(self) -> IndraV2HSnapshot | None:
+        """Return the converted field values for this entity's charger."""
+        return self.coordinator.snapshots.get(self._serial)
+
+    @property
+    def statistics(self) -> dict[str, Any]:
+        """Return the latest statistics for this entity's charger."""
+        if not self.coordinator.data:
+            return {}
+        return self.coordinator.data.get(self._serial, {}).get("statistics", {})
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if availability, staleness or a source field changed."""
+        available = self.available
+        stale = self.coordinator.stale
+        if (
+            self._source_fields is not None
+            and available == self._last_available
+            and stale == self._last_stale
+            and not self.coordinator.fields_changed(self._serial, self._source_fields)
+        ):
+            return
+        self._last_available = available
+        self._last_stale = stale
+        super()._handle_coordinator_update()
+
     @property
     def available(self) -> bool:
-        """Return if entity is available."""
-        return (
-            self.coordinator.last_update_success
-            and self.coordinator.data is not None
+        """Return if entity is available.
+
+        While the cloud can't be reached the last data is shown, until it
+        is older than the coordinator's max_data_age.
+        """
+        return self.coordinator.data_usable and self._serial in self.coordinator.data
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return when the data was fetched, while it is stale."""
+        if not self.coordinator.stale or self.coordinator.data_updated is None:
+            return None
+        return {
+            ATTR_STALE: True,
+            ATTR_DATA_UPDATED: self.coordinator.data_updated.isoformat(),
+        }
+
+
+@callback
+def async_add_device_entities(
+    coordinator: IndraV2HDataUpdateCoordinator,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+    entity_factory: Callable[[str], Iterable[Entity]],
+) -> None:
+    """Add entities for every charger, including ones that appear later."""
+    known_serials: set[str] = set()
+
+    @callback
+    def _async_add_new_devices() -> None:
+        new_serials = [
+            serial for serial in coordinator.data or {} if serial not in known_serials
+        ]
+        if not new_serials:
+            return
+        known_serials.update(new_serials)
+        async_add_entities(
+            [entity for serial in new_serials for entity in entity_factory(serial)]
         )
 
+    _async_add_new_devices()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_new_devices))
@@ -0,0 +1,121 @@
+"""Energy meters kept locally from a charger's counters and power.
+
+The chargers' energy counters (activeEnergyToEv/activeEnergyFromEv) can
+reset, briefly read low, or go missing from the telemetry, any of which
+would corrupt total_increasing statistics if shown as is. A meter adds up
+the counter's increases instead, so its total only ever goes up.
+
+A counter going backwards is held until the next reading: if the counter
+is back at or above where it was, the drop was a glitch and counting
+carries on from the old value; otherwise the counter was reset and its
+new value is all energy since the reset. While the counter is missing,
+power is integrated with the trapezoidal rule, and that energy is taken
+off the counter's increase once it is back, so it isn't counted twice.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+from .const import METER_MAX_GAP
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class EnergyMeter:
+    """A meter counting the energy in one direction; energy in kWh."""
+
+    # None until the first reading
+    total: float | None = None
+    # Time of the last reading
+    time: datetime | None = None
+    # Last counter value, if the counter has been seen
+    counter: float | None = None
+    # Counter value before it went backwards, until the next reading
+    # shows whether that was a reset
+    peak: float | None = None
+    # Energy integrated from power since the counter was last seen
+    integrated: float = 0.0
+    # Power at the last reading, in kW
+    power: float | None = None
+
+    def update(
+        self, time: datetime, counter: float | None, power: float | None
+    ) -> None:
+        """Add a reading of the counter and of the power in this direction.
+
+        Readings no newer than the last are ignored.
+        """
+        if self.time is not None and time <= self.time:
+            return
+        if counter is not None:
+            self._add_counter(counter)
+        elif power is not None:
+            self._add_power(time, power)
+        self.time = time
+        self.power = power
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the meter as a dict for storage."""
+        data = asdict(self)
+        data["time"] = self.time.isoformat() if self.time is not None else None
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> EnergyMeter:
+        """Create a meter from stored data."""
+        time = data.get("time")
+        return cls(
+            **{
+                **data,
+                "time": dt_util.parse_datetime(time) if time is not None else None,
+            }
+        )
+
+    def _add_counter(self, counter: float) -> None:
+        """Add the counter's increase since the last reading."""
+        if self.counter is None:
+            # First sight of the counter; start from it unless energy has
+            # already been counted
+            if self.total is None:
+                self.total = counter
+            self.counter = counter
+            self.integrated = 0.0
+            return
+
+        if self.peak is not None:
+            if counter >= self.peak:
+                _LOGGER.debug("Counter back to %s after a glitch", counter)
+                increase = counter - self.peak
+            else:
+                _LOGGER.debug("Counter reset from %s to %s", self.peak, counter)
+                increase = counter
+            self.peak = None
+        elif counter < self.counter:
+            # Wait for the next reading to tell a reset from a glitch
+            self.peak = self.counter
+            self.counter = counter
+            return
+        else:
+            increase = counter - self.counter
+
+        self.total = (self.total or 0.0) + max(0.0, increase - self.integrated)
+        self.integrated = 0.0
+        self.counter = counter
+
+    def _add_power(self, time: datetime, power: float) -> None:
+        """Integrate the power since the last reading."""
+        if self.time is None or self.power is None:
+            return
+        seconds = (time - self.time).total_seconds()
+        if seconds > METER_MAX_GAP:
+            _LOGGER.debug("Not integrating power over a %ss gap", seconds)
+            return
+        energy = (self.power + power) / 2 * seconds / 3600
+        self.total = (self.total or 0.0) + energy
+        self.integrated += energy
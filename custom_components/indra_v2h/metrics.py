@@ -0,0 +1,110 @@
+"""Request metrics for the Indra V2H client."""
+from __future__ import annotations
+
+import bisect
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+class EndpointMetrics:
+    """Latency histogram and counters for one endpoint or operation."""
+
+    __slots__ = (
+        "successes",
+        "errors",
+        "buckets",
+        "total_time",
+        "max_time",
+        "last_duration",
+        "last_success",
+        "last_error",
+        "last_error_time",
+    )
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.successes = 0
+        self.errors = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_duration: float | None = None
+        self.last_success: float | None = None
+        self.last_error: str | None = None
+        self.last_error_time: float | None = None
+
+    def record(self, duration: float, error: BaseException | None = None) -> None:
+        """Record one call."""
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.last_duration = duration
+        if error is None:
+            self.successes += 1
+            self.last_success = time.time()
+        else:
+            self.errors += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            self.last_error_time = time.time()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics as a dict."""
+        calls = self.successes + self.errors
+        return {
+            "successes": self.successes,
+            "errors": self.errors,
+            "mean_seconds": self.total_time / calls if calls else None,
+            "max_seconds": self.max_time,
+            "last_seconds": self.last_duration,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+            "last_error_time": self.last_error_time,
+            "histogram": {
+                f"le_{bound:g}": count
+                for bound, count in zip(LATENCY_BUCKETS, self.buckets, strict=True)
+            },
+        }
+
+
+class ClientMetrics:
+    """Metrics for every endpoint and operation of one client."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.endpoints: dict[str, EndpointMetrics] = {}
+        self.auth_refreshes = 0
+        self.retries = 0
+        self.shared_reads = 0
+
+    def endpoint(self, name: str) -> EndpointMetrics:
+        """Return the metrics for an endpoint, creating them if needed."""
+        if (metrics := self.endpoints.get(name)) is None:
+            metrics = self.endpoints[name] = EndpointMetrics()
+        return metrics
+
+    @asynccontextmanager
+    async def track(self, name: str) -> AsyncIterator[None]:
+        """Time the wrapped block and record its outcome."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as err:
+            self.endpoint(name).record(time.perf_counter() - start, err)
+            raise
+        self.endpoint(name).record(time.perf_counter() - start)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all metrics as a dict."""
+        return {
+            "auth_refreshes": self.auth_refreshes,
+            "retries": self.retries,
+            "shared_reads": self.shared_reads,
+            "endpoints": {
+                name: metrics.as_dict() for name, metrics in self.endpoints.items()
+            },
+        }
@@ -0,0 +1,384 @@
+"""Tariff-aware charge and discharge planning.
+
+plan_modes() finds the cheapest charge, discharge or idle mode for every
+slot of a price forecast with a dynamic program over the vehicle's state
+of charge. Each slot's step is vectorised over every state of charge, so
+96 half-hour slots plan in a few milliseconds and the plan can be redone
+on every price update. IndraV2HOptimiser reads the forecast, hands the
+plan to the scheduler as windows and optionally replans when the
+forecast changes.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.util import dt as dt_util
+
+from .const import MODE_CHARGE, MODE_DISCHARGE, MODE_IDLE
+
+if TYPE_CHECKING:
+    from .coordinator import IndraV2HDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Windows the optimiser adds to the scheduler are tagged with this source
+SOURCE_OPTIMISER = "optimiser"
+
+# Order matters: ties go to the first action, so idle is preferred
+ACTIONS = (MODE_IDLE, MODE_CHARGE, MODE_DISCHARGE)
+
+# Keys tried, in order, for each field of a price forecast entry; these
+# cover Octopus Energy rates and most tariff integrations
+START_KEYS = ("start", "valid_from", "from")
+END_KEYS = ("end", "valid_to", "to")
+PRICE_KEYS = ("value_inc_vat", "price", "value")
+
+
+@dataclass(frozen=True)
+class PriceSlot:
+    """Import and export prices, per kWh, for one slot of a forecast."""
+
+    start: datetime
+    end: datetime
+    price: float
+    export_price: float | None = None
+
+    @property
+    def hours(self) -> float:
+        """Return the length of the slot in hours."""
+        return (self.end - self.start).total_seconds() / 3600
+
+
+@dataclass(frozen=True)
+class BatteryParameters:
+    """The vehicle battery and charger limits a plan must respect."""
+
+    capacity: float  # kWh
+    soc: float  # %, now
+    target_soc: float  # %, required from the deadline on
+    deadline: datetime | None  # None for the end of the forecast
+    charge_power: float  # kW
+    discharge_power: float  # kW
+    min_soc: float  # %, never discharged below
+    efficiency: float  # one-way, 0-1
+    resolution: float = 0.5  # % of state of charge per DP level
+
+
+@dataclass(frozen=True)
+class PlannedSlot:
+    """The mode chosen for one slot and the state of charge after it."""
+
+    start: datetime
+    end: datetime
+    mode: str
+    price: float
+    soc: float
+
+
+@dataclass(frozen=True)
+class Plan:
+    """The cheapest plan over a price forecast."""
+
+    slots: list[PlannedSlot]
+    cost: float  # in the forecast's currency; negative is income
+
+    def windows(self) -> list[tuple[str, datetime, datetime]]:
+        """Return the plan as (mode, start, end) runs of the same mode."""
+        windows: list[tuple[str, datetime, datetime]] = []
+        for slot in self.slots:
+            last = windows[-1] if windows else None
+            if last is not None and last[0] == slot.mode and last[2] == slot.start:
+                windows[-1] = (slot.mode, last[1], slot.end)
+            else:
+                windows.append((slot.mode, slot.start, slot.end))
+        return windows
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the plan as a service response."""
+        return {
+            "cost": round(self.cost, 4),
+            "slots": [
+                {
+                    "start": slot.start.isoformat(),
+                    "end": slot.end.isoformat(),
+                    "mode": slot.mode,
+                    "price": slot.price,
+                    "soc": round(slot.soc, 1),
+                }
+                for slot in self.slots
+            ],
+        }
+
+
+def plan_modes(slots: Sequence[PriceSlot], battery: BatteryParameters) -> Plan:
+    """Return the cheapest idle/charge/discharge plan for a price forecast.
+
+    State of charge is split into levels of battery.resolution percent.
+    Working back from the last slot, the cheapest cost from every level to
+    the end is computed for all levels at once, with states that break the
+    minimum or the target after the deadline made infinitely expensive.
+    Raises ValueError if the target can't be reached.
+    """
+    if not slots:
+        raise ValueError("The price forecast has no future slots")
+
+    count = len(slots)
+    levels = int(round(100 / battery.resolution)) + 1
+    soc_levels = np.arange(levels) * battery.resolution
+    hours = np.array([slot.hours for slot in slots])
+    prices = np.array([slot.price for slot in slots])
+    export_prices = np.array(
+        [
+            slot.price if slot.export_price is None else slot.export_price
+            for slot in slots
+        ]
+    )
+
+    # Energy bought or sold per slot, and the state of charge it moves
+    charge_cost = prices * battery.charge_power * hours
+    discharge_income = export_prices * battery.discharge_power * hours
+    kwh_per_level = battery.capacity * battery.resolution / 100
+    charge_steps = np.maximum(
+        1, np.rint(battery.charge_power * hours * battery.efficiency / kwh_per_level)
+    ).astype(int)
+    discharge_steps = np.maximum(
+        1, np.rint(battery.discharge_power * hours / battery.efficiency / kwh_per_level)
+    ).astype(int)
+
+    # Lowest allowed state of charge at the end of each slot; starting below
+    # the minimum is allowed, but discharging further is not
+    floor = min(battery.min_soc, battery.soc)
+    ends = [slot.end for slot in slots]
+    deadline = _as_datetime(battery.deadline) if battery.deadline else ends[-1]
+    required = np.array(
+        [max(floor, battery.target_soc) if end >= deadline else floor for end in ends]
+    )
+
+    cost_to_go = np.zeros(levels)
+    choices = np.empty((count, levels), dtype=np.int8)
+    options = np.empty((len(ACTIONS), levels))
+    for index in range(count - 1, -1, -1):
+        after = np.where(soc_levels >= required[index] - 1e-9, cost_to_go, np.inf)
+        up, down = charge_steps[index], discharge_steps[index]
+        options[0] = after
+        options[1, :-up] = charge_cost[index] + after[up:]
+        options[1, -up:] = np.inf
+        options[2, down:] = after[:-down] - discharge_income[index]
+        options[2, :down] = np.inf
+        choices[index] = np.argmin(options, axis=0)
+        cost_to_go = options[choices[index], np.arange(levels)]
+
+    level = int(round(min(max(battery.soc, 0), 100) / battery.resolution))
+    cost = float(cost_to_go[level])
+    if not np.isfinite(cost):
+        raise ValueError(
+            f"Can't reach {battery.target_soc}% from {battery.soc}% by {deadline}"
+        )
+
+    planned = []
+    for index, slot in enumerate(slots):
+        action = ACTIONS[choices[index, level]]
+        if action == MODE_CHARGE:
+            level += charge_steps[index]
+        elif action == MODE_DISCHARGE:
+            level -= discharge_steps[index]
+        planned.append(
+            PlannedSlot(
+                slot.start, slot.end, action, slot.price, float(soc_levels[level])
+            )
+        )
+    return Plan(planned, cost)
+
+
+def parse_price_forecast(
+    entries: Iterable[Mapping[str, Any]],
+    now: datetime,
+    export_entries: Iterable[Mapping[str, Any]] | None = None,
+) -> list[PriceSlot]:
+    """Convert forecast entries into future price slots, sorted by start.
+
+    A slot that has already started is cut to begin now.
+    """
+    export_prices = {
+        slot.start: slot.price for slot in _parse_entries(export_entries or [])
+    }
+    slots = []
+    for slot in sorted(_parse_entries(entries), key=lambda slot: slot.start):
+        if slot.end <= now:
+            continue
+        slots.append(
+            PriceSlot(
+                max(slot.start, now),
+                slot.end,
+                slot.price,
+                export_prices.get(slot.start),
+            )
+        )
+    return slots
+
+
+def _parse_entries(entries: Iterable[Mapping[str, Any]]) -> Iterable[PriceSlot]:
+    """Parse forecast entries, skipping ones that can't be read."""
+    for entry in entries:
+        try:
+            start = _as_datetime(_first(entry, START_KEYS))
+            end = _as_datetime(_first(entry, END_KEYS))
+            price = float(_first(entry, PRICE_KEYS))
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.debug("Skipping unreadable price entry: %s", entry)
+            continue
+        if end > start:
+            yield PriceSlot(start, end, price)
+
+
+def _first(entry: Mapping[str, Any], keys: Sequence[str]) -> Any:
+    """Return the value of the first key present in an entry."""
+    for key in keys:
+        if entry.get(key) is not None:
+            return entry[key]
+    raise KeyError(keys[0])
+
+
+def _as_datetime(value: Any) -> datetime:
+    """Convert a datetime or ISO 8601 string to an aware datetime."""
+    if not isinstance(value, datetime):
+        value = dt_util.parse_datetime(str(value))
+        if value is None:
+            raise ValueError("Invalid datetime")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return value
+
+
+@dataclass(frozen=True)
+class PriceSource:
+    """Where to read a price forecast: an entity attribute or a JSON file."""
+
+    entity_id: str | None = None
+    attribute: str = "rates"
+    file: str | None = None  # relative to the config directory
+    # Entity with export prices in the same attribute, if they differ
+    export_entity_id: str | None = None
+
+
+class IndraV2HOptimiser:
+    """Plans the chargers of one config entry and schedules the plans."""
+
+    def __init__(
+        self, hass: HomeAssistant, coordinator: IndraV2HDataUpdateCoordinator
+    ) -> None:
+        """Initialize the optimiser."""
+        self.hass = hass
+        self.coordinator = coordinator
+        # Serial -> unsubscribe from the price entities it is replanned on
+        self._followers: dict[str, CALLBACK_TYPE] = {}
+
+    async def async_optimise(
+        self,
+        serial: str,
+        battery: BatteryParameters,
+        prices: PriceSource,
+        follow: bool = False,
+    ) -> Plan:
+        """Plan a charger from a price forecast and schedule the plan.
+
+        With follow, the charger is replanned from its current state of
+        charge whenever a price entity changes.
+        """
+        entries = await self._async_get_entries(prices.entity_id, prices)
+        export_entries = None
+        if prices.export_entity_id:
+            export_entries = await self._async_get_entries(
+                prices.export_entity_id, prices
+            )
+        slots = parse_price_forecast(entries, dt_util.now(), export_entries)
+        plan = plan_modes(slots, battery)
+        _LOGGER.debug(
+            "Planned %s slots for %s, costing %.4f", len(slots), serial, plan.cost
+        )
+
+        self.coordinator.scheduler.async_replace_windows(
+            serial, SOURCE_OPTIMISER, plan.windows()
+        )
+        self.async_stop_following(serial)
+        if follow and prices.entity_id:
+            self._async_follow(serial, battery, prices)
+        return plan
+
+    @callback
+    def async_stop_following(self, serial: str | None = None) -> None:
+        """Stop replanning a charger, or every charger."""
+        for followed in [serial] if serial else list(self._followers):
+            if (unsubscribe := self._followers.pop(followed, None)) is not None:
+                unsubscribe()
+
+    @callback
+    def _async_follow(
+        self, serial: str, battery: BatteryParameters, prices: PriceSource
+    ) -> None:
+        """Replan a charger whenever its price entities change."""
+
+        async def _async_replan(event: Event) -> None:
+            # Plan from where the battery is now, not where it was
+            snapshot = self.coordinator.snapshots.get(serial)
+            current = battery
+            if snapshot is not None and snapshot.soc is not None:
+                current = replace(battery, soc=snapshot.soc)
+            try:
+                await self.async_optimise(serial, current, prices, follow=True)
+            except (HomeAssistantError, ValueError) as err:
+                _LOGGER.warning("Error replanning %s: %s", serial, err)
+
+        entity_ids = [prices.entity_id]
+        if prices.export_entity_id:
+            entity_ids.append(prices.export_entity_id)
+        self._followers[serial] = async_track_state_change_event(
+            self.hass, entity_ids, _async_replan
+        )
+
+    async def _async_get_entries(
+        self, entity_id: str | None, prices: PriceSource
+    ) -> list[Mapping[str, Any]]:
+        """Read forecast entries from an entity attribute or the JSON file."""
+        if entity_id:
+            if (state := self.hass.states.get(entity_id)) is None:
+                raise HomeAssistantError(f"Unknown price entity: {entity_id}")
+            entries = state.attributes.get(prices.attribute)
+        elif prices.file:
+            path = self.hass.config.path(prices.file)
+            if not _is_allowed_file(self.hass, path):
+                raise ServiceValidationError(
+                    f"Price file {prices.file} is outside the config directory "
+                    "and allowlist_external_dirs"
+                )
+            entries = await self.hass.async_add_executor_job(_load_json, path)
+        else:
+            raise HomeAssistantError("A price entity or price file is required")
+
+        if not isinstance(entries, list):
+            raise HomeAssistantError("The price forecast is not a list of prices")
+        return entries
+
+
+def _is_allowed_file(hass: HomeAssistant, path: str) -> bool:
+    """Return True if a file is in the config directory or an allowed one."""
+    config_dir = Path(hass.config.config_dir).resolve()
+    if Path(path).resolve().is_relative_to(config_dir):
+        return True
+    return hass.config.is_allowed_path(path)
+
+
+def _load_json(path: str) -> Any:
+    """Load a JSON file."""
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
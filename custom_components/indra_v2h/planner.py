@@ -0,0 +1,100 @@
+"""Staggered poll phases for all Indra V2H config entries.
+
+Left alone, every entry's coordinator polls on a schedule that starts
+when the entry is set up, so after a restart the entries all hit the
+cloud at the same moment and keep doing so. The planner gives each entry
+a slot and spreads the slots evenly over the poll interval: each
+coordinator times its polls to fall on a grid of the interval it is
+polling at, offset by its slot's share of that interval. Entries backed
+off to the same interval are spread over the whole of it, rather than
+over the first fast interval of it.
+
+Slots are rebalanced as entries are added and removed; coordinators pick
+up their new phase at their next poll.
+"""
+from __future__ import annotations
+
+import random
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_POLL_PLANNER, DOMAIN, POLL_JITTER
+
+
+class PollSlot:
+    """One config entry's place in the poll plan."""
+
+    def __init__(self, planner: PollPlanner) -> None:
+        """Initialize the slot."""
+        self._planner = planner
+
+    @property
+    def phase(self) -> float:
+        """Return the slot's offset, as a fraction of the interval."""
+        return self._planner.phase(self)
+
+    def delay(self, now: float, interval: float, minimum: float | None = None) -> float:
+        """Return the seconds from now until the next poll in this slot.
+
+        Polls fall every interval seconds, offset from the clock's zero by
+        the slot's phase of the interval. The delay is at least minimum, by
+        default half the interval, so polls still come interval seconds
+        apart on average. A little jitter keeps entries with the same
+        phase in different instances from polling in lockstep.
+        """
+        if minimum is None:
+            minimum = interval / 2
+        delay = interval - (now - self.phase * interval) % interval
+        if delay < minimum:
+            delay += interval
+        return delay + random.uniform(0, POLL_JITTER)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the slot's place in the plan as a dict."""
+        return {"slots": len(self._planner), "phase": round(self.phase, 3)}
+
+    @callback
+    def async_release(self) -> None:
+        """Give up the slot, moving the later slots up."""
+        self._planner.async_remove(self)
+
+
+class PollPlanner:
+    """Spreads the polls of every config entry over the poll interval."""
+
+    def __init__(self) -> None:
+        """Initialize an empty plan."""
+        self._slots: list[PollSlot] = []
+
+    def __len__(self) -> int:
+        """Return the number of slots."""
+        return len(self._slots)
+
+    @callback
+    def async_add(self) -> PollSlot:
+        """Add a slot at the end of the plan."""
+        slot = PollSlot(self)
+        self._slots.append(slot)
+        return slot
+
+    @callback
+    def async_remove(self, slot: PollSlot) -> None:
+        """Remove a slot from the plan."""
+        if slot in self._slots:
+            self._slots.remove(slot)
+
+    def phase(self, slot: PollSlot) -> float:
+        """Return a slot's offset, as a fraction of the interval."""
+        if slot not in self._slots:
+            return 0.0
+        return self._slots.index(slot) / len(self._slots)
+
+
+@callback
+def async_get_poll_planner(hass: HomeAssistant) -> PollPlanner:
+    """Return the poll planner shared by all config entries."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (planner := domain_data.get(DATA_POLL_PLANNER)) is None:
+        planner = domain_data[DATA_POLL_PLANNER] = PollPlanner()
+    return planner
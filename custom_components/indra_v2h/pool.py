@@ -0,0 +1,88 @@
+"""Shared HTTP connection pool and request budget for all Indra V2H entries."""
+from __future__ import annotations
+
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.util.ssl import get_default_context
+
+from .const import (
+    DATA_HTTP_CLIENT,
+    DATA_HTTP_CLIENT_UNSUB,
+    DATA_RATE_LIMITER,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_REQUEST_RATE,
+    DOMAIN,
+    REQUEST_BURST,
+)
+from .ratelimit import RateLimiter
+
+
+@callback
+def async_get_http_client(
+    hass: HomeAssistant, max_connections: int = DEFAULT_MAX_CONNECTIONS
+) -> httpx.AsyncClient:
+    """Return the keep-alive HTTP client shared by all config entries.
+
+    The pool is created on first use with the given connection limit. All
+    requests go to the same API host, so this is the per-host limit too.
+    Later callers share the pool as it is, whatever limit they pass, until
+    async_close_http_client closes it.
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (client := domain_data.get(DATA_HTTP_CLIENT)) is not None:
+        return client
+
+    client = httpx.AsyncClient(
+        verify=get_default_context(),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+        # Requests authenticate with a bearer header; refuse cookies so
+        # accounts sharing the pool can't see each other's sessions
+        cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+    )
+    domain_data[DATA_HTTP_CLIENT] = client
+
+    async def _async_close(event: Event) -> None:
+        domain_data.pop(DATA_HTTP_CLIENT_UNSUB, None)
+        await client.aclose()
+
+    domain_data[DATA_HTTP_CLIENT_UNSUB] = hass.bus.async_listen_once(
+        EVENT_HOMEASSISTANT_CLOSE, _async_close
+    )
+    return client
+
+
+async def async_close_http_client(hass: HomeAssistant) -> None:
+    """Close the shared HTTP client once no config entry needs it."""
+    domain_data = hass.data.get(DOMAIN, {})
+    if (unsub := domain_data.pop(DATA_HTTP_CLIENT_UNSUB, None)) is not None:
+        unsub()
+    if (client := domain_data.pop(DATA_HTTP_CLIENT, None)) is not None:
+        await client.aclose()
+
+
+@callback
+def async_get_rate_limiter(
+    hass: HomeAssistant, requests_per_minute: int = DEFAULT_REQUEST_RATE
+) -> RateLimiter:
+    """Return the request budget shared by all config entries.
+
+    Like the pool, it is created on first use with the given rate.
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (limiter := domain_data.get(DATA_RATE_LIMITER)) is None:
+        limiter = domain_data[DATA_RATE_LIMITER] = RateLimiter(
+            requests_per_minute / 60, REQUEST_BURST
+        )
+    return limiter
+
+
+@callback
+def async_remove_rate_limiter(hass: HomeAssistant) -> None:
+    """Drop the request budget once no config entry needs it."""
+    hass.data.get(DOMAIN, {}).pop(DATA_RATE_LIMITER, None)
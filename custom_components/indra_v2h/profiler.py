@@ -0,0 +1,384 @@
+"""Profiling of Indra V2H polls, for the indra_v2h.profile service.
+
+The service runs a number of polls of every config entry under cProfile,
+with tracemalloc snapshots taken before and after, and writes a report to
+the config directory. Everything on the event loop's thread is profiled
+while it runs, so the entities' updates after each poll are included.
+
+Every await on a client is timed while profiling: the time it took, and
+the time its own task spent running in the loop rather than waiting for
+the cloud. With a block threshold given, awaits that hold the loop longer
+than that in one go are logged with where they were awaited from. Work
+the client hands to other tasks, such as the shared reads, isn't counted
+there, so a watchdog thread also logs the stack of the loop's thread
+whenever the loop is blocked that long, whatever is blocking it.
+
+With the block threshold option set, a config entry keeps a watchdog and
+times its client's awaits all the time, not just while profiling.
+"""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import functools
+import inspect
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import deque
+from collections.abc import Coroutine, Generator, Iterable
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, PROFILE_TOP_ALLOCATIONS, PROFILE_TOP_FUNCTIONS
+
+if TYPE_CHECKING:
+    from .coordinator import IndraV2HDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Frames from these show a block is the client's doing
+_CLIENT_MODULES = ("pyindrav2h", f"{DOMAIN}/client.py", f"{DOMAIN}/connection.py")
+
+
+@dataclass
+class AwaitTimings:
+    """Timings of the awaits of one client method; times in seconds."""
+
+    calls: int = 0
+    # Time from the call to its result
+    total: float = 0.0
+    # Time spent running in the loop, and the longest single run
+    blocking: float = 0.0
+    max_step: float = 0.0
+    # Runs longer than the block threshold
+    slow_steps: int = 0
+
+
+@dataclass
+class LoopBlock:
+    """A stretch of time the event loop was blocked for."""
+
+    # When the loop was last seen running, as a UTC datetime
+    since: str
+    # How long it was blocked for, in seconds; if it was still blocked when
+    # the watchdog stopped, how long it had been blocked by then
+    duration: float
+    stack: str
+    in_client: bool
+
+
+@dataclass
+class ProfileResult:
+    """The outcome of a profile run."""
+
+    cycles: int
+    duration: float = 0.0
+    failed_polls: int = 0
+    timings: dict[str, AwaitTimings] = field(default_factory=dict)
+    blocks: list[LoopBlock] = field(default_factory=list)
+
+
+class LoopWatchdog:
+    """Thread logging the loop's stack whenever the loop is blocked."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        threshold: float,
+        keep: int | None = None,
+    ) -> None:
+        """Initialize; call from the loop's thread.
+
+        Only the latest keep blocks are kept, if given.
+        """
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self.threshold = threshold
+        self.blocks: deque[LoopBlock] = deque(maxlen=keep)
+        self._heartbeat = time.monotonic()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"{DOMAIN} loop watchdog", daemon=True
+        )
+
+    def start(self) -> None:
+        """Start watching."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching; the thread ends within half the threshold."""
+        self._stopped.set()
+
+    def _beat(self) -> None:
+        """Note that the loop is running."""
+        self._heartbeat = time.monotonic()
+
+    def _run(self) -> None:
+        """Check the loop's heartbeat twice per threshold."""
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat
+            if reported is not None and heartbeat != reported:
+                # The beat sent while blocked ran as soon as the loop was free
+                if self.blocks:
+                    self.blocks[-1].duration = round(heartbeat - reported, 3)
+                reported = None
+            if blocked >= self.threshold and reported is None:
+                reported = heartbeat
+                self._report(blocked)
+            try:
+                self._loop.call_soon_threadsafe(self._beat)
+            except RuntimeError:
+                # The loop has closed
+                return
+
+    def _report(self, blocked: float) -> None:
+        """Log and keep the stack of the blocked loop's thread."""
+        if (frame := sys._current_frames().get(self._loop_thread)) is None:
+            return
+        stack = "".join(traceback.format_stack(frame))
+        block = LoopBlock(
+            since=(dt_util.utcnow() - timedelta(seconds=blocked)).isoformat(),
+            duration=round(blocked, 3),
+            stack=stack,
+            in_client=any(module in stack for module in _CLIENT_MODULES),
+        )
+        self.blocks.append(block)
+        _LOGGER.warning(
+            "Event loop blocked for at least %.3f s%s:\n%s",
+            blocked,
+            " in the Indra V2H client" if block.in_client else "",
+            stack,
+        )
+
+
+class TimedClient:
+    """Stands in for a client, timing every await on it."""
+
+    def __init__(
+        self, client: Any, timings: dict[str, AwaitTimings], threshold: float | None
+    ) -> None:
+        """Wrap a client, adding the timings of its methods to timings."""
+        self._client = client
+        self._timings = timings
+        self._threshold = threshold
+
+    def __getattr__(self, name: str) -> Any:
+        """Return the client's attribute, timing coroutine methods."""
+        attr = getattr(self._client, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            timings = self._timings.setdefault(name, AwaitTimings())
+            return await _TimedAwait(
+                attr(*args, **kwargs), name, timings, self._threshold
+            )
+
+        return timed
+
+
+class _TimedAwait:
+    """Awaits a coroutine, timing each run of it in the loop."""
+
+    def __init__(
+        self,
+        coro: Coroutine[Any, Any, Any],
+        name: str,
+        timings: AwaitTimings,
+        threshold: float | None,
+    ) -> None:
+        """Initialize."""
+        self._coro = coro
+        self._name = name
+        self._timings = timings
+        self._threshold = threshold
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        """Drive the coroutine one step at a time, timing each step."""
+        steps = self._coro.__await__()
+        send, value = steps.send, None
+        self._timings.calls += 1
+        start = time.monotonic()
+        try:
+            while True:
+                step = time.perf_counter()
+                try:
+                    yielded = send(value)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    self._add_step(time.perf_counter() - step)
+                try:
+                    value, send = (yield yielded), steps.send
+                except GeneratorExit:
+                    steps.close()
+                    raise
+                except BaseException as err:
+                    # Cancellation and other errors thrown in go to the coroutine
+                    value, send = err, steps.throw
+        finally:
+            self._timings.total += time.monotonic() - start
+
+    def _add_step(self, duration: float) -> None:
+        """Add one step's time, logging it if it blocked the loop too long."""
+        self._timings.blocking += duration
+        self._timings.max_step = max(self._timings.max_step, duration)
+        if self._threshold is not None and duration >= self._threshold:
+            self._timings.slow_steps += 1
+            _LOGGER.warning(
+                "IndraV2HClient.%s blocked the event loop for %.3f s; awaited from:\n%s",
+                self._name,
+                duration,
+                "".join(traceback.format_stack()[:-2]),
+            )
+
+
+async def async_profile(
+    hass: HomeAssistant,
+    coordinators: Iterable[IndraV2HDataUpdateCoordinator],
+    cycles: int,
+    block_threshold: float | None = None,
+) -> dict[str, Any]:
+    """Profile a number of polls of every coordinator and write a report.
+
+    Returns the paths of the text report and of the cProfile stats, and a
+    summary of the run.
+    """
+    coordinators = list(coordinators)
+    result = ProfileResult(cycles)
+    profiler = cProfile.Profile()
+    watchdog = (
+        LoopWatchdog(hass.loop, block_threshold) if block_threshold is not None else None
+    )
+    clients = [coordinator.client for coordinator in coordinators]
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        before = await hass.async_add_executor_job(tracemalloc.take_snapshot)
+        for coordinator, client in zip(coordinators, clients, strict=True):
+            coordinator.client = TimedClient(client, result.timings, block_threshold)
+        if watchdog is not None:
+            watchdog.start()
+        start = time.monotonic()
+        try:
+            profiler.enable()
+        except ValueError as err:
+            # Another profiler is running
+            raise HomeAssistantError(f"Can't start profiling: {err}") from err
+        try:
+            for _ in range(cycles):
+                # Poll the cloud rather than reuse recent reads
+                for client in clients:
+                    client.invalidate_reads()
+                await asyncio.gather(
+                    *(coordinator.async_refresh() for coordinator in coordinators)
+                )
+                result.failed_polls += sum(
+                    not coordinator.last_update_success for coordinator in coordinators
+                )
+        finally:
+            profiler.disable()
+        result.duration = round(time.monotonic() - start, 3)
+        after = await hass.async_add_executor_job(tracemalloc.take_snapshot)
+    finally:
+        if watchdog is not None:
+            watchdog.stop()
+            result.blocks = list(watchdog.blocks)
+        for coordinator, client in zip(coordinators, clients, strict=True):
+            coordinator.client = client
+        if started_tracing:
+            tracemalloc.stop()
+
+    path = hass.config.path(f"{DOMAIN}_profile_{dt_util.now():%Y%m%d_%H%M%S}")
+    await hass.async_add_executor_job(
+        _write_report, path, result, profiler, before, after
+    )
+    _LOGGER.info("Wrote Indra V2H profile of %s polls to %s.txt", cycles, path)
+    return {
+        "report": f"{path}.txt",
+        "profile": f"{path}.prof",
+        "cycles": cycles,
+        "duration": result.duration,
+        "failed_polls": result.failed_polls,
+        "loop_blocks": len(result.blocks),
+        "client_awaits": {
+            name: _rounded(asdict(timings)) for name, timings in result.timings.items()
+        },
+    }
+
+
+def _write_report(
+    path: str,
+    result: ProfileResult,
+    profiler: cProfile.Profile,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+) -> None:
+    """Write the cProfile stats and a text report; runs in an executor."""
+    profiler.dump_stats(f"{path}.prof")
+
+    report = io.StringIO()
+    report.write(
+        f"Indra V2H profile of {result.cycles} polls, written {dt_util.now()}\n"
+        f"Took {result.duration} s; {result.failed_polls} poll(s) failed\n"
+    )
+
+    report.write("\n== Client awaits (seconds) ==\n")
+    report.write(
+        f"{'method':<24}{'calls':>7}{'total':>10}{'in loop':>10}"
+        f"{'max step':>10}{'slow':>6}\n"
+    )
+    for name, timings in sorted(result.timings.items()):
+        report.write(
+            f"{name:<24}{timings.calls:>7}{timings.total:>10.3f}"
+            f"{timings.blocking:>10.3f}{timings.max_step:>10.4f}"
+            f"{timings.slow_steps:>6}\n"
+        )
+
+    if result.blocks:
+        report.write("\n== Event loop blocks ==\n")
+        for block in result.blocks:
+            report.write(
+                f"\nBlocked for {block.duration} s from {block.since}"
+                f"{' in the client' if block.in_client else ''}:\n{block.stack}"
+            )
+
+    for sort in (pstats.SortKey.CUMULATIVE, pstats.SortKey.TIME):
+        report.write(f"\n== Functions by {sort.value} time ==\n")
+        stats = pstats.Stats(profiler, stream=report)
+        stats.sort_stats(sort).print_stats(PROFILE_TOP_FUNCTIONS)
+
+    # Leave out tracemalloc's own bookkeeping
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    report.write("\n== Memory allocated during the polls, by line ==\n")
+    differences = after.filter_traces(ignore).compare_to(
+        before.filter_traces(ignore), "lineno"
+    )
+    for difference in differences[:PROFILE_TOP_ALLOCATIONS]:
+        report.write(f"{difference}\n")
+
+    with open(f"{path}.txt", "w", encoding="utf-8") as file:
+        file.write(report.getvalue())
+
+
+def _rounded(timings: dict[str, Any]) -> dict[str, Any]:
+    """Round the times in a timings dict for the service response."""
+    return {
+        key: round(value, 4) if isinstance(value, float) else value
+        for key, value in timings.items()
+    }
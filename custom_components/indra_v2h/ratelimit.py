@@ -0,0 +1,154 @@
+"""Request budget shared by every Indra V2H client.
+
+All config entries draw API requests from one token bucket, so several
+accounts and chargers polling, switching modes and sampling at once stay
+within a single budget instead of each hammering the cloud. The bucket
+refills at a steady rate up to a burst size. When it is empty, requests
+queue for the next token in priority order: mode changes first, then
+reads, then background reads such as fast sampling.
+
+The priority of reads comes from the request_priority context variable,
+so code running in the background sets it once for everything it calls.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any
+
+PRIORITY_WRITE = 0
+PRIORITY_READ = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES = {
+    PRIORITY_WRITE: "write",
+    PRIORITY_READ: "read",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Priority of the reads made in the current context
+request_priority: ContextVar[int] = ContextVar(
+    "indra_v2h_request_priority", default=PRIORITY_READ
+)
+
+USAGE_WINDOW = 60  # seconds of requests counted towards usage
+
+
+class RateLimiter:
+    """Token bucket handing out requests in priority order."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        """Initialize with a refill rate in requests per second."""
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        # (priority, order, future) of the requests waiting for a token
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        # When recent requests were let through, for usage
+        self._granted_times: deque[float] = deque()
+        self._granted = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._waited = dict.fromkeys(PRIORITY_NAMES, 0.0)
+        self._max_wait = dict.fromkeys(PRIORITY_NAMES, 0.0)
+
+    async def acquire(self, priority: int = PRIORITY_READ) -> None:
+        """Wait for a token for one request."""
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            self._record(priority, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        start = time.monotonic()
+        self._release()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted as the caller was cancelled; hand the token on
+                self._tokens += 1
+                self._release()
+            raise
+        self._record(priority, time.monotonic() - start)
+
+    @property
+    def usage(self) -> float:
+        """Return the share of the budget used over the last minute, in %."""
+        self._prune()
+        return round(100 * len(self._granted_times) / (self.rate * USAGE_WINDOW), 1)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the budget and its use as a dict."""
+        self._refill()
+        self._prune()
+        waiting = dict.fromkeys(PRIORITY_NAMES.values(), 0)
+        for priority, _, future in self._waiters:
+            if not future.done():
+                waiting[PRIORITY_NAMES[priority]] += 1
+        return {
+            "requests_per_minute": self.rate * 60,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "usage": self.usage,
+            "requests_last_minute": len(self._granted_times),
+            "waiting": waiting,
+            "priorities": {
+                name: {
+                    "granted": self._granted[priority],
+                    "total_wait": round(self._waited[priority], 3),
+                    "max_wait": round(self._max_wait[priority], 3),
+                }
+                for priority, name in PRIORITY_NAMES.items()
+            },
+        }
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _handle_timer(self) -> None:
+        """Hand out the tokens earned while requests waited."""
+        self._timer = None
+        self._release()
+
+    def _release(self) -> None:
+        """Hand tokens to waiting requests, and wait for more if needed."""
+        self._refill()
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                # Cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            if self._tokens < 1:
+                break
+            heapq.heappop(self._waiters)
+            self._tokens -= 1
+            future.set_result(None)
+
+        if self._waiters and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                (1 - self._tokens) / self.rate, self._handle_timer
+            )
+
+    def _record(self, priority: int, waited: float) -> None:
+        """Count a request let through."""
+        self._granted_times.append(time.monotonic())
+        self._granted[priority] += 1
+        self._waited[priority] += waited
+        self._max_wait[priority] = max(self._max_wait[priority], waited)
+
+    def _prune(self) -> None:
+        """Forget requests older than the usage window."""
+        cutoff = time.monotonic() - USAGE_WINDOW
+        while self._granted_times and self._granted_times[0] < cutoff:
+            self._granted_times.popleft()
@@ -0,0 +1,239 @@
+"""Timeouts, retries and a circuit breaker for Indra V2H API requests.
+
+Every API request gets an overall timeout. Transient failures (timeouts,
+connection errors, 5xx responses and 429s) are retried with jittered
+exponential backoff, honouring Retry-After. Other errors, such as a 404 or
+rejected credentials, are raised straight away.
+
+A circuit breaker shared by all of a client's requests opens after a run
+of transient failures. While it is open, requests fail at once without
+reaching the cloud. Once the reset timeout has passed, a single request
+is let through as a probe while the others wait for it: if it succeeds
+the breaker closes, otherwise it opens again for twice as long, up to a
+maximum.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from .metrics import ClientMetrics
+from .ratelimit import PRIORITY_READ, RateLimiter
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+BREAKER_STATES = [BREAKER_CLOSED, BREAKER_OPEN, BREAKER_HALF_OPEN]
+
+
+class TransientError(Exception):
+    """An API failure that may succeed if the request is retried."""
+
+    # Seconds the server asked us to wait, from a Retry-After header
+    retry_after: float | None = None
+
+
+class CircuitOpenError(Exception):
+    """A request was refused because the circuit breaker is open."""
+
+    def __init__(self, retry_in: float) -> None:
+        """Initialize the error."""
+        super().__init__(f"Indra cloud unreachable, next attempt in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How long to wait for a request and how to retry it."""
+
+    timeout: float
+    attempts: int
+    base_delay: float
+    max_delay: float
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float | None:
+        """Return the delay before retrying after a failed attempt.
+
+        attempt counts from zero. Returns None if the request should not be
+        retried, because the attempts are used up or the server asked for a
+        longer wait than max_delay.
+        """
+        if attempt + 1 >= self.attempts:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        # Full jitter spreads retries from many clients apart
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """Stops requests to the cloud during an outage."""
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        max_reset_timeout: float,
+    ) -> None:
+        """Initialize the breaker."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.failures = 0
+        self.trips = 0
+        self.opened_at: float | None = None
+        self._current_timeout = reset_timeout
+        # Set while the probe runs; other requests wait for its outcome
+        self._probe_done: asyncio.Event | None = None
+        self._state = BREAKER_CLOSED
+        # Called with the new state whenever it changes
+        self.state_callback: Callable[[str], None] | None = None
+
+    @property
+    def state(self) -> str:
+        """Return the breaker state."""
+        if self._state == BREAKER_OPEN and self.retry_in <= 0:
+            self._set_state(BREAKER_HALF_OPEN)
+        return self._state
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds until an open breaker lets a probe through."""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self._current_timeout - time.monotonic())
+
+    async def async_before_request(self) -> bool:
+        """Check a request may be sent; return True if it is the probe.
+
+        Raises CircuitOpenError while the breaker is open. While the probe
+        runs, other requests wait for it and then check again.
+        """
+        while True:
+            state = self.state
+            if state == BREAKER_CLOSED:
+                return False
+            if state == BREAKER_OPEN:
+                raise CircuitOpenError(self.retry_in)
+            if self._probe_done is None:
+                self._probe_done = asyncio.Event()
+                return True
+            await self._probe_done.wait()
+
+    def record_success(self, probe: bool = False) -> None:
+        """Record that the cloud answered."""
+        self.failures = 0
+        if self._state != BREAKER_CLOSED:
+            _LOGGER.info("Indra cloud reachable again, closing circuit breaker")
+            self.opened_at = None
+            self._current_timeout = self.reset_timeout
+            self._set_state(BREAKER_CLOSED)
+        if probe:
+            self.release_probe()
+
+    def release_probe(self) -> None:
+        """Let the requests waiting on the probe carry on."""
+        if self._probe_done is not None:
+            self._probe_done.set()
+            self._probe_done = None
+
+    def record_failure(self, probe: bool = False) -> None:
+        """Record a transient failure, opening the breaker if needed."""
+        if probe:
+            # Back off further while the outage lasts
+            self._current_timeout = min(
+                self._current_timeout * 2, self.max_reset_timeout
+            )
+            self._open()
+            self.release_probe()
+            return
+        self.failures += 1
+        if self._state == BREAKER_CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the breaker state as a dict."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_in": self.retry_in,
+            "reset_timeout": self._current_timeout,
+        }
+
+    def _open(self) -> None:
+        """Open the breaker for the current reset timeout."""
+        if self._state == BREAKER_CLOSED:
+            self.trips += 1
+            _LOGGER.warning(
+                "Indra cloud unreachable after %s failures, pausing requests for %ss",
+                self.failures,
+                self._current_timeout,
+            )
+        self.opened_at = time.monotonic()
+        self._set_state(BREAKER_OPEN)
+
+    def _set_state(self, state: str) -> None:
+        """Change the state and tell the listener."""
+        if state == self._state:
+            return
+        self._state = state
+        if self.state_callback is not None:
+            self.state_callback(state)
+
+
+async def async_call_with_retry(
+    request: Callable[[], Awaitable[_T]],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    metrics: ClientMetrics,
+    limiter: RateLimiter | None = None,
+    priority: int = PRIORITY_READ,
+) -> _T:
+    """Send a request with a timeout, retrying transient failures.
+
+    Each attempt waits for a token from limiter, if given, before its
+    timeout starts.
+    """
+    attempt = 0
+    while True:
+        probe = await breaker.async_before_request()
+        if limiter is not None:
+            try:
+                await limiter.acquire(priority)
+            except BaseException:
+                if probe:
+                    breaker.release_probe()
+                raise
+        try:
+            result = await asyncio.wait_for(request(), policy.timeout)
+        except (TransientError, asyncio.TimeoutError) as err:
+            breaker.record_failure(probe)
+            delay = policy.delay(attempt, getattr(err, "retry_after", None))
+            if delay is None or breaker.state != BREAKER_CLOSED:
+                raise
+            _LOGGER.debug("Retrying in %.1fs after %r", delay, err)
+            metrics.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+        except Exception:
+            # Any other answer, even an error, means the cloud is reachable
+            breaker.record_success(probe)
+            raise
+        except BaseException:
+            # Cancelled; let the next request probe instead
+            if probe:
+                breaker.release_probe()
+            raise
+        else:
+            breaker.record_success(probe)
+            return result
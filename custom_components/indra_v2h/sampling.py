@@ -0,0 +1,232 @@
+"""Fast power sampling for Indra V2H chargers.
+
+When enabled, each charger's telemetry is fetched every few seconds and
+its power kept in a fixed-size ring buffer covering the aggregation
+window. Sensors don't get a state per sample; instead the minimum,
+maximum and mean power over the window, and the energy moved in it
+(integrated with the trapezoidal rule), are published at a slower cadence.
+Control loops can read the same aggregates with no recorder writes at all.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import IndraV2HDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PowerAggregates:
+    """Power over the aggregation window; power in kW, energy in kWh."""
+
+    samples: int
+    start: datetime
+    end: datetime
+    min_power: float
+    max_power: float
+    mean_power: float
+    energy: float
+
+
+class PowerBuffer:
+    """Ring buffer of (timestamp, power) samples backed by numpy arrays."""
+
+    def __init__(self, capacity: int) -> None:
+        """Initialize an empty buffer holding up to capacity samples."""
+        self._times = np.zeros(capacity)
+        self._values = np.zeros(capacity)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of samples held."""
+        return self._count
+
+    @property
+    def last_time(self) -> float | None:
+        """Return the timestamp of the newest sample."""
+        if not self._count:
+            return None
+        return float(self._times[self._next - 1])
+
+    def append(self, timestamp: float, value: float) -> None:
+        """Add a sample, overwriting the oldest once the buffer is full."""
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._times)
+        self._count = min(self._count + 1, len(self._times))
+
+    def since(self, timestamp: float) -> tuple[np.ndarray, np.ndarray]:
+        """Return the samples at or after a timestamp, oldest first."""
+        start = (self._next - self._count) % len(self._times)
+        order = (start + np.arange(self._count)) % len(self._times)
+        times, values = self._times[order], self._values[order]
+        keep = times >= timestamp
+        return times[keep], values[keep]
+
+    def aggregates(self, timestamp: float) -> PowerAggregates | None:
+        """Return the aggregates of the samples since a timestamp."""
+        times, values = self.since(timestamp)
+        if not len(times):
+            return None
+        # Trapezoidal rule; kW * s -> kWh
+        energy = float(np.sum((values[1:] + values[:-1]) * np.diff(times))) / 7200
+        return PowerAggregates(
+            samples=len(times),
+            start=dt_util.utc_from_timestamp(times[0]),
+            end=dt_util.utc_from_timestamp(times[-1]),
+            min_power=round(float(values.min()), 3),
+            max_power=round(float(values.max()), 3),
+            mean_power=round(float(values.mean()), 3),
+            energy=round(energy, 4),
+        )
+
+
+class IndraV2HSampler:
+    """Samples the power of one config entry's chargers."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: IndraV2HDataUpdateCoordinator,
+        sample_interval: timedelta,
+        window: timedelta,
+        publish_interval: timedelta,
+    ) -> None:
+        """Initialize the sampler."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self.sample_interval = sample_interval
+        self.window = window
+        self.publish_interval = publish_interval
+        # Room for a full window, with slack for samples arriving early
+        self._capacity = math.ceil(window / sample_interval) + 2
+        self._buffers: dict[str, PowerBuffer] = {}
+        # Aggregates as last published
+        self._aggregates: dict[str, PowerAggregates | None] = {}
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._listeners: list[CALLBACK_TYPE] = []
+        self._sampling = False
+
+    @callback
+    def async_start(self) -> None:
+        """Start sampling and publishing."""
+        self._unsubs = [
+            async_track_time_interval(
+                self.hass,
+                self._async_handle_sample_interval,
+                self.sample_interval,
+                name=f"{DOMAIN} power sampling",
+            ),
+            async_track_time_interval(
+                self.hass,
+                self._async_publish,
+                self.publish_interval,
+                name=f"{DOMAIN} power publishing",
+            ),
+        ]
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop sampling and publishing."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+
+    def aggregates(self, serial: str, published: bool = True) -> PowerAggregates | None:
+        """Return a charger's power aggregates over the window.
+
+        By default these are the aggregates as last published to sensors;
+        with published=False they are computed from the latest samples.
+        """
+        if published:
+            return self._aggregates.get(serial)
+        if (buffer := self._buffers.get(serial)) is None or buffer.last_time is None:
+            return None
+        # Measure the window back from the newest sample, in the charger's
+        # clock, but drop samples that stopped arriving a window ago
+        window = self.window.total_seconds()
+        if buffer.last_time < time.time() - 2 * window:
+            return None
+        return buffer.aggregates(buffer.last_time - window)
+
+    @callback
+    def async_add_listener(
+        self, update_callback: CALLBACK_TYPE
+    ) -> Callable[[], None]:
+        """Listen for newly published aggregates."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def _async_handle_sample_interval(self, now: datetime) -> None:
+        """Take a sample, unless the last one is still running."""
+        if self._sampling:
+            return
+        self._sampling = True
+        self.hass.async_create_background_task(
+            self._async_sample(), f"{DOMAIN} power sample"
+        )
+
+    async def _async_sample(self) -> None:
+        """Fetch every charger's telemetry and buffer its power."""
+        try:
+            serials = list(self.coordinator.data or {})
+            results = await asyncio.gather(
+                *(self.coordinator.client.fetch_telemetry(serial) for serial in serials),
+                return_exceptions=True,
+            )
+        finally:
+            self._sampling = False
+
+        for serial, telemetry in zip(serials, results, strict=True):
+            if isinstance(telemetry, Exception):
+                _LOGGER.debug("Error sampling %s: %s", serial, telemetry)
+                continue
+            self._add_sample(serial, telemetry)
+
+    def _add_sample(self, serial: str, telemetry: dict[str, Any]) -> None:
+        """Buffer the power from a charger's telemetry."""
+        power = (telemetry.get("data") or {}).get("powerToEv")
+        if power is None:
+            return
+        # Use the telemetry's own time, so repeated readings are skipped
+        reported = dt_util.parse_datetime(str(telemetry.get("time") or ""))
+        if reported is not None and reported.tzinfo is None:
+            reported = reported.replace(tzinfo=dt_util.UTC)
+        timestamp = reported.timestamp() if reported is not None else time.time()
+
+        if (buffer := self._buffers.get(serial)) is None:
+            buffer = self._buffers[serial] = PowerBuffer(self._capacity)
+        if buffer.last_time is not None and timestamp <= buffer.last_time:
+            return
+        buffer.append(timestamp, float(power) / 1000)
+
+    @callback
+    def _async_publish(self, now: datetime) -> None:
+        """Compute the aggregates and tell the sensors."""
+        for serial in self._buffers:
+            self._aggregates[serial] = self.aggregates(serial, published=False)
+        for update_callback in list(self._listeners):
+            update_callback()
@@ -0,0 +1,369 @@
+"""Local schedule engine for Indra V2H chargers.
+
+Schedule windows switch a charger to a mode between two times, either
+every day (start and end are times of day) or once (start and end are
+datetimes). Windows are kept in Home Assistant storage and the charger is
+switched by timers at window boundaries rather than by polling. When a
+window ends the charger returns to schedule mode, unless another window
+takes over. After a restart the mode is reconciled with the windows once
+the first poll has read the chargers' modes from the cloud.
+"""
+from __future__ import annotations
+
+import logging
+import uuid
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, MODE_SCHEDULE
+
+if TYPE_CHECKING:
+    from .coordinator import IndraV2HDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 1  # seconds
+
+
+@dataclass(frozen=True)
+class ScheduleWindow:
+    """A time window in which a charger should be in a mode."""
+
+    id: str
+    serial: str
+    mode: str
+    # Times of day for a daily window, datetimes for a one-off window
+    start: time | datetime
+    end: time | datetime
+    # What added the window, e.g. "optimiser"; None for the set_schedule service
+    source: str | None = None
+
+    @property
+    def daily(self) -> bool:
+        """Return True if the window repeats every day."""
+        return not isinstance(self.start, datetime)
+
+    def occurrence(self, now: datetime) -> tuple[datetime, datetime] | None:
+        """Return the current or next (start, end) of the window.
+
+        Returns None if a one-off window is over. Daily windows whose end
+        is not after their start run past midnight.
+        """
+        if not self.daily:
+            return (self.start, self.end) if self.end > now else None
+
+        today = dt_util.as_local(now).date()
+        for day in (today - timedelta(days=1), today, today + timedelta(days=1)):
+            start, end = self.occurrence_on(day)
+            if end > now:
+                return start, end
+        return None
+
+    def occurrence_on(self, day: date) -> tuple[datetime, datetime]:
+        """Return the occurrence of a daily window starting on a day."""
+        start = datetime.combine(day, self.start, dt_util.DEFAULT_TIME_ZONE)
+        end = datetime.combine(day, self.end, dt_util.DEFAULT_TIME_ZONE)
+        if end <= start:
+            end += timedelta(days=1)
+        return start, end
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the window as a dict for storage."""
+        return {
+            "id": self.id,
+            "serial": self.serial,
+            "mode": self.mode,
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "source": self.source,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ScheduleWindow:
+        """Create a window from stored data."""
+        parse = dt_util.parse_datetime if "T" in data["start"] else dt_util.parse_time
+        return cls(
+            data["id"],
+            data["serial"],
+            data["mode"],
+            parse(data["start"]),
+            parse(data["end"]),
+            data.get("source"),
+        )
+
+
+class IndraV2HScheduler:
+    """Switches the chargers of one config entry at window boundaries."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: IndraV2HDataUpdateCoordinator,
+        entry_id: str,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self._store = _get_store(hass, entry_id)
+        # Later windows win where windows overlap
+        self._windows: list[ScheduleWindow] = []
+        # Window whose mode each charger was last switched to
+        self._applied: dict[str, str] = {}
+        self._unsub_timer: CALLBACK_TYPE | None = None
+        self._unsub_first_poll: CALLBACK_TYPE | None = None
+        self._listeners: list[CALLBACK_TYPE] = []
+
+    async def async_start(self) -> None:
+        """Load the windows and bring every charger in line with them.
+
+        Started from cached data, the chargers are only brought in line
+        once the first poll has read their modes from the cloud.
+        """
+        data = await self._store.async_load() or {}
+        self._windows = [
+            ScheduleWindow.from_dict(window) for window in data.get("windows", [])
+        ]
+        self._applied = data.get("applied", {})
+        if self.coordinator.client.last_poll is None:
+            self._unsub_first_poll = self.coordinator.async_add_listener(
+                self._async_handle_update
+            )
+        else:
+            # Mode changes are skipped by the client if the charger is in
+            # the right mode already
+            self._async_apply(reconcile=True)
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop switching chargers."""
+        self._async_cancel_timer()
+        if self._unsub_first_poll is not None:
+            self._unsub_first_poll()
+            self._unsub_first_poll = None
+
+    def windows(self, serial: str) -> list[ScheduleWindow]:
+        """Return a charger's windows."""
+        return [window for window in self._windows if window.serial == serial]
+
+    @callback
+    def async_add_window(
+        self,
+        serial: str,
+        mode: str,
+        start: time | datetime,
+        end: time | datetime,
+    ) -> ScheduleWindow:
+        """Add a window for a charger, daily if start and end are times."""
+        window = _make_window(serial, mode, start, end)
+        self._windows.append(window)
+        self._async_apply()
+        return window
+
+    @callback
+    def async_replace_windows(
+        self,
+        serial: str,
+        source: str,
+        windows: Iterable[tuple[str, datetime, datetime]],
+    ) -> list[ScheduleWindow]:
+        """Replace a charger's windows from a source with (mode, start, end)s."""
+        new_windows = [
+            _make_window(serial, mode, start, end, source)
+            for mode, start, end in windows
+        ]
+        self._windows = [
+            window
+            for window in self._windows
+            if window.serial != serial or window.source != source
+        ] + new_windows
+        self._async_apply()
+        return new_windows
+
+    @callback
+    def async_clear(self, serial: str, window_id: str | None = None) -> int:
+        """Remove a charger's windows, or one of them; return how many."""
+        removed = [
+            window
+            for window in self.windows(serial)
+            if window_id is None or window.id == window_id
+        ]
+        self._windows = [window for window in self._windows if window not in removed]
+        self._async_apply()
+        return len(removed)
+
+    def active_window(
+        self, serial: str, now: datetime | None = None
+    ) -> tuple[ScheduleWindow, datetime, datetime] | None:
+        """Return a charger's running window with its start and end."""
+        now = now or dt_util.now()
+        for window in reversed(self.windows(serial)):
+            occurrence = window.occurrence(now)
+            if occurrence is not None and occurrence[0] <= now:
+                return window, *occurrence
+        return None
+
+    def next_window(
+        self, serial: str, now: datetime | None = None
+    ) -> tuple[ScheduleWindow, datetime, datetime] | None:
+        """Return a charger's next window to start, with its start and end."""
+        now = now or dt_util.now()
+        upcoming = []
+        for window in self.windows(serial):
+            if (occurrence := window.occurrence(now)) is None:
+                continue
+            start, end = occurrence
+            if start <= now and window.daily:
+                start, end = window.occurrence_on(
+                    dt_util.as_local(start).date() + timedelta(days=1)
+                )
+            if start > now:
+                upcoming.append((start, end, window))
+        if not upcoming:
+            return None
+        start, end, window = min(upcoming, key=lambda item: item[0])
+        return window, start, end
+
+    @callback
+    def async_add_listener(
+        self, update_callback: CALLBACK_TYPE
+    ) -> Callable[[], None]:
+        """Listen for changes to the windows or the running window."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def _async_handle_update(self) -> None:
+        """Reconcile the chargers once the first poll has succeeded."""
+        if self.coordinator.client.last_poll is None:
+            return
+        self._unsub_first_poll()
+        self._unsub_first_poll = None
+        self._async_apply(reconcile=True)
+
+    @callback
+    def _async_apply(
+        self, now: datetime | None = None, reconcile: bool = False
+    ) -> None:
+        """Switch chargers whose running window changed, then set the timer.
+
+        With reconcile, chargers in a window are switched to its mode even
+        if that window was applied before.
+        """
+        now = now or dt_util.now()
+        self._windows = [
+            window for window in self._windows if window.occurrence(now) is not None
+        ]
+
+        for serial in self.coordinator.data or {}:
+            active = self.active_window(serial, now)
+            if active is not None:
+                window = active[0]
+                if reconcile or self._applied.get(serial) != window.id:
+                    self._applied[serial] = window.id
+                    self._async_switch(serial, window.mode)
+            elif self._applied.pop(serial, None) is not None:
+                self._async_switch(serial, MODE_SCHEDULE)
+
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        self._async_schedule_timer(now)
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def _async_schedule_timer(self, now: datetime) -> None:
+        """Set a timer for the next window start or end."""
+        self._async_cancel_timer()
+        boundaries = [
+            boundary
+            for window in self._windows
+            if (occurrence := window.occurrence(now)) is not None
+            for boundary in occurrence
+            if boundary > now
+        ]
+        if boundaries:
+            self._unsub_timer = async_track_point_in_time(
+                self.hass, self._async_handle_boundary, min(boundaries)
+            )
+
+    @callback
+    def _async_cancel_timer(self) -> None:
+        """Cancel the timer for the next boundary."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+
+    @callback
+    def _async_handle_boundary(self, now: datetime) -> None:
+        """Switch chargers at a window boundary."""
+        self._unsub_timer = None
+        self._async_apply(now)
+
+    @callback
+    def _async_switch(self, serial: str, mode: str) -> None:
+        """Switch a charger's mode in the background."""
+        _LOGGER.info("Schedule switching %s to %s", serial, mode)
+        self.hass.async_create_task(self._async_set_mode(serial, mode))
+
+    async def _async_set_mode(self, serial: str, mode: str) -> None:
+        """Switch a charger's mode, logging failures."""
+        try:
+            await self.coordinator.async_set_mode(serial, mode)
+        except Exception as err:  # noqa: BLE001 - nobody is waiting on this
+            _LOGGER.error(
+                "Error switching %s to %s on schedule: %s", serial, mode, err
+            )
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to store."""
+        return {
+            "windows": [window.as_dict() for window in self._windows],
+            "applied": self._applied,
+        }
+
+
+async def async_remove_schedule(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete the stored windows of a config entry."""
+    await _get_store(hass, entry_id).async_remove()
+
+
+def _get_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store for a config entry's windows."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.schedule.{entry_id}")
+
+
+def _make_window(
+    serial: str,
+    mode: str,
+    start: time | datetime,
+    end: time | datetime,
+    source: str | None = None,
+) -> ScheduleWindow:
+    """Create a window, checking its start and end."""
+    if isinstance(start, datetime) != isinstance(end, datetime):
+        raise ValueError("start and end must both be times or both datetimes")
+    if isinstance(start, datetime):
+        start, end = _as_local(start), _as_local(end)
+        if end <= start:
+            raise ValueError("end must be after start")
+    return ScheduleWindow(uuid.uuid4().hex, serial, mode, start, end, source)
+
+
+def _as_local(value: datetime) -> datetime:
+    """Convert a datetime to local time, assuming local time if naive."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return dt_util.as_local(value)
@@ -10,7 +10,7 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN, MODES
 from .coordinator import IndraV2HDataUpdateCoordinator
-from .entity import IndraV2HEntity
+from .entity import IndraV2HEntity, async_add_device_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,44 +23,40 @@ async def async_setup_entry(
     """Set up Indra V2H select entity."""
     coordinator: IndraV2HDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
 
-    async_add_entities([IndraV2HModeSelect(coordinator)])
+    async_add_device_entities(
+        coordinator,
+        entry,
+        async_add_entities,
+        lambda serial: [IndraV2HModeSelect(coordinator, serial)],
+    )
 
 
 class IndraV2HModeSelect(IndraV2HEntity, SelectEntity):
     """Select entity for charger mode."""
 
-    _attr_name = "Indra V2H Mode"
-    _attr_unique_id = "indra_v2h_mode"
+    _attr_name = "Mode"
     _attr_options = MODES
     _attr_icon = "mdi:power-settings"
+    _source_fields = ("mode",)
+
+    def __init__(self, coordinator: IndraV2HDataUpdateCoordinator, serial: str) -> None:
+        """Initialize the mode select."""
+        super().__init__(coordinator, serial, "mode")
 
     @property
     def current_option(self) -> str | None:
         """Return the current selected mode."""
-        if not self.coordinator.data:
+        # A requested mode is shown until the charger confirms it
+        if mode := self.coordinator.optimistic_modes.get(self._serial):
+            return mode
+        if (snapshot := self.snapshot) is None:
             return None
         
-        statistics = self.coordinator.data.get("statistics", {})
         # Based on v2hdevice.py: mode is in stats["mode"]
-        mode = statistics.get("mode")
-        if mode:
-            # Convert library mode to our mode format
-            mode_lower = mode.lower()
-            if mode_lower in MODES:
-                return mode_lower
-            # Map library modes to our modes
-            mode_map = {
-                "loadmatch": "loadmatch",
-                "idle": "idle",
-                "schedule": "schedule",
-                "charge": "charge",
-                "discharge": "discharge",
-                "exportmatch": "exportmatch",
-            }
-            if mode_lower in mode_map:
-                return mode_map[mode_lower]
+        if snapshot.mode in MODES:
+            return snapshot.mode
         
-        return MODES[0]  # Default to first mode if unknown
+        return None  # Unknown modes show as unknown
 
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
@@ -69,11 +65,8 @@ class IndraV2HModeSelect(IndraV2HEntity, SelectEntity):
             return
 
         try:
-            # Use the client's set_mode method (now async)
-            await self.coordinator.client.set_mode(option)
-            
-            # Force coordinator update to reflect new state
-            await self.coordinator.async_request_refresh()
+            # Send the command and wait until the charger confirms it
+            await self.coordinator.async_set_mode(self._serial, option)
         except Exception as err:
             _LOGGER.error("Error setting mode to %s: %s", option, err)
             raise
@@ -1,15 +1,37 @@
 """Sensor entities for Indra V2H integration."""
 from __future__ import annotations
 
-from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from typing import Any
+
+from homeassistant.components.sensor import SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfEnergy, UnitOfPower
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoredExtraData, RestoreEntity
+from homeassistant.helpers.typing import StateType
 
-from .const import DOMAIN
+from .const import (
+    ATTR_DAILY,
+    ATTR_END,
+    ATTR_MODE,
+    ATTR_SAMPLES,
+    ATTR_START,
+    ATTR_WINDOW_ID,
+    DOMAIN,
+)
 from .coordinator import IndraV2HDataUpdateCoordinator
-from .entity import IndraV2HEntity
+from .descriptions import (
+    CLIENT_SENSOR_DESCRIPTIONS,
+    POWER_STATS_SENSOR_DESCRIPTIONS,
+    SCHEDULE_SENSOR_DESCRIPTIONS,
+    SENSOR_DESCRIPTIONS,
+    IndraV2HClientSensorEntityDescription,
+    IndraV2HPowerStatsSensorEntityDescription,
+    IndraV2HScheduleSensorEntityDescription,
+    IndraV2HSensorEntityDescription,
+)
+from .entity import IndraV2HEntity, async_add_device_entities
+from .meter import EnergyMeter
 
 
 async def async_setup_entry(
@@ -20,129 +42,273 @@ async def async_setup_entry(
     """Set up Indra V2H sensor entities."""
     coordinator: IndraV2HDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
 
-    sensors = [
-        IndraV2HPowerSensor(coordinator),
-        IndraV2HEnergySensor(coordinator),
-        IndraV2HStatusSensor(coordinator),
-        IndraV2HDeviceInfoSensor(coordinator, "model"),
-        IndraV2HDeviceInfoSensor(coordinator, "serial"),
-        IndraV2HDeviceInfoSensor(coordinator, "firmware"),
-    ]
+    async_add_device_entities(
+        coordinator,
+        entry,
+        async_add_entities,
+        lambda serial: [
+            *(
+                (
+                    IndraV2HEnergyMeterSensor
+                    if description.meter_sign is not None
+                    else IndraV2HSensor
+                )(coordinator, serial, description)
+                for description in SENSOR_DESCRIPTIONS
+            ),
+            *(
+                IndraV2HClientSensor(coordinator, serial, description)
+                for description in CLIENT_SENSOR_DESCRIPTIONS
+            ),
+            *(
+                IndraV2HScheduleSensor(coordinator, serial, description)
+                for description in SCHEDULE_SENSOR_DESCRIPTIONS
+            ),
+            # Only while fast sampling is turned on
+            *(
+                IndraV2HPowerStatsSensor(coordinator, serial, description)
+                for description in POWER_STATS_SENSOR_DESCRIPTIONS
+                if coordinator.sampler is not None
+            ),
+        ],
+    )
 
-    async_add_entities(sensors)
 
+class IndraV2HSensor(IndraV2HEntity, SensorEntity):
+    """Sensor for a field of the charger's data."""
 
-class IndraV2HPowerSensor(IndraV2HEntity, SensorEntity):
-    """Sensor for current power usage."""
+    entity_description: IndraV2HSensorEntityDescription
 
-    _attr_name = "Indra V2H Power"
-    _attr_unique_id = "indra_v2h_power"
-    _attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
-    _attr_state_class = SensorStateClass.MEASUREMENT
-    _attr_icon = "mdi:lightning-bolt"
+    def __init__(
+        self,
+        coordinator: IndraV2HDataUpdateCoordinator,
+        serial: str,
+        description: IndraV2HSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, serial, description.key)
+        self.entity_description = description
+        self._source_fields = (description.key,)
 
     @property
-    def native_value(self) -> float | None:
-        """Return the current power value."""
-        if not self.coordinator.data:
+    def native_value(self) -> StateType:
+        """Return the sensor value from the latest snapshot."""
+        if (snapshot := self.snapshot) is None:
             return None
-        
-        statistics = self.coordinator.data.get("statistics", {})
-        # Extract power value from statistics
-        # Based on v2hdevice.py: powerToEv is in stats["data"]["powerToEv"]
-        data = statistics.get("data", {})
-        power = data.get("powerToEv")
-        if power is not None:
-            # Convert from W to kW
-            return float(power) / 1000.0
-        return None
+        return snapshot.get(self.entity_description.key)
+
 
+class IndraV2HEnergyMeterSensor(IndraV2HSensor, RestoreEntity):
+    """Energy counter shown as a meter that never goes backwards."""
 
-class IndraV2HEnergySensor(IndraV2HEntity, SensorEntity):
-    """Sensor for energy consumption."""
+    def __init__(
+        self,
+        coordinator: IndraV2HDataUpdateCoordinator,
+        serial: str,
+        description: IndraV2HSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, serial, description)
+        self._meter = EnergyMeter()
 
-    _attr_name = "Indra V2H Energy"
-    _attr_unique_id = "indra_v2h_energy"
-    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
-    _attr_state_class = SensorStateClass.TOTAL_INCREASING
-    _attr_icon = "mdi:counter"
+    async def async_added_to_hass(self) -> None:
+        """Restore the meter and add the latest reading."""
+        await super().async_added_to_hass()
+        if (extra := await self.async_get_last_extra_data()) is not None and (
+            data := extra.as_dict().get("meter")
+        ):
+            self._meter = EnergyMeter.from_dict(data)
+        elif (state := await self.async_get_last_state()) is not None:
+            # Carry on from the counter shown before this was a meter
+            try:
+                value = float(state.state)
+            except ValueError:
+                pass
+            else:
+                self._meter = EnergyMeter(total=value, counter=value)
+        self._update_meter()
 
     @property
-    def native_value(self) -> float | None:
-        """Return the energy value."""
-        if not self.coordinator.data:
+    def extra_restore_state_data(self) -> RestoredExtraData:
+        """Return the meter to restore after a restart."""
+        return RestoredExtraData({"meter": self._meter.as_dict()})
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Add the new reading to the meter, writing state if it moved."""
+        total = self._meter.total
+        self._update_meter()
+        if self._meter.total != total:
+            # Integrated power moves the total without the counter changing
+            self.async_write_ha_state()
+            return
+        super()._handle_coordinator_update()
+
+    @callback
+    def _update_meter(self) -> None:
+        """Add the latest fresh reading to the meter."""
+        if (snapshot := self.snapshot) is None or self.coordinator.stale:
+            return
+        if (time := snapshot.last_telemetry or self.coordinator.data_updated) is None:
+            return
+        power = snapshot.power
+        self._meter.update(
+            time,
+            snapshot.get(self.entity_description.key),
+            None
+            if power is None
+            else max(0.0, power * self.entity_description.meter_sign),
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the meter's total."""
+        if self._meter.total is None:
             return None
-        
-        statistics = self.coordinator.data.get("statistics", {})
-        # Extract energy value from statistics
-        # Based on v2hdevice.py: activeEnergyToEv and activeEnergyFromEv are available
-        data = statistics.get("data", {})
-        # Use activeEnergyToEv (charging) or activeEnergyFromEv (discharging)
-        energy = data.get("activeEnergyToEv") or data.get("activeEnergyFromEv")
-        if energy is not None:
-            # Convert from Wh to kWh
-            return float(energy) / 1000.0
+        return round(self._meter.total, 3)
+
+
+class IndraV2HClientSensor(IndraV2HEntity, SensorEntity):
+    """Diagnostic sensor for the client polling the charger."""
+
+    entity_description: IndraV2HClientSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: IndraV2HDataUpdateCoordinator,
+        serial: str,
+        description: IndraV2HClientSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, serial, description.key)
+        self.entity_description = description
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available, including while polls fail."""
+        return self._serial in (self.coordinator.data or {})
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return no staleness attributes; the metrics are always current."""
         return None
 
+    @property
+    def native_value(self) -> StateType:
+        """Return the value from the client's metrics."""
+        return self.entity_description.value_fn(self.coordinator.client)
+
+
+class IndraV2HScheduleSensor(IndraV2HEntity, SensorEntity):
+    """Sensor for a charger's running or next schedule window."""
+
+    entity_description: IndraV2HScheduleSensorEntityDescription
 
-class IndraV2HStatusSensor(IndraV2HEntity, SensorEntity):
-    """Sensor for device status."""
+    # Written when the scheduler changes, not on coordinator updates
+    _source_fields = ()
+
+    def __init__(
+        self,
+        coordinator: IndraV2HDataUpdateCoordinator,
+        serial: str,
+        description: IndraV2HScheduleSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, serial, description.key)
+        self.entity_description = description
+
+    async def async_added_to_hass(self) -> None:
+        """Listen for schedule changes."""
+        await super().async_added_to_hass()
+        if self.coordinator.scheduler is not None:
+            self.async_on_remove(
+                self.coordinator.scheduler.async_add_listener(
+                    self._handle_schedule_update
+                )
+            )
+
+    @callback
+    def _handle_schedule_update(self) -> None:
+        """Write the window after a schedule change or boundary."""
+        self.async_write_ha_state()
+
+    @property
+    def _window(self):
+        """Return the window this sensor shows, with its start and end."""
+        if self.coordinator.scheduler is None:
+            return None
+        return self.entity_description.window_fn(
+            self.coordinator.scheduler, self._serial
+        )
 
-    _attr_name = "Indra V2H Status"
-    _attr_unique_id = "indra_v2h_status"
-    _attr_icon = "mdi:information"
+    @property
+    def native_value(self) -> StateType:
+        """Return the value for the window."""
+        if (window := self._window) is None:
+            return None
+        return self.entity_description.value_fn(*window)
 
     @property
-    def native_value(self) -> str | None:
-        """Return the device status."""
-        if not self.coordinator.data:
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the window's details."""
+        if (window := self._window) is None:
             return None
-        
-        statistics = self.coordinator.data.get("statistics", {})
-        # Based on v2hdevice.py: state is in stats["state"]
-        state = statistics.get("state")
-        if state:
-            return str(state)
-        
-        # Fallback to mode if state not available
-        mode = statistics.get("mode")
-        if mode:
-            return str(mode)
-        
-        return "unknown"
-
-
-class IndraV2HDeviceInfoSensor(IndraV2HEntity, SensorEntity):
-    """Sensor for device information."""
+        window, start, end = window
+        return {
+            ATTR_WINDOW_ID: window.id,
+            ATTR_MODE: window.mode,
+            ATTR_START: start.isoformat(),
+            ATTR_END: end.isoformat(),
+            ATTR_DAILY: window.daily,
+        }
+
+
+class IndraV2HPowerStatsSensor(IndraV2HEntity, SensorEntity):
+    """Sensor aggregating a charger's fast power samples."""
+
+    entity_description: IndraV2HPowerStatsSensorEntityDescription
+
+    # Written when the sampler publishes, not on coordinator updates
+    _source_fields = ()
 
     def __init__(
         self,
         coordinator: IndraV2HDataUpdateCoordinator,
-        info_type: str,
+        serial: str,
+        description: IndraV2HPowerStatsSensorEntityDescription,
     ) -> None:
-        """Initialize device info sensor."""
-        super().__init__(coordinator)
-        self._info_type = info_type
-        self._attr_name = f"Indra V2H {info_type.capitalize()}"
-        self._attr_unique_id = f"indra_v2h_{info_type}"
-        self._attr_icon = "mdi:information-outline"
+        """Initialize the sensor."""
+        super().__init__(coordinator, serial, description.key)
+        self.entity_description = description
+
+    async def async_added_to_hass(self) -> None:
+        """Listen for published aggregates."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.sampler.async_add_listener(self.async_write_ha_state)
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return if there are recent samples to aggregate."""
+        return (
+            super().available
+            and self.coordinator.sampler.aggregates(self._serial) is not None
+        )
 
     @property
-    def native_value(self) -> str | None:
-        """Return the device info value."""
-        if not self.coordinator.data:
+    def native_value(self) -> StateType:
+        """Return the aggregate over the sampling window."""
+        if (aggregates := self.coordinator.sampler.aggregates(self._serial)) is None:
             return None
-        
-        device = self.coordinator.data.get("device", {})
-        # Device data is a list, get first item
-        if isinstance(device, list) and len(device) > 0:
-            device_info = device[0]
-            value = device_info.get(self._info_type)
-            if value is not None:
-                return str(value)
-        elif isinstance(device, dict):
-            value = device.get(self._info_type)
-            if value is not None:
-                return str(value)
-        return None
+        return self.entity_description.value_fn(aggregates)
 
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the window the aggregate covers."""
+        if (aggregates := self.coordinator.sampler.aggregates(self._serial)) is None:
+            return None
+        return {
+            ATTR_SAMPLES: aggregates.samples,
+            ATTR_START: aggregates.start.isoformat(),
+            ATTR_END: aggregates.end.isoformat(),
+        }
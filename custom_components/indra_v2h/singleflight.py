@@ -0,0 +1,83 @@
+"""Sharing of concurrent and very recent identical API reads.
+
+The coordinator's poll, refreshes requested after a mode change, services
+and fast sampling can all read the same resource at nearly the same time.
+A SingleFlight lets concurrent callers with the same key await one shared
+request, and answers callers within a short TTL of the last result from
+it, so a burst of reads costs a single round trip.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from .metrics import ClientMetrics
+
+
+class SingleFlight:
+    """Shares in-flight and recent results of calls by key."""
+
+    def __init__(self, ttl: float, metrics: ClientMetrics) -> None:
+        """Initialize with the seconds a result is reused for.
+
+        Calls answered without a request of their own are counted in
+        metrics.shared_reads.
+        """
+        self.ttl = ttl
+        self.metrics = metrics
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self._results: dict[Hashable, tuple[float, Any]] = {}
+        # Bumped by invalidate(), so requests sent before it aren't cached
+        self._generation = 0
+
+    async def call(self, key: Hashable, request: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of request, shared with other calls for key.
+
+        Errors are passed to every caller waiting on the request, but not
+        kept. A caller being cancelled doesn't cancel the shared request.
+        """
+        if (cached := self._results.get(key)) is not None:
+            if time.monotonic() - cached[0] < self.ttl:
+                self.metrics.shared_reads += 1
+                return cached[1]
+            del self._results[key]
+
+        if (future := self._in_flight.get(key)) is not None:
+            self.metrics.shared_reads += 1
+        else:
+            future = self._in_flight[key] = asyncio.ensure_future(
+                self._run(key, request, self._generation)
+            )
+            # Errors nobody is left waiting for shouldn't be logged as unretrieved
+            future.add_done_callback(_retrieve_exception)
+        return await asyncio.shield(future)
+
+    def invalidate(self) -> None:
+        """Forget results, and stop sharing requests already sent.
+
+        Called after a write, so later reads see its effect.
+        """
+        self._generation += 1
+        self._results.clear()
+        self._in_flight.clear()
+
+    async def _run(
+        self, key: Hashable, request: Callable[[], Awaitable[Any]], generation: int
+    ) -> Any:
+        """Send the request and keep its result while still current."""
+        try:
+            result = await request()
+        finally:
+            if generation == self._generation:
+                self._in_flight.pop(key, None)
+        if generation == self._generation and self.ttl > 0:
+            self._results[key] = (time.monotonic(), result)
+        return result
+
+
+def _retrieve_exception(future: asyncio.Future) -> None:
+    """Mark a finished request's error as retrieved."""
+    if not future.cancelled():
+        future.exception()
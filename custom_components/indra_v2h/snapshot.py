@@ -0,0 +1,67 @@
+"""Per-charger snapshot of converted field values."""
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from .descriptions import SENSOR_DESCRIPTIONS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _lower(value: Any) -> str:
+    """Convert a value to a lowercase string."""
+    return str(value).lower()
+
+
+# Field key -> (path into the charger's data, converter)
+FIELDS: dict[str, tuple[tuple[str, ...], Callable[[Any], Any]]] = {
+    description.key: (description.path, description.converter)
+    for description in SENSOR_DESCRIPTIONS
+}
+FIELDS["mode"] = (("statistics", "mode"), _lower)
+
+
+class IndraV2HSnapshot:
+    """Converted values of every field for one charger.
+
+    Built once per coordinator update; entities read a single attribute.
+    """
+
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self, data: dict[str, Any]) -> None:
+        """Resolve and convert every field from a charger's data."""
+        for key, (path, converter) in FIELDS.items():
+            setattr(self, key, _resolve(data, path, converter))
+
+    def get(self, key: str) -> Any:
+        """Return the value of a field."""
+        return getattr(self, key)
+
+    def changed_fields(self, other: IndraV2HSnapshot | None) -> set[str]:
+        """Return the keys whose values differ from another snapshot."""
+        if other is None:
+            return set(FIELDS)
+        return {key for key in FIELDS if getattr(self, key) != getattr(other, key)}
+
+
+def _resolve(
+    data: dict[str, Any],
+    path: tuple[str, ...],
+    converter: Callable[[Any], Any],
+) -> Any:
+    """Walk path into data and convert the value found there."""
+    value: Any = data
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    if value is None:
+        return None
+    try:
+        return converter(value)
+    except (TypeError, ValueError) as err:
+        _LOGGER.debug("Could not convert %s=%r: %s", ".".join(path), value, err)
+        return None
@@ -0,0 +1,83 @@
+"""Persistent cache of Indra API bearer tokens.
+
+Logging in to the Indra Smart Portal takes two HTML round trips, so the
+bearer token is kept in Home Assistant storage and shared by the config
+flow and every config entry for the same account.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DATA_TOKEN_CACHE, DEFAULT_TOKEN_TTL, DOMAIN, TOKEN_EXPIRY_MARGIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.tokens"
+STORAGE_VERSION = 1
+SAVE_DELAY = 10  # seconds
+
+
+def token_expiry(token: str) -> float:
+    """Return the expiry of a JWT bearer token as a UNIX timestamp.
+
+    Falls back to DEFAULT_TOKEN_TTL from now if the token can't be decoded.
+    """
+    try:
+        payload = token.rsplit(" ", 1)[-1].split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time.time() + DEFAULT_TOKEN_TTL
+
+
+class IndraV2HTokenCache:
+    """Bearer tokens keyed by account email, persisted with their expiry."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the token cache."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY, private=True)
+        self._tokens: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load cached tokens from storage."""
+        data = await self._store.async_load() or {}
+        self._tokens = data.get("tokens", {})
+
+    def get(self, email: str) -> str | None:
+        """Return a cached token for the account if it hasn't expired."""
+        entry = self._tokens.get(email.lower())
+        if not entry or entry["expires"] - TOKEN_EXPIRY_MARGIN <= time.time():
+            return None
+        return entry["token"]
+
+    @callback
+    def async_set(self, email: str, token: str | None) -> None:
+        """Remember a token for the account and schedule a save."""
+        key = email.lower()
+        if not token or self._tokens.get(key, {}).get("token") == token:
+            return
+        _LOGGER.debug("Caching new bearer token for %s", email)
+        self._tokens[key] = {"token": token, "expires": token_expiry(token)}
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to store."""
+        return {"tokens": self._tokens}
+
+
+async def async_get_token_cache(hass: HomeAssistant) -> IndraV2HTokenCache:
+    """Return the token cache shared by all config entries."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (cache := domain_data.get(DATA_TOKEN_CACHE)) is None:
+        cache = IndraV2HTokenCache(hass)
+        await cache.async_load()
+        cache = domain_data.setdefault(DATA_TOKEN_CACHE, cache)
+    return cache
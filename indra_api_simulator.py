@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Indra cloud API.
+
+Speaks the endpoints pyindrav2h uses (portal login, device list, telemetry,
+active transaction and mode interrupts) for any number of simulated
+chargers, with configurable latency and error rates, and scripted failures
+with fail_next(). Used by the tests and benchmarks, and handy for
+trying the integration offline.
+
+Usage:
+    python indra_api_simulator.py --devices 5 --latency-ms 150 --error-rate 0.05
+
+Simulate a cloud outage, in which every request gets a 503, with
+    curl -X POST "http://127.0.0.1:8080/_sim/outage?enabled=1"
+and end it with enabled=0.
+
+Then point pyindrav2h at it before creating a client:
+    import pyindrav2h.connection
+    pyindrav2h.connection.loginUrl = "http://127.0.0.1:8080"
+    pyindrav2h.connection.apiBaseUrl = "http://127.0.0.1:8080/api"
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+from aiohttp import web
+
+NULL_TRANSACTION_ID = "00000000-0000-0000-0000-000000000000"
+TOKEN_TTL = 60 * 60  # seconds
+
+# pyindrav2h's interrupt path segment -> mode reported in telemetry
+INTERRUPT_MODES = {
+    "loadmatch": "LOADMATCH",
+    "clear": "SCHEDULE",
+    "idle": "IDLE",
+    "charge": "CHARGE",
+    "discharge": "DISCHARGE",
+    "exportmatch": "EXPORTMATCH",
+}
+
+
+@dataclass
+class SimulatedCharger:
+    """State of one simulated charger."""
+
+    serial: str
+    plugged_in: bool = True
+    mode: str = "SCHEDULE"
+    energy_to_ev: float = 0.0  # Wh
+    energy_from_ev: float = 0.0  # Wh
+    soc: float = field(default_factory=lambda: random.uniform(20, 80))
+    last_tick: float = field(default_factory=time.monotonic)
+
+    @property
+    def power(self) -> float:
+        """Return power to the EV in W; negative while discharging."""
+        if not self.plugged_in:
+            return 0.0
+        if self.mode == "CHARGE":
+            return 7000.0
+        if self.mode == "DISCHARGE":
+            return -7000.0
+        if self.mode in ("LOADMATCH", "EXPORTMATCH"):
+            return random.uniform(-3000, 3000)
+        return 0.0
+
+    def telemetry(self) -> dict:
+        """Advance the energy counters and return a telemetry payload."""
+        now = time.monotonic()
+        power = self.power
+        energy = power * (now - self.last_tick) / 3600
+        self.last_tick = now
+        if energy >= 0:
+            self.energy_to_ev += energy
+        else:
+            self.energy_from_ev -= energy
+        self.soc = min(100.0, max(0.0, self.soc + energy / 600))
+
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "isBoosting": False,
+            "mode": self.mode,
+            "state": "CHARGING" if power > 0 else "DISCHARGING" if power < 0 else "IDLE",
+            "data": {
+                "activeEnergyToEv": round(self.energy_to_ev),
+                "activeEnergyFromEv": round(self.energy_from_ev),
+                "powerToEv": round(power),
+                "ctClamp": round(random.uniform(200, 3000)),
+                "current": round(abs(power) / 230, 1),
+                "voltage": round(random.uniform(228, 245), 1),
+                "freq": round(random.uniform(49.9, 50.1), 2),
+                "temp": round(random.uniform(25, 40), 1),
+                "soc": round(self.soc),
+            },
+        }
+
+
+class IndraAPISimulator:
+    """aiohttp application simulating the Indra portal and API."""
+
+    def __init__(
+        self,
+        devices: int = 1,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        hang_rate: float = 0.0,
+        email: str = "test@example.com",
+        password: str = "password",
+    ) -> None:
+        """Initialize the simulator."""
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.hang_rate = hang_rate
+        self.outage = False
+        self.email = email
+        self.password = password
+        self.chargers = {
+            f"SIM{index:05d}": SimulatedCharger(f"SIM{index:05d}")
+            for index in range(devices)
+        }
+        self.requests: Counter[str] = Counter()
+        self._tokens: set[str] = set()
+        # Statuses and headers to answer the next API requests with
+        self._failures: deque[tuple[int, dict[str, str]]] = deque()
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.add_routes(
+            [
+                web.get("/", self._login_page),
+                web.post("/login", self._login),
+                web.get("/api/devices", self._devices),
+                web.get("/api/telemetry/devices/{serial}/latest", self._telemetry),
+                web.get("/api/transactions/{serial}/{transaction}/active", self._active),
+                web.post(
+                    "/api/transactions/{transaction}/interrupt/{mode}", self._interrupt
+                ),
+                web.get("/_sim/stats", self._stats),
+                web.post("/_sim/outage", self._set_outage),
+            ]
+        )
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        """Count requests and inject latency, hangs, throttling and errors."""
+        if request.path.startswith("/_sim"):
+            return await handler(request)
+
+        route = request.match_info.route.resource
+        self.requests[route.canonical if route else request.path] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        if self.outage:
+            return web.Response(status=503)
+        if self._failures and request.path.startswith("/api"):
+            status, headers = self._failures.popleft()
+            return web.Response(status=status, headers=headers)
+        if random.random() < self.hang_rate:
+            # Never answer, so the client has to time out
+            await asyncio.Event().wait()
+        if random.random() < self.throttle_rate:
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        if random.random() < self.error_rate:
+            return web.Response(status=random.choice((500, 502, 503)))
+        if request.path.startswith("/api") and (
+            request.headers.get("Authorization") not in self._tokens
+        ):
+            return web.Response(status=401)
+        return await handler(request)
+
+    def fail_next(
+        self, status: int, count: int = 1, retry_after: str | None = None
+    ) -> None:
+        """Answer the next count API requests with status, then carry on."""
+        headers = {"Retry-After": retry_after} if retry_after is not None else {}
+        self._failures.extend((status, headers) for _ in range(count))
+
+    async def _login_page(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text='<form><input name="__RequestVerificationToken" value="xsrf"></form>',
+            content_type="text/html",
+        )
+
+    async def _login(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if form.get("user_email") != self.email or form.get(
+            "user_password"
+        ) != self.password:
+            return web.Response(text="<p>Invalid login</p>", content_type="text/html")
+        token = _make_jwt(self.email)
+        self._tokens.add(token)
+        return web.Response(
+            text=f'<input name="JWTToken" value="{token}">', content_type="text/html"
+        )
+
+    async def _devices(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            [
+                {"deviceUID": serial, "model": "V2H-SIM", "firmware": "sim-1.0"}
+                for serial in self.chargers
+            ]
+        )
+
+    async def _telemetry(self, request: web.Request) -> web.Response:
+        charger = self.chargers.get(request.match_info["serial"])
+        if charger is None:
+            raise web.HTTPNotFound()
+        return web.json_response(charger.telemetry())
+
+    async def _active(self, request: web.Request) -> web.Response:
+        charger = self.chargers.get(request.match_info["serial"])
+        if charger is None or not charger.plugged_in:
+            raise web.HTTPNotFound()
+        return web.json_response(
+            {"id": f"tx-{charger.serial}", "isInterrupted": charger.mode != "SCHEDULE"}
+        )
+
+    async def _interrupt(self, request: web.Request) -> web.Response:
+        serial = request.match_info["transaction"].removeprefix("tx-")
+        charger = self.chargers.get(serial)
+        mode = INTERRUPT_MODES.get(request.match_info["mode"])
+        if charger is None or mode is None:
+            raise web.HTTPNotFound()
+        charger.mode = mode
+        return web.Response(status=202)
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.requests))
+
+    async def _set_outage(self, request: web.Request) -> web.Response:
+        self.outage = request.query.get("enabled", "1") not in ("0", "false")
+        return web.json_response({"outage": self.outage})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base URL."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        await self._runner.cleanup()
+
+
+def point_pyindrav2h_at(base_url: str) -> None:
+    """Make pyindrav2h send its requests to the simulator."""
+    import pyindrav2h.connection
+
+    pyindrav2h.connection.loginUrl = base_url
+    pyindrav2h.connection.apiBaseUrl = f"{base_url}/api"
+
+
+def _make_jwt(email: str) -> str:
+    """Return an unsigned JWT with an expiry, like the portal issues."""
+
+    def encode(part: dict) -> str:
+        raw = json.dumps(part).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    payload = {"sub": email, "exp": int(time.time()) + TOKEN_TTL, "jti": random.random()}
+    return f"{encode({'alg': 'none'})}.{encode(payload)}.sim"
+
+
+def main() -> None:
+    """Run the simulator until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--email", default="test@example.com")
+    parser.add_argument("--password", default="password")
+    args = parser.parse_args()
+
+    simulator = IndraAPISimulator(
+        devices=args.devices,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        hang_rate=args.hang_rate,
+        email=args.email,
+        password=args.password,
+    )
+
+    async def run() -> None:
+        base_url = await simulator.start(args.host, args.port)
+        print(f"Indra API simulator with {args.devices} charger(s) on {base_url}")
+        print(f"Log in with {args.email} / {args.password}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await simulator.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -106,12 +106,15 @@ def test_client_wrapper(email: str, password: str):
     print("=" * 60)
     
     try:
-        # Import directly from the file to avoid Home Assistant dependencies
-        import importlib.util
-        client_path = os.path.join(os.path.dirname(__file__), 'custom_components', 'indra_v2h', 'client.py')
-        spec = importlib.util.spec_from_file_location("indra_v2h_client", client_path)
-        client_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(client_module)
+        # Register the package without running its __init__.py so the client
+        # and its helper modules import without Home Assistant installed
+        import importlib
+        import types
+        package_path = os.path.join(os.path.dirname(__file__), 'custom_components', 'indra_v2h')
+        package = types.ModuleType("indra_v2h")
+        package.__path__ = [package_path]
+        sys.modules.setdefault("indra_v2h", package)
+        client_module = importlib.import_module("indra_v2h.client")
         IndraV2HClient = client_module.IndraV2HClient
         
         print(f"\n✓ Successfully imported IndraV2HClient")
@@ -139,6 +142,16 @@ def test_client_wrapper(email: str, password: str):
                 import traceback
                 traceback.print_exc()
             
+            # Test combined fetch
+            print("\nCalling client.fetch_data()...")
+            try:
+                data = await client.fetch_data()
+                print(f"✓ fetch_data() returned keys: {list(data.keys())}")
+            except Exception as e:
+                print(f"✗ fetch_data() failed: {e}")
+                import traceback
+                traceback.print_exc()
+
             # Test get_statistics
             print("\nCalling client.get_statistics()...")
             try:
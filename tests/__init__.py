@@ -0,0 +1 @@
+"""Tests for the Indra V2H integration."""
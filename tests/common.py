@@ -0,0 +1,41 @@
+"""Helpers for Indra V2H tests."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.indra_v2h.const import DOMAIN
+from indra_api_simulator import IndraAPISimulator
+
+
+def mock_entry(simulator: IndraAPISimulator, **options) -> MockConfigEntry:
+    """Return a config entry for the simulator's account."""
+    return MockConfigEntry(
+        domain=DOMAIN,
+        data={"email": simulator.email, "password": simulator.password},
+        options=options,
+        unique_id=simulator.email,
+    )
+
+
+def cache_entry(
+    hass_storage: dict[str, Any], entry: MockConfigEntry, simulator: IndraAPISimulator
+) -> None:
+    """Store cached data for the simulator's chargers, as a previous run would."""
+    hass_storage[f"{DOMAIN}.cache.{entry.entry_id}"] = {
+        "version": 1,
+        "minor_version": 1,
+        "key": f"{DOMAIN}.cache.{entry.entry_id}",
+        "data": {
+            "data": {
+                serial: {
+                    "device": {"deviceUID": serial, "model": "V2H-SIM"},
+                    "statistics": {"mode": "SCHEDULE", "data": {"powerToEv": 0}},
+                }
+                for serial in simulator.chargers
+            },
+            "saved_at": dt_util.utcnow().isoformat(),
+        },
+    }
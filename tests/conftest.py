@@ -0,0 +1,26 @@
+"""Fixtures for Indra V2H tests."""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
+import pyindrav2h.connection
+import pytest
+
+from indra_api_simulator import IndraAPISimulator, point_pyindrav2h_at
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load the integration from custom_components."""
+    yield
+
+
+@pytest.fixture
+async def simulator(socket_enabled) -> AsyncIterator[IndraAPISimulator]:
+    """Run the Indra API simulator with two chargers, and point pyindrav2h at it."""
+    urls = pyindrav2h.connection.loginUrl, pyindrav2h.connection.apiBaseUrl
+    simulator = IndraAPISimulator(devices=2)
+    point_pyindrav2h_at(await simulator.start())
+    yield simulator
+    await simulator.stop()
+    pyindrav2h.connection.loginUrl, pyindrav2h.connection.apiBaseUrl = urls
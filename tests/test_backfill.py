@@ -0,0 +1,103 @@
+"""Tests for the Indra V2H hourly energy statistics."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.indra_v2h.backfill import (
+    CounterState,
+    IndraV2HStatistics,
+    hourly_statistics,
+    statistic_id,
+)
+
+START = datetime(2024, 1, 1, 10, 30, tzinfo=timezone.utc)
+HOUR = timedelta(hours=1)
+
+
+def _state(value: float) -> CounterState:
+    """Return a counter state from a first reading at START."""
+    return CounterState(
+        time=START,
+        value=value,
+        offset=0.0,
+        hour=START.replace(minute=0),
+        hour_total=value,
+        sum=0.0,
+    )
+
+
+def test_gap_is_spread_over_the_hours() -> None:
+    """Test the counter's increase over a gap is interpolated to each hour."""
+    state = _state(100.0)
+
+    rows = list(hourly_statistics(state, START + 3 * HOUR, 106.0))
+
+    assert [row["start"] for row in rows] == [
+        START.replace(minute=0) + hour * HOUR for hour in range(3)
+    ]
+    assert [row["state"] for row in rows] == [101.0, 103.0, 105.0]
+    assert [row["sum"] for row in rows] == [1.0, 3.0, 5.0]
+    # The part of the last hour read so far waits for the hour to end
+    assert state.hour == START.replace(minute=0) + 3 * HOUR
+    assert state.hour_total == 105.0
+
+
+def test_readings_within_an_hour_yield_nothing() -> None:
+    """Test no hour is completed until a reading passes its end."""
+    state = _state(100.0)
+
+    assert list(hourly_statistics(state, START + timedelta(minutes=20), 101.0)) == []
+    rows = list(hourly_statistics(state, START + timedelta(minutes=40), 102.0))
+
+    # 10:50 read 101 and 11:10 read 102, so 11:00 is halfway between
+    assert rows == [{"start": START.replace(minute=0), "state": 101.5, "sum": 1.5}]
+
+
+def test_counter_reset_continues_the_sum() -> None:
+    """Test a counter going backwards keeps adding to the statistics."""
+    state = _state(100.0)
+
+    rows = list(hourly_statistics(state, START + HOUR, 2.0))
+
+    assert rows[0]["sum"] == pytest.approx(1.0)
+    assert state.offset == 100.0
+    assert state.total == 102.0
+
+
+async def test_long_gap_is_imported_in_chunks(hass: HomeAssistant) -> None:
+    """Test a gap is imported a chunk at a time, waiting for the recorder."""
+    statistics = IndraV2HStatistics(hass, MagicMock(), "entry")
+    recorder = MagicMock(async_block_till_done=AsyncMock())
+    calls: list[tuple[str, int, int]] = []
+
+    def add_statistics(hass, metadata, chunk) -> None:
+        written = recorder.async_block_till_done.await_count
+        calls.append((metadata["statistic_id"], len(chunk), written))
+
+    statistics._pending = [
+        ("SIM00000", "energy_to_ev", START, 100.0),
+        ("SIM00000", "energy_to_ev", START + 12 * HOUR, 112.0),
+    ]
+    with (
+        patch("custom_components.indra_v2h.backfill.IMPORT_CHUNK_HOURS", 5),
+        patch(
+            "custom_components.indra_v2h.backfill.get_instance", return_value=recorder
+        ),
+        patch(
+            "custom_components.indra_v2h.backfill.async_add_external_statistics",
+            side_effect=add_statistics,
+        ),
+    ):
+        await statistics._async_import()
+        await statistics.async_stop()
+
+    stat_id = statistic_id("SIM00000", "energy_to_ev")
+    # Each chunk is added once the recorder has written the one before
+    assert calls == [(stat_id, 5, 0), (stat_id, 5, 1), (stat_id, 2, 2)]
+    assert recorder.async_block_till_done.await_count == 3
+    # Up to 22:00; the half hour after it waits for the next reading
+    assert statistics._states[stat_id].sum == pytest.approx(11.5)
@@ -0,0 +1,118 @@
+"""Benchmarks of the client and coordinator against the API simulator.
+
+Run them on their own with
+    pytest tests/test_benchmark.py --benchmark-only --no-cov
+
+Each round is sent to the test's event loop from pytest-benchmark's
+thread, and waited for there. Requests per poll, and the client's memory
+per device, are saved in the benchmark's extra_info.
+"""
+from __future__ import annotations
+
+import asyncio
+import tracemalloc
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+import httpx
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.indra_v2h.client import IndraV2HClient
+from custom_components.indra_v2h.coordinator import IndraV2HDataUpdateCoordinator
+from indra_api_simulator import IndraAPISimulator
+
+pytest.importorskip("pytest_benchmark")
+
+ROUNDS = 20
+LATENCY = 0.05
+JITTER = 0.01
+
+
+@pytest.fixture
+async def slow_simulator(simulator: IndraAPISimulator) -> IndraAPISimulator:
+    """Return the simulator, answering with some latency like the cloud."""
+    simulator.latency = LATENCY
+    simulator.jitter = JITTER
+    return simulator
+
+
+@pytest.fixture
+async def http_client() -> AsyncIterator[httpx.AsyncClient]:
+    """Return a shared HTTP client, like the integration's."""
+    async with httpx.AsyncClient() as client:
+        yield client
+
+
+async def _async_benchmark(
+    hass: HomeAssistant,
+    benchmark: Any,
+    simulator: IndraAPISimulator,
+    poll: Callable[[], Awaitable[Any]],
+) -> None:
+    """Benchmark rounds of poll, recording the requests each one sends."""
+    await poll()  # log in and read the device list, if not done yet
+    before = sum(simulator.requests.values())
+
+    def run_round() -> None:
+        asyncio.run_coroutine_threadsafe(poll(), hass.loop).result()
+
+    await hass.async_add_executor_job(
+        lambda: benchmark.pedantic(run_round, rounds=ROUNDS, iterations=1)
+    )
+    benchmark.extra_info["requests_per_poll"] = (
+        sum(simulator.requests.values()) - before
+    ) / ROUNDS
+
+
+@pytest.mark.parametrize("pooled", [True, False], ids=["pooled", "client_per_request"])
+async def test_client_fetch_data(
+    hass: HomeAssistant,
+    benchmark: Any,
+    slow_simulator: IndraAPISimulator,
+    http_client: httpx.AsyncClient,
+    pooled: bool,
+) -> None:
+    """Benchmark IndraV2HClient.fetch_data() polls."""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.take_snapshot()
+        # Back-to-back polls would otherwise be answered by the last one's reads
+        client = IndraV2HClient(
+            slow_simulator.email,
+            slow_simulator.password,
+            http_client=http_client if pooled else None,
+            read_share_ttl=0,
+        )
+        await client.fetch_data()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    allocated = sum(
+        stat.size_diff for stat in snapshot.compare_to(baseline, "filename")
+    )
+    benchmark.extra_info["kib_per_device"] = round(
+        allocated / len(slow_simulator.chargers) / 1024, 1
+    )
+    await _async_benchmark(hass, benchmark, slow_simulator, client.fetch_data)
+
+
+async def test_coordinator_refresh(
+    hass: HomeAssistant,
+    benchmark: Any,
+    slow_simulator: IndraAPISimulator,
+    http_client: httpx.AsyncClient,
+) -> None:
+    """Benchmark IndraV2HDataUpdateCoordinator.async_refresh() polls."""
+    client = IndraV2HClient(
+        slow_simulator.email,
+        slow_simulator.password,
+        http_client=http_client,
+        read_share_ttl=0,
+    )
+    coordinator = IndraV2HDataUpdateCoordinator(hass, client)
+
+    await _async_benchmark(hass, benchmark, slow_simulator, coordinator.async_refresh)
+    assert coordinator.last_update_success
+    await coordinator.async_shutdown()
@@ -0,0 +1,137 @@
+"""Tests for the Indra V2H mode command queue."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.indra_v2h.commands import CommandQueue
+
+DEBOUNCE = 0.01
+
+
+class FakeCharger:
+    """Records the modes written to it, as the client's send would."""
+
+    def __init__(self, mode: str | None = "SCHEDULE") -> None:
+        """Initialize the charger in a mode."""
+        self.mode = mode
+        self.sent: list[str] = []
+        self.drained = 0
+        self.error: Exception | None = None
+
+    async def send(self, mode: str) -> None:
+        """Write a mode."""
+        if self.error is not None:
+            raise self.error
+        self.sent.append(mode)
+
+    async def on_drained(self) -> None:
+        """Confirm what was sent, like the coordinator's refresh."""
+        self.drained += 1
+        if self.sent:
+            self.mode = self.sent[-1]
+
+    def queue(self) -> CommandQueue:
+        """Return a command queue writing to this charger."""
+        return CommandQueue(
+            self.send, lambda: self.mode, self.on_drained, debounce=DEBOUNCE
+        )
+
+
+async def test_burst_is_coalesced_to_the_last_mode() -> None:
+    """Test only the last of a burst of writes is sent."""
+    charger = FakeCharger()
+    queue = charger.queue()
+
+    results = await asyncio.gather(
+        queue.submit("CHARGE"),
+        queue.submit("DISCHARGE"),
+        queue.submit("IDLE"),
+        queue.submit("IDLE"),
+    )
+    assert results == [False, False, True, True]
+    assert charger.sent == ["IDLE"]
+    assert charger.drained == 1
+    assert charger.mode == "IDLE"
+
+
+async def test_mode_already_set_is_skipped() -> None:
+    """Test a write for the charger's mode isn't sent or confirmed."""
+    charger = FakeCharger("CHARGE")
+    queue = charger.queue()
+
+    assert await queue.submit("CHARGE") is False
+    assert charger.sent == []
+    assert charger.drained == 0
+
+
+async def test_mode_sent_but_not_yet_reported_is_skipped() -> None:
+    """Test a write repeating one sent in the same burst isn't sent again."""
+    charger = FakeCharger()
+    sending = asyncio.Event()
+    release = asyncio.Event()
+
+    async def send(mode: str) -> None:
+        sending.set()
+        await release.wait()
+        await charger.send(mode)
+
+    queue = CommandQueue(send, lambda: charger.mode, charger.on_drained, DEBOUNCE)
+    first = asyncio.create_task(queue.submit("CHARGE"))
+    await sending.wait()
+
+    # Queued while the first write is in flight; the charger still reports
+    # SCHEDULE as the burst hasn't been confirmed yet
+    second = asyncio.create_task(queue.submit("CHARGE"))
+    await asyncio.sleep(0)
+    release.set()
+    assert await first is True
+    assert await second is False
+    assert charger.sent == ["CHARGE"]
+    assert charger.drained == 1
+
+
+async def test_send_errors_reach_the_callers() -> None:
+    """Test a failed write is raised to its waiters and isn't confirmed."""
+    charger = FakeCharger()
+    charger.error = RuntimeError("offline")
+    queue = charger.queue()
+
+    with pytest.raises(RuntimeError, match="offline"):
+        await queue.submit("CHARGE")
+    assert charger.drained == 0
+
+    charger.error = None
+    assert await queue.submit("CHARGE") is True
+    assert charger.drained == 1
+
+
+async def test_drained_runs_after_each_burst() -> None:
+    """Test every burst that sends something is confirmed once."""
+    charger = FakeCharger()
+    queue = charger.queue()
+
+    assert await queue.submit("CHARGE") is True
+    assert await queue.submit("DISCHARGE") is True
+    assert charger.sent == ["CHARGE", "DISCHARGE"]
+    assert charger.drained == 2
+
+
+async def test_cancel_drops_pending_writes() -> None:
+    """Test cancelling the queue cancels its waiters without sending."""
+    charger = FakeCharger()
+    queue = charger.queue()
+
+    pending = asyncio.create_task(queue.submit("CHARGE"))
+    await asyncio.sleep(0)
+    queue.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await pending
+    await asyncio.sleep(2 * DEBOUNCE)
+    assert charger.sent == []
+    assert charger.drained == 0
+
+    # The queue can be used again afterwards
+    assert await queue.submit("DISCHARGE") is True
+    assert charger.sent == ["DISCHARGE"]
@@ -0,0 +1,123 @@
+"""Tests for the Indra V2H coordinator."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.indra_v2h.client import IndraV2HClient
+from custom_components.indra_v2h.const import DOMAIN
+from custom_components.indra_v2h.coordinator import IndraV2HDataUpdateCoordinator
+from indra_api_simulator import IndraAPISimulator
+
+from .common import mock_entry
+
+IDLE = {
+    "SIM00000": {"device": {}, "statistics": {"mode": "IDLE", "data": {"powerToEv": 0}}}
+}
+ACTIVE = {
+    "SIM00000": {
+        "device": {},
+        "statistics": {"mode": "CHARGE", "data": {"powerToEv": 7000}},
+    }
+}
+
+
+async def test_idle_back_off_stays_at_slow_interval(hass: HomeAssistant) -> None:
+    """Test a long idle spell backs off to the slow interval and stays there."""
+    coordinator = IndraV2HDataUpdateCoordinator(hass, MagicMock())
+
+    intervals = [coordinator._next_update_interval(IDLE) for _ in range(1000)]
+
+    assert intervals[0] == coordinator.fast_interval * 2
+    assert intervals[-1] == coordinator.slow_interval
+    assert coordinator._next_update_interval(ACTIVE) == coordinator.fast_interval
+    assert coordinator._next_update_interval(IDLE) == coordinator.fast_interval * 2
+
+
+async def test_statistics_without_data_are_idle(hass: HomeAssistant) -> None:
+    """Test telemetry with null or missing data counts as idle."""
+    coordinator = IndraV2HDataUpdateCoordinator(hass, MagicMock())
+
+    for statistics in ({"mode": "IDLE", "data": None}, {"mode": "IDLE"}, {}):
+        data = {"SIM00000": {"device": {}, "statistics": statistics}}
+        assert coordinator._next_update_interval(data) > coordinator.fast_interval
+
+
+@pytest.fixture
+def fast_confirm() -> Iterator[None]:
+    """Confirm mode changes quickly, and give up on them soon."""
+    with (
+        patch("custom_components.indra_v2h.coordinator.MODE_CONFIRM_INTERVAL", 0.01),
+        patch("custom_components.indra_v2h.coordinator.MODE_CONFIRM_TIMEOUT", 0.2),
+    ):
+        yield
+
+
+async def _async_setup(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> IndraV2HDataUpdateCoordinator:
+    """Set up an entry on the simulator and return its coordinator."""
+    entry = mock_entry(simulator)
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return hass.data[DOMAIN][entry.entry_id]
+
+
+async def test_set_mode_is_optimistic_until_confirmed(
+    hass: HomeAssistant, simulator: IndraAPISimulator, fast_confirm: None
+) -> None:
+    """Test a requested mode is shown at once and cleared once confirmed."""
+    coordinator = await _async_setup(hass, simulator)
+    serial = next(iter(simulator.chargers))
+
+    task = hass.async_create_task(coordinator.async_set_mode(serial, "charge"))
+    await asyncio.sleep(0)
+    assert coordinator.optimistic_modes == {serial: "charge"}
+    assert coordinator.fields_changed(serial, ["mode"])
+
+    assert await task is True
+    assert coordinator.optimistic_modes == {}
+    assert coordinator.snapshots[serial].mode == "charge"
+    assert simulator.chargers[serial].mode == "CHARGE"
+
+    await hass.config_entries.async_unload(coordinator.config_entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_unconfirmed_mode_is_rolled_back(
+    hass: HomeAssistant, simulator: IndraAPISimulator, fast_confirm: None
+) -> None:
+    """Test a mode the charger never reports is rolled back with an error."""
+    coordinator = await _async_setup(hass, simulator)
+    serial = next(iter(simulator.chargers))
+
+    # The write is accepted, but the charger stays in its schedule
+    with (
+        patch.object(IndraV2HClient, "_set_mode_async", AsyncMock()),
+        pytest.raises(HomeAssistantError, match="did not switch"),
+    ):
+        await coordinator.async_set_mode(serial, "discharge")
+    assert coordinator.optimistic_modes == {}
+    assert coordinator.snapshots[serial].mode == "schedule"
+    assert simulator.chargers[serial].mode == "SCHEDULE"
+
+    await hass.config_entries.async_unload(coordinator.config_entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_optimistic_mode_keeps_changed_fields(hass: HomeAssistant) -> None:
+    """Test showing a requested mode keeps the fields the last update changed."""
+    coordinator = IndraV2HDataUpdateCoordinator(hass, MagicMock())
+    coordinator._changed_fields = {"SIM00000": {"power"}, "SIM00001": {"soc"}}
+
+    coordinator._async_set_optimistic_mode("SIM00000", "charge")
+
+    assert coordinator.fields_changed("SIM00000", ["power"])
+    assert coordinator.fields_changed("SIM00000", ["mode"])
+    assert coordinator.fields_changed("SIM00001", ["soc"])
@@ -0,0 +1,43 @@
+"""Tests for the Indra V2H diagnostics."""
+from __future__ import annotations
+
+import json
+
+from homeassistant.components.diagnostics import REDACTED
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.indra_v2h.const import DOMAIN
+from custom_components.indra_v2h.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from indra_api_simulator import IndraAPISimulator
+
+
+async def test_diagnostics_redact_chargers(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> None:
+    """Test the chargers' serials and credentials are left out."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"email": simulator.email, "password": simulator.password},
+        unique_id=simulator.email,
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+    assert list(diagnostics["data"]) == ["charger_1", "charger_2"]
+    charger = diagnostics["data"]["charger_1"]
+    assert charger["device"]["deviceUID"] == REDACTED
+    assert charger["device"]["model"] == "V2H-SIM"
+    assert "powerToEv" in charger["statistics"]["data"]
+    assert diagnostics["entry"]["data"]["password"] == REDACTED
+    dump = json.dumps(diagnostics, default=str)
+    for secret in (*simulator.chargers, simulator.email):
+        assert secret not in dump
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
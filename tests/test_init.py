@@ -0,0 +1,160 @@
+"""Tests for setting up the Indra V2H integration."""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.indra_v2h.const import (
+    CONF_BLOCK_THRESHOLD,
+    CONF_SAMPLE_INTERVAL,
+    DOMAIN,
+)
+from custom_components.indra_v2h.coordinator import IndraV2HDataUpdateCoordinator
+from custom_components.indra_v2h.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.indra_v2h.planner import async_get_poll_planner
+from custom_components.indra_v2h.profiler import TimedClient
+from indra_api_simulator import IndraAPISimulator
+
+from .common import cache_entry, mock_entry
+
+
+async def test_migration_leaves_new_energy_keys_alone(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> None:
+    """Test reloading keeps window_energy, which ends like the old energy ID."""
+    entry = mock_entry(simulator, **{CONF_SAMPLE_INTERVAL: 5})
+    entry.add_to_hass(hass)
+    registry = er.async_get(hass)
+    serial = next(iter(simulator.chargers))
+    legacy = registry.async_get_or_create(
+        "sensor", DOMAIN, f"{serial}_energy", config_entry=entry
+    )
+
+    for _ in range(3):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        assert entry.state is ConfigEntryState.LOADED
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+    unique_ids = {
+        registry_entry.unique_id
+        for registry_entry in er.async_entries_for_config_entry(registry, entry.entry_id)
+    }
+    assert registry.async_get(legacy.entity_id).unique_id == f"{serial}_energy_to_ev"
+    assert f"{serial}_window_energy" in unique_ids
+    assert f"{serial}_window_energy_to_ev" not in unique_ids
+
+
+async def test_setup_retries_while_cloud_is_down(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> None:
+    """Test setup is retried when the first refresh can't reach the cloud."""
+    simulator.outage = True
+    entry = mock_entry(simulator)
+    entry.add_to_hass(hass)
+
+    assert not await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert entry.state is ConfigEntryState.SETUP_RETRY
+    assert entry.entry_id not in hass.data.get(DOMAIN, {})
+
+
+async def test_failed_setup_stops_what_it_started(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> None:
+    """Test a failure late in setup stops the sampler, scheduler and poll slot."""
+    entry = mock_entry(simulator, **{CONF_SAMPLE_INTERVAL: 5})
+    entry.add_to_hass(hass)
+
+    with patch.object(
+        hass.config_entries,
+        "async_forward_entry_setups",
+        side_effect=RuntimeError("boom"),
+    ):
+        assert not await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert entry.state is ConfigEntryState.SETUP_ERROR
+    assert entry.entry_id not in hass.data[DOMAIN]
+    assert not len(async_get_poll_planner(hass))
+
+
+async def test_block_threshold_option_keeps_watchdog_running(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> None:
+    """Test the block threshold option watches the loop until unload."""
+    entry = mock_entry(simulator, **{CONF_BLOCK_THRESHOLD: 0.05})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    watchdog = coordinator.watchdog
+
+    assert isinstance(coordinator.client, TimedClient)
+    await coordinator.async_refresh()
+    time.sleep(0.2)  # block the loop
+    await asyncio.sleep(0.1)
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["watchdog"]["block_threshold"] == 0.05
+    assert diagnostics["watchdog"]["client_awaits"]["fetch_data"]["calls"] >= 2
+    assert diagnostics["watchdog"]["loop_blocks"][-1]["duration"] >= 0.15
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(watchdog._thread.join, 1)
+    assert not watchdog._thread.is_alive()
+
+
+async def test_watchdog_is_off_by_default(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> None:
+    """Test the loop is only watched while profiling without the option."""
+    entry = mock_entry(simulator)
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    assert coordinator.watchdog is None
+    assert not isinstance(coordinator.client, TimedClient)
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["watchdog"] is None
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_set_mode_after_restoring_from_cache(
+    hass: HomeAssistant, hass_storage: dict[str, Any], simulator: IndraAPISimulator
+) -> None:
+    """Test modes can be set before the first refresh after a restart."""
+    entry = mock_entry(simulator)
+    entry.add_to_hass(hass)
+    cache_entry(hass_storage, entry, simulator)
+    serial = next(iter(simulator.chargers))
+
+    # Hold back the background first refresh
+    with patch.object(
+        IndraV2HDataUpdateCoordinator, "async_refresh_in_slot", AsyncMock()
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    assert coordinator.client.last_poll is None
+
+    assert await coordinator.client.set_mode("charge", serial)
+    assert simulator.chargers[serial].mode == "CHARGE"
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
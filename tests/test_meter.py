@@ -0,0 +1,82 @@
+"""Tests for the Indra V2H energy meters."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from custom_components.indra_v2h.const import METER_MAX_GAP
+from custom_components.indra_v2h.meter import EnergyMeter
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _meter(*readings: tuple[float | None, float | None]) -> EnergyMeter:
+    """Return a meter fed (counter, power) readings a minute apart."""
+    meter = EnergyMeter()
+    for minute, (counter, power) in enumerate(readings):
+        meter.update(START + timedelta(minutes=minute), counter, power)
+    return meter
+
+
+def test_counter_increases_are_added() -> None:
+    """Test the meter starts at the counter and follows its increases."""
+    meter = _meter((100.0, None), (100.5, None), (101.5, None))
+    assert meter.total == pytest.approx(101.5)
+
+
+def test_counter_reset_counts_energy_since_the_reset() -> None:
+    """Test a counter that stays low after dropping was reset."""
+    meter = _meter((100.0, None), (0.5, None), (1.0, None), (1.5, None))
+    assert meter.total == pytest.approx(101.5)
+    assert meter.peak is None
+
+
+def test_negative_glitch_is_ignored() -> None:
+    """Test a counter that drops for one reading doesn't lose or add energy."""
+    meter = _meter((100.0, None), (0.0, None), (100.5, None))
+    assert meter.total == pytest.approx(100.5)
+
+    # Held at the old total while it can't yet tell a glitch from a reset
+    meter = _meter((100.0, None), (99.0, None))
+    assert meter.total == pytest.approx(100.0)
+    assert meter.peak == 100.0
+
+
+def test_power_is_integrated_while_the_counter_is_missing() -> None:
+    """Test power-only readings are added with the trapezoidal rule."""
+    # 6 kW rising to 12 kW over a minute is 9 kW on average: 0.15 kWh
+    meter = _meter((100.0, 6.0), (None, 12.0), (None, 12.0))
+    assert meter.total == pytest.approx(100.0 + 0.15 + 0.2)
+    assert meter.integrated == pytest.approx(0.35)
+
+    # The counter coming back isn't counted on top of the integrated energy
+    meter.update(START + timedelta(minutes=3), 100.5, 12.0)
+    assert meter.total == pytest.approx(100.5)
+    assert meter.integrated == 0.0
+
+
+def test_power_only_meter_starts_from_zero() -> None:
+    """Test a charger without counters is metered from its power alone."""
+    meter = _meter((None, 3.0), (None, 3.0))
+    assert meter.total == pytest.approx(0.05)
+
+
+def test_power_is_not_integrated_over_long_gaps() -> None:
+    """Test a gap in the readings doesn't add a guess of the energy in it."""
+    meter = _meter((100.0, 6.0))
+    meter.update(START + timedelta(seconds=METER_MAX_GAP + 60), None, 6.0)
+    assert meter.total == pytest.approx(100.0)
+
+
+def test_old_readings_are_ignored() -> None:
+    """Test a reading no newer than the last doesn't change the meter."""
+    meter = _meter((100.0, None), (101.0, None))
+    meter.update(START, 102.0, None)
+    assert meter.total == pytest.approx(101.0)
+
+
+def test_stored_meter_is_restored() -> None:
+    """Test a meter survives a round trip through storage."""
+    meter = _meter((100.0, 6.0), (None, 6.0))
+    assert EnergyMeter.from_dict(meter.as_dict()) == meter
@@ -0,0 +1,161 @@
+"""Tests for the Indra V2H optimise service."""
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+import voluptuous as vol
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.indra_v2h.const import DOMAIN
+from custom_components.indra_v2h.optimiser import (
+    BatteryParameters,
+    PriceSlot,
+    plan_modes,
+)
+from indra_api_simulator import IndraAPISimulator
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+HOUR = timedelta(hours=1)
+
+
+@pytest.fixture
+async def mode_entity_id(hass: HomeAssistant, simulator: IndraAPISimulator) -> str:
+    """Set up an entry on the simulator and return a charger's mode select."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"email": simulator.email, "password": simulator.password},
+        unique_id=simulator.email,
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    serial = next(iter(simulator.chargers))
+    return er.async_get(hass).async_get_entity_id("select", DOMAIN, f"{serial}_mode")
+
+
+async def _async_optimise(hass: HomeAssistant, entity_id: str, **data) -> dict:
+    """Call the optimise service."""
+    return await hass.services.async_call(
+        DOMAIN,
+        "optimise",
+        {"entity_id": entity_id, "capacity": 60, "soc": 50, **data},
+        blocking=True,
+        return_response=True,
+    )
+
+
+async def test_price_file_in_config_dir(
+    hass: HomeAssistant, mode_entity_id: str, tmp_path: Path
+) -> None:
+    """Test a price file in the config directory is read."""
+    hass.config.config_dir = str(tmp_path)
+    start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+    prices = [
+        {
+            "start": (start + timedelta(minutes=30 * slot)).isoformat(),
+            "end": (start + timedelta(minutes=30 * (slot + 1))).isoformat(),
+            "value_inc_vat": 10 + slot,
+        }
+        for slot in range(8)
+    ]
+    (tmp_path / "prices.json").write_text(json.dumps(prices))
+
+    plan = await _async_optimise(hass, mode_entity_id, price_file="prices.json")
+
+    assert plan["slots"]
+
+
+async def test_price_file_outside_config_dir(
+    hass: HomeAssistant, mode_entity_id: str, tmp_path: Path
+) -> None:
+    """Test a price file outside the config directory is refused."""
+    hass.config.config_dir = str(tmp_path / "config")
+
+    with pytest.raises(ServiceValidationError):
+        await _async_optimise(hass, mode_entity_id, price_file="../../etc/passwd")
+
+
+async def test_unknown_field_is_rejected(
+    hass: HomeAssistant, mode_entity_id: str
+) -> None:
+    """Test a misspelt field isn't silently ignored."""
+    with pytest.raises(vol.Invalid):
+        await _async_optimise(hass, mode_entity_id, price_fille="prices.json")
+
+
+def _slots(*prices: float) -> list[PriceSlot]:
+    """Return hourly price slots from START."""
+    return [
+        PriceSlot(START + index * HOUR, START + (index + 1) * HOUR, price)
+        for index, price in enumerate(prices)
+    ]
+
+
+def _battery(**changes) -> BatteryParameters:
+    """Return a 10 kWh battery moving 20% per hour of charge or discharge."""
+    return BatteryParameters(
+        **{
+            "capacity": 10,
+            "soc": 50,
+            "target_soc": 50,
+            "deadline": None,
+            "charge_power": 2,
+            "discharge_power": 2,
+            "min_soc": 20,
+            "efficiency": 1,
+            "resolution": 10,
+            **changes,
+        }
+    )
+
+
+def test_plan_buys_cheap_and_sells_dear() -> None:
+    """Test the plan charges in the cheap slots and discharges in the dear ones."""
+    plan = plan_modes(_slots(0.10, 0.30, 0.05, 0.40), _battery())
+
+    assert [slot.mode for slot in plan.slots] == [
+        "charge",
+        "discharge",
+        "charge",
+        "discharge",
+    ]
+    assert [slot.soc for slot in plan.slots] == [70, 50, 70, 50]
+    # 2 kWh bought at 0.10 and 0.05, and sold at 0.30 and 0.40
+    assert plan.cost == pytest.approx(-1.10)
+
+
+def test_plan_reaches_the_target_by_the_deadline() -> None:
+    """Test the plan charges in the cheapest slots before the deadline."""
+    plan = plan_modes(
+        _slots(0.10, 0.30, 0.05, 0.40),
+        _battery(target_soc=90, deadline=START + 3 * HOUR),
+    )
+
+    assert plan.windows() == [
+        ("charge", START, START + HOUR),
+        ("idle", START + HOUR, START + 2 * HOUR),
+        ("charge", START + 2 * HOUR, START + 3 * HOUR),
+        ("idle", START + 3 * HOUR, START + 4 * HOUR),
+    ]
+    assert plan.slots[-1].soc == 90
+    assert plan.cost == pytest.approx(0.30)
+
+
+def test_plan_keeps_to_the_minimum() -> None:
+    """Test the plan doesn't discharge below the minimum state of charge."""
+    plan = plan_modes(_slots(0.40, 0.40), _battery(soc=30, target_soc=0))
+
+    assert [slot.mode for slot in plan.slots] == ["idle", "idle"]
+
+
+def test_unreachable_target_is_refused() -> None:
+    """Test a target the charger can't reach in time raises ValueError."""
+    with pytest.raises(ValueError, match="Can't reach 100%"):
+        plan_modes(_slots(0.10), _battery(target_soc=100))
@@ -0,0 +1,99 @@
+"""Tests for the Indra V2H poll planner."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.indra_v2h.coordinator import IndraV2HDataUpdateCoordinator
+from custom_components.indra_v2h.planner import PollPlanner, PollSlot
+from indra_api_simulator import IndraAPISimulator
+
+from .common import mock_entry
+
+NOW = 1_800_000.0  # on the grid of every interval tested
+IDLE_INTERVAL = 300
+
+
+@pytest.fixture
+def no_jitter() -> Iterator[None]:
+    """Poll exactly on the planned grid."""
+    with patch("custom_components.indra_v2h.planner.POLL_JITTER", 0):
+        yield
+
+
+def _slots(count: int) -> tuple[PollPlanner, list[PollSlot]]:
+    """Return a planner with some slots."""
+    planner = PollPlanner()
+    return planner, [planner.async_add() for _ in range(count)]
+
+
+@pytest.mark.usefixtures("no_jitter")
+@pytest.mark.parametrize("interval", [30, 60, IDLE_INTERVAL])
+def test_slots_are_spread_over_the_interval(interval: int) -> None:
+    """Test entries polling at the same interval are spread over all of it."""
+    _, slots = _slots(4)
+
+    offsets = sorted((NOW + slot.delay(NOW, interval)) % interval for slot in slots)
+
+    assert offsets == [0, interval / 4, interval / 2, 3 * interval / 4]
+
+
+@pytest.mark.usefixtures("no_jitter")
+def test_delay_is_at_least_the_minimum() -> None:
+    """Test a poll due sooner than the minimum moves to the next interval."""
+    _, (slot,) = _slots(1)
+
+    # Due in 10s, less than half the interval by default
+    assert slot.delay(NOW - 10, 60) == 70
+    assert slot.delay(NOW - 10, 60, minimum=0) == 10
+    assert slot.delay(NOW - 40, 60) == 40
+
+
+def test_jitter_is_added() -> None:
+    """Test the delay is jittered by up to POLL_JITTER."""
+    _, (slot,) = _slots(1)
+
+    delays = {slot.delay(NOW, 60) for _ in range(20)}
+
+    assert len(delays) > 1
+    assert all(60 <= delay <= 61 for delay in delays)
+
+
+def test_released_slots_rebalance() -> None:
+    """Test the remaining slots spread out again when one is released."""
+    planner, slots = _slots(3)
+
+    slots[0].async_release()
+
+    assert len(planner) == 2
+    assert [slot.phase for slot in slots] == [0.0, 0.0, 0.5]
+    assert slots[2].as_dict() == {"slots": 2, "phase": 0.5}
+
+
+async def test_slot_is_assigned_before_the_first_refresh(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> None:
+    """Test the first refresh already schedules the next poll in the slot."""
+    slots = []
+    update_data = IndraV2HDataUpdateCoordinator._async_update_data
+
+    async def _async_update_data(self: IndraV2HDataUpdateCoordinator):
+        slots.append(self.poll_slot)
+        return await update_data(self)
+
+    entry = mock_entry(simulator)
+    entry.add_to_hass(hass)
+    with patch.object(
+        IndraV2HDataUpdateCoordinator, "_async_update_data", _async_update_data
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert slots
+    assert slots[0] is not None
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,68 @@
+"""Tests for the HTTP pool shared by Indra V2H entries."""
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, patch
+
+from homeassistant import config_entries
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.indra_v2h.const import DATA_HTTP_CLIENT, DOMAIN
+from custom_components.indra_v2h.pool import (
+    async_close_http_client,
+    async_get_http_client,
+)
+from indra_api_simulator import IndraAPISimulator
+
+
+def _close_listeners(hass: HomeAssistant) -> int:
+    """Return the number of listeners for Home Assistant closing."""
+    return hass.bus.async_listeners().get(EVENT_HOMEASSISTANT_CLOSE, 0)
+
+
+async def test_pool_is_shared_and_closed(hass: HomeAssistant) -> None:
+    """Test the pool is created once, and its close listener removed with it."""
+    listeners = _close_listeners(hass)
+
+    for _ in range(3):
+        client = async_get_http_client(hass, 5)
+        assert async_get_http_client(hass) is client
+        assert _close_listeners(hass) == listeners + 1
+
+        await async_close_http_client(hass)
+        assert client.is_closed
+        assert _close_listeners(hass) == listeners
+
+
+async def test_pool_is_closed_with_home_assistant(hass: HomeAssistant) -> None:
+    """Test the pool closes when Home Assistant does, once only."""
+    client = async_get_http_client(hass)
+
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_CLOSE)
+    await hass.async_block_till_done()
+    assert client.is_closed
+
+    # Entries unloaded afterwards don't remove the listener again
+    await async_close_http_client(hass)
+    assert DATA_HTTP_CLIENT not in hass.data[DOMAIN]
+
+
+async def test_config_flow_leaves_the_pool_to_entries(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> None:
+    """Test validating credentials doesn't create the pool with default limits."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    with patch(
+        "custom_components.indra_v2h.async_setup_entry", AsyncMock(return_value=True)
+    ):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            {"email": simulator.email, "password": simulator.password},
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert DATA_HTTP_CLIENT not in hass.data.get(DOMAIN, {})
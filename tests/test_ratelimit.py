@@ -0,0 +1,115 @@
+"""Tests for the request budget shared by Indra V2H clients."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.indra_v2h.const import DOMAIN
+from custom_components.indra_v2h.pool import DATA_RATE_LIMITER
+from custom_components.indra_v2h.ratelimit import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_READ,
+    PRIORITY_WRITE,
+    RateLimiter,
+)
+from indra_api_simulator import IndraAPISimulator
+
+from .common import mock_entry
+
+RATE = 20  # requests per second
+
+
+async def test_waiting_requests_go_in_priority_order() -> None:
+    """Test writes go before reads, and reads before background reads."""
+    limiter = RateLimiter(RATE, 1)
+    await limiter.acquire()
+    granted: list[int] = []
+
+    async def acquire(priority: int) -> None:
+        await limiter.acquire(priority)
+        granted.append(priority)
+
+    priorities = [
+        PRIORITY_BACKGROUND,
+        PRIORITY_READ,
+        PRIORITY_WRITE,
+        PRIORITY_BACKGROUND,
+        PRIORITY_WRITE,
+    ]
+    await asyncio.gather(*(acquire(priority) for priority in priorities))
+
+    assert granted == sorted(priorities)
+    stats = limiter.as_dict()["priorities"]
+    assert stats["write"]["granted"] == 2
+    assert stats["read"]["granted"] == 2
+    assert stats["background"]["granted"] == 2
+    assert stats["background"]["max_wait"] >= stats["write"]["max_wait"]
+
+
+async def test_bucket_refills_at_the_rate() -> None:
+    """Test a burst is let through at once, then one request per refill."""
+    limiter = RateLimiter(RATE, 3)
+
+    start = time.monotonic()
+    for _ in range(3):
+        await limiter.acquire()
+    assert time.monotonic() - start < 1 / RATE
+
+    for _ in range(2):
+        await limiter.acquire()
+    assert time.monotonic() - start >= 2 / RATE * 0.9
+
+    # An idle bucket refills up to the burst size, and no further
+    await asyncio.sleep(5 / RATE)
+    assert limiter.as_dict()["tokens"] == 3
+    assert limiter.as_dict()["requests_last_minute"] == 5
+
+
+async def test_cancelled_waiter_gives_up_its_place() -> None:
+    """Test a cancelled request doesn't hold up the ones behind it."""
+    limiter = RateLimiter(RATE, 1)
+    await limiter.acquire()
+
+    cancelled = asyncio.create_task(limiter.acquire(PRIORITY_WRITE))
+    waiting = asyncio.create_task(limiter.acquire(PRIORITY_BACKGROUND))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    await asyncio.wait_for(waiting, 2 / RATE)
+    stats = limiter.as_dict()["priorities"]
+    assert stats["write"]["granted"] == 0
+    assert stats["background"]["granted"] == 1
+
+
+async def test_entries_share_one_budget(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> None:
+    """Test every config entry draws from the same limiter until the last unloads."""
+    first = mock_entry(simulator)
+    second = MockConfigEntry(
+        domain=DOMAIN,
+        data={"email": simulator.email, "password": simulator.password},
+        unique_id="second",
+    )
+    for entry in (first, second):
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    limiter = hass.data[DOMAIN][DATA_RATE_LIMITER]
+    assert hass.data[DOMAIN][first.entry_id].client.rate_limiter is limiter
+    assert hass.data[DOMAIN][second.entry_id].client.rate_limiter is limiter
+    # Every API request of both entries, but not the logins, was counted
+    api_requests = sum(
+        count for route, count in simulator.requests.items() if route.startswith("/api")
+    )
+    assert limiter.as_dict()["requests_last_minute"] == api_requests
+
+    assert await hass.config_entries.async_unload(first.entry_id)
+    assert hass.data[DOMAIN][DATA_RATE_LIMITER] is limiter
+    assert await hass.config_entries.async_unload(second.entry_id)
+    await hass.async_block_till_done()
+    assert DATA_RATE_LIMITER not in hass.data[DOMAIN]
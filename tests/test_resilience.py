@@ -0,0 +1,218 @@
+"""Tests for retries and the circuit breaker, against the API simulator."""
+from __future__ import annotations
+
+import asyncio
+import socket
+import time
+from collections.abc import AsyncIterator
+
+import httpx
+import pyindrav2h.connection
+import pytest
+from pyindrav2h.exceptions import WrongCredentialsException
+
+from custom_components.indra_v2h.connection import (
+    IndraV2HConnection,
+    RequestConnectionError,
+    ServerError,
+)
+from custom_components.indra_v2h.resilience import (
+    BREAKER_CLOSED,
+    BREAKER_HALF_OPEN,
+    BREAKER_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+)
+from indra_api_simulator import IndraAPISimulator
+
+DEVICES = "/api/devices"
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 0.2
+
+
+@pytest.fixture
+async def http_client() -> AsyncIterator[httpx.AsyncClient]:
+    """Return a shared HTTP client."""
+    async with httpx.AsyncClient() as client:
+        yield client
+
+
+def _connection(
+    simulator: IndraAPISimulator,
+    http_client: httpx.AsyncClient,
+    attempts: int = 3,
+    password: str | None = None,
+) -> IndraV2HConnection:
+    """Return a connection to the simulator with short delays."""
+    return IndraV2HConnection(
+        simulator.email,
+        password or simulator.password,
+        http_client,
+        breaker=CircuitBreaker(FAILURE_THRESHOLD, RESET_TIMEOUT, 1),
+        retry_policy=RetryPolicy(2, attempts, 0.01, 2),
+    )
+
+
+@pytest.mark.parametrize("status", [500, 502, 503, 429])
+async def test_transient_errors_are_retried(
+    simulator: IndraAPISimulator, http_client: httpx.AsyncClient, status: int
+) -> None:
+    """Test 5xx and 429 answers are retried until a request succeeds."""
+    connection = _connection(simulator, http_client)
+    simulator.fail_next(status, count=2)
+
+    assert len(await connection.get("/devices")) == 2
+    assert simulator.requests[DEVICES] == 3
+    assert connection.metrics.retries == 2
+    assert connection.breaker.state == BREAKER_CLOSED
+    assert connection.breaker.failures == 0
+
+
+async def test_retries_give_up_after_the_last_attempt(
+    simulator: IndraAPISimulator, http_client: httpx.AsyncClient
+) -> None:
+    """Test the last attempt's error is raised."""
+    connection = _connection(simulator, http_client, attempts=2)
+    simulator.fail_next(500, count=2)
+
+    with pytest.raises(ServerError) as err:
+        await connection.get("/devices")
+    assert err.value.code == 500
+    assert simulator.requests[DEVICES] == 2
+
+
+async def test_retry_after_is_honoured(
+    simulator: IndraAPISimulator, http_client: httpx.AsyncClient
+) -> None:
+    """Test a retry waits as long as Retry-After asks."""
+    connection = _connection(simulator, http_client)
+    simulator.fail_next(429, retry_after="0.5")
+
+    start = time.monotonic()
+    await connection.get("/devices")
+    assert time.monotonic() - start >= 0.5
+    assert simulator.requests[DEVICES] == 2
+
+
+async def test_retry_after_beyond_max_delay_is_not_retried(
+    simulator: IndraAPISimulator, http_client: httpx.AsyncClient
+) -> None:
+    """Test a request isn't retried if the server asks for too long a wait."""
+    connection = _connection(simulator, http_client)
+    simulator.fail_next(503, retry_after="60")
+
+    with pytest.raises(ServerError) as err:
+        await connection.get("/devices")
+    assert err.value.retry_after == 60
+    assert simulator.requests[DEVICES] == 1
+
+
+async def test_breaker_opens_probes_and_closes(
+    simulator: IndraAPISimulator, http_client: httpx.AsyncClient
+) -> None:
+    """Test the breaker stops requests in an outage and closes after it."""
+    connection = _connection(simulator, http_client)
+    breaker = connection.breaker
+    await connection.updateBearerAuth()
+    simulator.outage = True
+
+    with pytest.raises(ServerError):
+        await connection.get("/devices")
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.trips == 1
+    assert simulator.requests[DEVICES] == FAILURE_THRESHOLD
+
+    # While open, requests don't reach the cloud
+    with pytest.raises(CircuitOpenError):
+        await connection.get("/devices")
+    assert simulator.requests[DEVICES] == FAILURE_THRESHOLD
+
+    # A failed probe opens the breaker again, for twice as long
+    await asyncio.sleep(RESET_TIMEOUT)
+    assert breaker.state == BREAKER_HALF_OPEN
+    with pytest.raises(ServerError):
+        await connection.get("/devices")
+    assert simulator.requests[DEVICES] == FAILURE_THRESHOLD + 1
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.as_dict()["reset_timeout"] == 2 * RESET_TIMEOUT
+
+    # A successful probe closes it
+    simulator.outage = False
+    await asyncio.sleep(2 * RESET_TIMEOUT)
+    assert len(await connection.get("/devices")) == 2
+    assert simulator.requests[DEVICES] == FAILURE_THRESHOLD + 2
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.as_dict()["reset_timeout"] == RESET_TIMEOUT
+    assert breaker.trips == 1
+
+
+async def test_requests_wait_for_the_probe(
+    simulator: IndraAPISimulator, http_client: httpx.AsyncClient
+) -> None:
+    """Test only one request probes a half-open breaker."""
+    connection = _connection(simulator, http_client)
+    await connection.updateBearerAuth()
+    simulator.outage = True
+    with pytest.raises(ServerError):
+        await connection.get("/devices")
+    simulator.outage = False
+    simulator.latency = 0.1
+    await asyncio.sleep(RESET_TIMEOUT)
+
+    results = await asyncio.gather(
+        connection.get("/devices"),
+        connection.get(f"/telemetry/devices/{next(iter(simulator.chargers))}/latest"),
+    )
+    assert len(results[0]) == 2
+    assert connection.breaker.state == BREAKER_CLOSED
+    assert simulator.requests[DEVICES] == FAILURE_THRESHOLD + 1
+
+
+async def test_wrong_credentials_are_not_retried(
+    simulator: IndraAPISimulator, http_client: httpx.AsyncClient
+) -> None:
+    """Test a rejected login is raised at once and doesn't count as a failure."""
+    connection = _connection(simulator, http_client, password="wrong")
+
+    with pytest.raises(WrongCredentialsException):
+        await connection.get("/devices")
+    assert simulator.requests["/login"] == 1
+    assert simulator.requests[DEVICES] == 0
+    assert connection.metrics.retries == 0
+    assert connection.breaker.failures == 0
+
+
+async def test_rejected_token_is_not_retried(
+    simulator: IndraAPISimulator, http_client: httpx.AsyncClient
+) -> None:
+    """Test a token still rejected after logging in again isn't retried."""
+    connection = _connection(simulator, http_client)
+    simulator.fail_next(401, count=10)
+
+    with pytest.raises(WrongCredentialsException):
+        await connection.get("/devices")
+    # One login up front and one after the first 401; no backoff retries
+    assert simulator.requests["/login"] == 2
+    assert simulator.requests[DEVICES] == 2
+    assert connection.breaker.state == BREAKER_CLOSED
+    assert connection.breaker.failures == 0
+
+
+async def test_unreachable_login_opens_the_breaker(
+    simulator: IndraAPISimulator, http_client: httpx.AsyncClient
+) -> None:
+    """Test a login that can't connect is retried and counts as a failure."""
+    connection = _connection(simulator, http_client)
+    # The API is up, but nothing listens where the portal logs in
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    pyindrav2h.connection.loginUrl = f"http://127.0.0.1:{port}"
+
+    with pytest.raises(RequestConnectionError):
+        await connection.get("/devices")
+    assert connection.metrics.auth_refreshes == FAILURE_THRESHOLD
+    assert connection.metrics.retries == FAILURE_THRESHOLD - 1
+    assert connection.breaker.state == BREAKER_OPEN
+    assert simulator.requests[DEVICES] == 0
@@ -0,0 +1,88 @@
+"""Tests for fast power sampling."""
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.indra_v2h.sampling import IndraV2HSampler, PowerBuffer
+
+
+def test_buffer_keeps_the_newest_samples() -> None:
+    """Test a full buffer overwrites its oldest samples, keeping their order."""
+    buffer = PowerBuffer(3)
+    assert buffer.last_time is None
+
+    for second in range(5):
+        buffer.append(float(second), second * 10.0)
+
+    assert len(buffer) == 3
+    times, values = buffer.since(0)
+    assert times.tolist() == [2, 3, 4]
+    assert values.tolist() == [20, 30, 40]
+    assert buffer.last_time == 4
+
+    times, _ = buffer.since(3)
+    assert times.tolist() == [3, 4]
+
+
+def test_buffer_aggregates() -> None:
+    """Test the aggregates of a window, with energy by the trapezoidal rule."""
+    buffer = PowerBuffer(10)
+    for second, power in ((0, 6.0), (60, 12.0), (120, 0.0), (180, 3.0)):
+        buffer.append(1_700_000_000.0 + second, power)
+
+    aggregates = buffer.aggregates(1_700_000_000.0)
+
+    assert aggregates.samples == 4
+    assert aggregates.min_power == 0.0
+    assert aggregates.max_power == 12.0
+    assert aggregates.mean_power == 5.25
+    # 9, 6 and 1.5 kW on average over each of the three minutes
+    assert aggregates.energy == pytest.approx(0.275)
+    assert aggregates.end - aggregates.start == timedelta(minutes=3)
+    assert buffer.aggregates(1_700_000_181.0) is None
+
+
+async def test_published_aggregates(hass: HomeAssistant) -> None:
+    """Test samples are aggregated over the window only when published."""
+    sampler = IndraV2HSampler(
+        hass,
+        MagicMock(),
+        timedelta(seconds=5),
+        timedelta(minutes=1),
+        timedelta(seconds=30),
+    )
+    listener = MagicMock()
+    remove_listener = sampler.async_add_listener(listener)
+    now = dt_util.utcnow().replace(microsecond=0)
+
+    def telemetry(seconds_ago: int, watts: float) -> dict:
+        reported = now - timedelta(seconds=seconds_ago)
+        return {"time": reported.isoformat(), "data": {"powerToEv": watts}}
+
+    # Outside the window measured back from the newest sample
+    sampler._add_sample("SIM00000", telemetry(90, 9000))
+    for seconds_ago, watts in ((50, 2000), (30, 4000), (10, 6000)):
+        sampler._add_sample("SIM00000", telemetry(seconds_ago, watts))
+    # A repeated reading, and one without power, are skipped
+    sampler._add_sample("SIM00000", telemetry(10, 8000))
+    sampler._add_sample("SIM00000", {"time": now.isoformat(), "data": {}})
+
+    assert sampler.aggregates("SIM00000") is None
+    sampler._async_publish(now)
+
+    listener.assert_called_once()
+    aggregates = sampler.aggregates("SIM00000")
+    assert aggregates == sampler.aggregates("SIM00000", published=False)
+    assert aggregates.samples == 3
+    assert (aggregates.min_power, aggregates.max_power) == (2.0, 6.0)
+    assert aggregates.mean_power == 4.0
+    assert aggregates.energy == pytest.approx((3 + 5) * 20 / 3600, abs=1e-4)
+
+    remove_listener()
+    sampler._async_publish(now)
+    listener.assert_called_once()
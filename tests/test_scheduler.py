@@ -0,0 +1,140 @@
+"""Tests for the Indra V2H schedule engine."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from datetime import time, timedelta
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.indra_v2h.const import DOMAIN
+from custom_components.indra_v2h.coordinator import IndraV2HDataUpdateCoordinator
+from indra_api_simulator import IndraAPISimulator
+
+from .common import cache_entry, mock_entry
+
+INTERRUPTS = "/api/transactions/{transaction}/interrupt/{mode}"
+
+
+@pytest.fixture(autouse=True)
+def fast_confirm() -> Iterator[None]:
+    """Confirm mode changes without waiting between polls."""
+    with patch(
+        "custom_components.indra_v2h.coordinator.MODE_CONFIRM_INTERVAL", 0.01
+    ):
+        yield
+
+
+async def _async_setup(hass: HomeAssistant, entry: MockConfigEntry) -> Any:
+    """Set up an entry and return its coordinator."""
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return hass.data[DOMAIN][entry.entry_id]
+
+
+async def test_reconcile_waits_for_first_poll(
+    hass: HomeAssistant, hass_storage: dict[str, Any], simulator: IndraAPISimulator
+) -> None:
+    """Test a restart started from the cache reconciles after the first poll."""
+    entry = mock_entry(simulator)
+    cache_entry(hass_storage, entry, simulator)
+    serial = next(iter(simulator.chargers))
+    now = dt_util.now()
+    hass_storage[f"{DOMAIN}.schedule.{entry.entry_id}"] = {
+        "version": 1,
+        "minor_version": 1,
+        "key": f"{DOMAIN}.schedule.{entry.entry_id}",
+        "data": {
+            "windows": [
+                {
+                    "id": "window",
+                    "serial": serial,
+                    "mode": "charge",
+                    "start": (now - timedelta(hours=1)).isoformat(),
+                    "end": (now + timedelta(hours=1)).isoformat(),
+                    "source": None,
+                }
+            ],
+            # Applied before the restart, but the charger has left it since
+            "applied": {serial: "window"},
+        },
+    }
+
+    with patch.object(
+        IndraV2HDataUpdateCoordinator, "async_refresh_in_slot", AsyncMock()
+    ):
+        coordinator = await _async_setup(hass, entry)
+    assert simulator.requests[INTERRUPTS] == 0
+
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert simulator.chargers[serial].mode == "CHARGE"
+    assert simulator.requests[INTERRUPTS] == 1
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_switches_at_window_boundaries(
+    hass: HomeAssistant, simulator: IndraAPISimulator
+) -> None:
+    """Test a window switches the charger at its start and back at its end."""
+    entry = mock_entry(simulator)
+    coordinator = await _async_setup(hass, entry)
+    serial = next(iter(simulator.chargers))
+    start = dt_util.now() + timedelta(minutes=10)
+    end = start + timedelta(minutes=10)
+
+    coordinator.scheduler.async_add_window(serial, "discharge", start, end)
+    await hass.async_block_till_done()
+    assert simulator.chargers[serial].mode == "SCHEDULE"
+
+    async_fire_time_changed(hass, start + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    assert simulator.chargers[serial].mode == "DISCHARGE"
+    active = coordinator.scheduler.active_window(serial, start + timedelta(seconds=1))
+    assert active[0].mode == "discharge"
+
+    async_fire_time_changed(hass, end + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    assert simulator.chargers[serial].mode == "SCHEDULE"
+    # The one-off window is dropped once it is over
+    assert coordinator.scheduler.windows(serial) == []
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_windows_are_stored(
+    hass: HomeAssistant, hass_storage: dict[str, Any], simulator: IndraAPISimulator
+) -> None:
+    """Test windows are saved and loaded again after a reload."""
+    entry = mock_entry(simulator)
+    coordinator = await _async_setup(hass, entry)
+    serial = next(iter(simulator.chargers))
+
+    window = coordinator.scheduler.async_add_window(
+        serial, "charge", time(1, 30), time(5)
+    )
+    # Write the delayed save as Home Assistant does when it stops
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+    stored = hass_storage[f"{DOMAIN}.schedule.{entry.entry_id}"]["data"]
+    assert stored["windows"] == [window.as_dict()]
+
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    assert coordinator.scheduler.windows(serial) == [window]
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,122 @@
+"""Tests for routing Indra V2H service calls to chargers."""
+from __future__ import annotations
+
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import area_registry as ar
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.indra_v2h.const import DOMAIN
+from custom_components.indra_v2h.scheduler import IndraV2HScheduler
+from indra_api_simulator import IndraAPISimulator
+
+from .common import mock_entry
+
+
+@pytest.fixture
+async def entry(hass: HomeAssistant, simulator: IndraAPISimulator) -> MockConfigEntry:
+    """Set up an entry with two chargers on the simulator."""
+    entry = mock_entry(simulator)
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def _async_clear_schedule(hass: HomeAssistant, **target: Any) -> set[str]:
+    """Call clear_schedule and return the serials of the chargers it reached."""
+    response = await hass.services.async_call(
+        DOMAIN, "clear_schedule", target, blocking=True, return_response=True
+    )
+    return set(response["chargers"])
+
+
+def _device_id(hass: HomeAssistant, serial: str) -> str:
+    """Return the device registry ID of a charger."""
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, serial)})
+    assert device is not None
+    return device.id
+
+
+async def test_entity_target(hass: HomeAssistant, entry: MockConfigEntry) -> None:
+    """Test an entity target reaches the charger the entity belongs to."""
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "select", DOMAIN, "SIM00001_mode"
+    )
+
+    assert await _async_clear_schedule(hass, entity_id=entity_id) == {"SIM00001"}
+    assert await _async_clear_schedule(hass, entity_id="all") == {
+        "SIM00000",
+        "SIM00001",
+    }
+
+
+async def test_device_target(hass: HomeAssistant, entry: MockConfigEntry) -> None:
+    """Test a device target reaches that charger."""
+    device_id = _device_id(hass, "SIM00000")
+
+    assert await _async_clear_schedule(hass, device_id=device_id) == {"SIM00000"}
+    assert await _async_clear_schedule(
+        hass, device_id=[device_id, _device_id(hass, "SIM00001")]
+    ) == {"SIM00000", "SIM00001"}
+
+
+async def test_area_target(hass: HomeAssistant, entry: MockConfigEntry) -> None:
+    """Test an area target reaches the chargers in it, and only those."""
+    garage = ar.async_get(hass).async_create("Garage")
+    empty = ar.async_get(hass).async_create("Loft")
+    dr.async_get(hass).async_update_device(
+        _device_id(hass, "SIM00001"), area_id=garage.id
+    )
+
+    assert await _async_clear_schedule(hass, area_id=garage.id) == {"SIM00001"}
+    with pytest.raises(ServiceValidationError, match="no Indra V2H chargers"):
+        await _async_clear_schedule(hass, area_id=empty.id)
+
+
+async def test_target_required_with_several_chargers(
+    hass: HomeAssistant, entry: MockConfigEntry
+) -> None:
+    """Test a call without a target is refused when it could mean any charger."""
+    with pytest.raises(ServiceValidationError, match="Choose a target"):
+        await _async_clear_schedule(hass)
+
+
+async def test_failures_are_reported_per_charger(
+    hass: HomeAssistant, entry: MockConfigEntry
+) -> None:
+    """Test one charger failing doesn't stop the others."""
+    clear = IndraV2HScheduler.async_clear
+
+    def async_clear(self: IndraV2HScheduler, serial: str, window_id=None) -> int:
+        if serial == "SIM00000":
+            raise HomeAssistantError("unreachable")
+        return clear(self, serial, window_id)
+
+    with patch.object(IndraV2HScheduler, "async_clear", async_clear):
+        response = await hass.services.async_call(
+            DOMAIN,
+            "clear_schedule",
+            {"entity_id": "all"},
+            blocking=True,
+            return_response=True,
+        )
+        assert response["chargers"] == {
+            "SIM00000": {"success": False, "error": "unreachable"},
+            "SIM00001": {"success": True, "removed": 0},
+        }
+
+        # Without a response to report it in, the failure is raised
+        with pytest.raises(HomeAssistantError, match="failed for SIM00000"):
+            await hass.services.async_call(
+                DOMAIN,
+                "clear_schedule",
+                {"device_id": _device_id(hass, "SIM00000")},
+                blocking=True,
+            )
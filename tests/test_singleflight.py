@@ -0,0 +1,161 @@
+"""Tests for sharing identical API reads."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+
+from custom_components.indra_v2h.connection import IndraV2HConnection
+from custom_components.indra_v2h.metrics import ClientMetrics
+from custom_components.indra_v2h.singleflight import SingleFlight
+from indra_api_simulator import IndraAPISimulator
+
+DEVICES = "/api/devices"
+TTL = 0.1
+
+
+class FakeRequest:
+    """Counts its calls, answering each after a short wait."""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        """Initialize the request."""
+        self.calls = 0
+        self.error = error
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self) -> int:
+        """Answer with the number of calls so far."""
+        self.calls += 1
+        calls = self.calls
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return calls
+
+
+def _flight(ttl: float = TTL) -> SingleFlight:
+    """Return a SingleFlight with its own metrics."""
+    return SingleFlight(ttl, ClientMetrics())
+
+
+async def test_concurrent_calls_share_a_request() -> None:
+    """Test concurrent calls for a key await a single request."""
+    flight = _flight()
+    request = FakeRequest()
+    request.release.clear()
+
+    calls = [asyncio.create_task(flight.call("key", request)) for _ in range(3)]
+    other = asyncio.create_task(flight.call("other", request))
+    await asyncio.sleep(0)
+    request.release.set()
+
+    assert await asyncio.gather(*calls) == [1, 1, 1]
+    assert await other == 2
+    assert request.calls == 2
+    assert flight.metrics.shared_reads == 2
+
+
+async def test_results_are_reused_within_the_ttl() -> None:
+    """Test a result answers later calls until the TTL runs out."""
+    flight = _flight()
+    request = FakeRequest()
+
+    assert await flight.call("key", request) == 1
+    assert await flight.call("key", request) == 1
+    assert flight.metrics.shared_reads == 1
+
+    await asyncio.sleep(TTL)
+    assert await flight.call("key", request) == 2
+    assert request.calls == 2
+
+
+async def test_zero_ttl_only_shares_concurrent_calls() -> None:
+    """Test a TTL of zero keeps no results."""
+    flight = _flight(0)
+    request = FakeRequest()
+
+    assert await flight.call("key", request) == 1
+    assert await flight.call("key", request) == 2
+
+
+async def test_invalidate_stops_sharing() -> None:
+    """Test calls after invalidate() aren't answered by earlier requests."""
+    flight = _flight()
+    request = FakeRequest()
+    assert await flight.call("key", request) == 1
+    flight.invalidate()
+
+    request.release.clear()
+    before = asyncio.create_task(flight.call("key", request))
+    await asyncio.sleep(0)
+    flight.invalidate()
+    after = asyncio.create_task(flight.call("key", request))
+    await asyncio.sleep(0)
+    request.release.set()
+
+    assert await before == 2
+    assert await after == 3
+    # The request sent before the last invalidate() isn't kept
+    assert await flight.call("key", request) == 3
+
+
+async def test_errors_reach_every_waiter() -> None:
+    """Test a failed request is raised to all its callers and not kept."""
+    flight = _flight()
+    request = FakeRequest(RuntimeError("offline"))
+    request.release.clear()
+
+    calls = [asyncio.create_task(flight.call("key", request)) for _ in range(2)]
+    await asyncio.sleep(0)
+    request.release.set()
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    assert [str(result) for result in results] == ["offline", "offline"]
+    assert request.calls == 1
+
+    request.error = None
+    assert await flight.call("key", request) == 2
+
+
+async def test_cancelled_caller_leaves_the_request_running() -> None:
+    """Test cancelling one caller doesn't cancel the others' request."""
+    flight = _flight()
+    request = FakeRequest()
+    request.release.clear()
+
+    cancelled = asyncio.create_task(flight.call("key", request))
+    waiting = asyncio.create_task(flight.call("key", request))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    request.release.set()
+
+    assert await waiting == 1
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+
+@pytest.fixture
+async def http_client() -> AsyncIterator[httpx.AsyncClient]:
+    """Return a shared HTTP client."""
+    async with httpx.AsyncClient() as client:
+        yield client
+
+
+async def test_post_invalidates_reads(
+    simulator: IndraAPISimulator, http_client: httpx.AsyncClient
+) -> None:
+    """Test a read after a write goes to the API rather than the cache."""
+    connection = IndraV2HConnection(
+        simulator.email, simulator.password, http_client, read_share_ttl=60
+    )
+    serial = next(iter(simulator.chargers))
+
+    await connection.get("/devices")
+    await connection.get("/devices")
+    assert simulator.requests[DEVICES] == 1
+
+    await connection.post(f"/transactions/tx-{serial}/interrupt/charge")
+    await connection.get("/devices")
+    assert simulator.requests[DEVICES] == 2